@@ -0,0 +1,215 @@
+"""baseline schema
+
+Creates every table the application relies on that later revisions do not:
+the original users, user_financials, bank_quotes, user_chat_info and
+financial_analysis tables, the graph checkpoint tables, and the transaction,
+balance and monthly aggregate history tables. Base.metadata.create_all at
+startup creates the same tables, so each one is only created where missing;
+a database created by an earlier version of the app gets just the new ones.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18 13:30:22.226724
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0000'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _users() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_superuser", sa.Boolean(), nullable=True),
+        sa.Column("date_of_birth", sa.Date(), nullable=True),
+        sa.Column("gender", sa.Enum("male", "female", "other", name="gender"), nullable=True),
+        sa.Column("pan_id", sa.String(), nullable=True),
+        sa.Column("passport_id", sa.String(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("phone_number", sa.String(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_full_name", "users", ["full_name"])
+    op.create_index("ix_users_pan_id", "users", ["pan_id"], unique=True)
+    op.create_index("ix_users_passport_id", "users", ["passport_id"], unique=True)
+
+
+def _user_financials() -> None:
+    op.create_table(
+        "user_financials",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+        sa.Column("credit_score_name", sa.String(), nullable=True),
+        sa.Column("credit_score", sa.Integer(), nullable=True),
+        sa.Column("total_income", sa.Float(), nullable=True),
+        sa.Column("loans_balance", sa.Float(), nullable=True),
+        sa.Column("loans_sanctioned_amount", sa.Float(), nullable=True),
+        sa.Column("loans_past_due_amount", sa.Float(), nullable=True),
+        sa.Column("active_loans_count", sa.Integer(), nullable=True),
+        # PydanticType columns are JSON underneath
+        sa.Column("mutual_funds_summary", sa.JSON(), nullable=True),
+        sa.Column("equities_summary", sa.JSON(), nullable=True),
+        sa.Column("etf_summary", sa.JSON(), nullable=True),
+        sa.Column("bank_balance_history", sa.JSON(), nullable=True),
+        sa.Column("inflow_history", sa.JSON(), nullable=True),
+        sa.Column("outflow_history", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_user_financials_id", "user_financials", ["id"])
+
+
+def _bank_quotes() -> None:
+    op.create_table(
+        "bank_quotes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bank_name", sa.String(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("tenure", sa.Integer(), nullable=False),
+        sa.Column("interest_rate", sa.Float(), nullable=False),
+        sa.Column("emi", sa.Float(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_bank_quotes_id", "bank_quotes", ["id"])
+
+
+def _user_chat_info() -> None:
+    op.create_table(
+        "user_chat_info",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("income_details", sa.Text(), nullable=True),
+        sa.Column("upcoming_spends", sa.Text(), nullable=True),
+        sa.Column("dependents_info", sa.Text(), nullable=True),
+        sa.Column("additional_info", sa.Text(), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_user_chat_info_id", "user_chat_info", ["id"])
+
+
+def _financial_analysis() -> None:
+    op.create_table(
+        "financial_analysis",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("analysis", sa.JSON(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_financial_analysis_id", "financial_analysis", ["id"])
+
+
+def _graph_checkpoints() -> None:
+    op.create_table(
+        "graph_checkpoints",
+        sa.Column("thread_id", sa.String(), primary_key=True),
+        sa.Column("checkpoint_ns", sa.String(), primary_key=True),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("parent_checkpoint_id", sa.String(), nullable=True),
+        sa.Column("checkpoint_type", sa.String(), nullable=False),
+        sa.Column("checkpoint", sa.LargeBinary(), nullable=False),
+        sa.Column("metadata_type", sa.String(), nullable=False),
+        sa.Column("checkpoint_metadata", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_graph_checkpoints_updated_at", "graph_checkpoints", ["updated_at"])
+
+
+def _graph_checkpoint_writes() -> None:
+    op.create_table(
+        "graph_checkpoint_writes",
+        sa.Column("thread_id", sa.String(), primary_key=True),
+        sa.Column("checkpoint_ns", sa.String(), primary_key=True),
+        sa.Column("checkpoint_id", sa.String(), primary_key=True),
+        sa.Column("task_id", sa.String(), primary_key=True),
+        sa.Column("idx", sa.Integer(), primary_key=True),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("value_type", sa.String(), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.Column("task_path", sa.String(), nullable=False),
+    )
+    op.create_index(
+        "ix_graph_checkpoint_writes_thread", "graph_checkpoint_writes", ["thread_id", "checkpoint_ns"]
+    )
+
+
+def _transactions() -> None:
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("direction", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("narration", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("balance", sa.Float(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+    )
+    op.create_index("ix_transactions_id", "transactions", ["id"])
+    op.create_index("ix_transactions_user_timestamp", "transactions", ["user_id", "timestamp"])
+    op.create_index("ix_transactions_user_category", "transactions", ["user_id", "category"])
+
+
+def _balance_history() -> None:
+    op.create_table(
+        "balance_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("balance", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_balance_history_id", "balance_history", ["id"])
+    op.create_index("ix_balance_history_user_timestamp", "balance_history", ["user_id", "timestamp"])
+
+
+def _user_monthly_aggregates() -> None:
+    op.create_table(
+        "user_monthly_aggregates",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("inflow_total", sa.Float(), nullable=False),
+        sa.Column("inflow_count", sa.Integer(), nullable=False),
+        sa.Column("outflow_total", sa.Float(), nullable=False),
+        sa.Column("outflow_count", sa.Integer(), nullable=False),
+        sa.Column("emi_outflow_total", sa.Float(), nullable=False),
+        sa.Column("closing_balance", sa.Float(), nullable=True),
+        sa.Column("closing_balance_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+# In creation order (referenced tables first)
+TABLES = (
+    ("users", _users),
+    ("user_financials", _user_financials),
+    ("bank_quotes", _bank_quotes),
+    ("user_chat_info", _user_chat_info),
+    ("financial_analysis", _financial_analysis),
+    ("graph_checkpoints", _graph_checkpoints),
+    ("graph_checkpoint_writes", _graph_checkpoint_writes),
+    ("transactions", _transactions),
+    ("balance_history", _balance_history),
+    ("user_monthly_aggregates", _user_monthly_aggregates),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table_name, create in TABLES:
+        if not inspector.has_table(table_name):
+            create()
+
+
+def downgrade() -> None:
+    for table_name, _ in reversed(TABLES):
+        op.drop_table(table_name)
+    sa.Enum(name="gender").drop(op.get_bind(), checkfirst=True)
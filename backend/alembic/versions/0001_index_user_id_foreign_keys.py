@@ -0,0 +1,38 @@
+"""index user_id foreign keys
+
+The per-user list endpoints filter bank_quotes, user_chat_info and
+financial_analysis by user_id, which had no index. Base.metadata.create_all
+at startup creates the same indexes, so they are only created where missing.
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18 12:38:56.550028
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = '0000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+USER_ID_INDEXES = (
+    ("ix_bank_quotes_user_id", "bank_quotes"),
+    ("ix_user_chat_info_user_id", "user_chat_info"),
+    ("ix_financial_analysis_user_id", "financial_analysis"),
+)
+
+
+def upgrade() -> None:
+    for index_name, table_name in USER_ID_INDEXES:
+        op.create_index(index_name, table_name, ["user_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    for index_name, table_name in USER_ID_INDEXES:
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
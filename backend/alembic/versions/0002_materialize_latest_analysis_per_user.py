@@ -0,0 +1,95 @@
+"""materialize latest analysis per user
+
+Adds user_latest_analysis, the pre-serialized latest analysis of each user
+served by GET /users/{user_id}/financial-analyses/latest, and fills it from
+the newest financial_analysis row of every user. The table may already exist
+when Base.metadata.create_all ran first; the backfill then only adds the
+users still missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:45:10.412337
+
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _stored_analysis(value):
+    # PydanticType stores the model's JSON inside a JSON column
+    while isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return value
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("user_latest_analysis"):
+        op.create_table(
+            "user_latest_analysis",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column(
+                "financial_analysis_id",
+                sa.Integer(),
+                sa.ForeignKey("financial_analysis.id"),
+                nullable=True,
+            ),
+            sa.Column("document", sa.LargeBinary(), nullable=False),
+            sa.Column("etag", sa.String(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+    latest_analysis = sa.table(
+        "user_latest_analysis",
+        sa.column("user_id", sa.Integer()),
+        sa.column("financial_analysis_id", sa.Integer()),
+        sa.column("document", sa.LargeBinary()),
+        sa.column("etag", sa.String()),
+        sa.column("updated_at", sa.DateTime(timezone=True)),
+    )
+    rows = bind.execute(sa.text(
+        "SELECT fa.id, fa.user_id, fa.analysis FROM financial_analysis fa "
+        "JOIN (SELECT user_id, MAX(id) AS id FROM financial_analysis "
+        "      WHERE user_id IS NOT NULL GROUP BY user_id) newest ON newest.id = fa.id "
+        "WHERE fa.user_id NOT IN (SELECT user_id FROM user_latest_analysis)"
+    )).all()
+
+    now = datetime.now(timezone.utc)
+    values = []
+    for analysis_id, user_id, analysis in rows:
+        document = json.dumps(
+            {
+                "source": "api",
+                "updated_at": now.isoformat().replace("+00:00", "Z"),
+                "analysis": _stored_analysis(analysis),
+                "raw_analysis": None,
+                "scenarios": None,
+            },
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode()
+        values.append({
+            "user_id": user_id,
+            "financial_analysis_id": analysis_id,
+            "document": document,
+            "etag": '"' + hashlib.blake2b(document, digest_size=16).hexdigest() + '"',
+            "updated_at": now,
+        })
+    if values:
+        op.bulk_insert(latest_analysis, values)
+
+
+def downgrade() -> None:
+    op.drop_table("user_latest_analysis")
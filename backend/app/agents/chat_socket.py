@@ -0,0 +1,121 @@
+"""
+Chat protocol over the /ws/{user_id} socket.
+
+Clients send ``{"type": "chat", "session_id", "message"}`` frames. Each turn
+runs through the graph, and its events (token, message, analysis, redirect,
+done, see ``stream_chat``) come back as frames tagged with the ``session_id``,
+plus a ``{"type": "phase"}`` frame whenever the conversation phase changes.
+Token frames carry only the new ``delta`` for clients to append; the
+``message`` frame has the final text of the reply. Several sessions can be
+active on one socket; the turns of a session run in order.
+``{"type": "cancel", "session_id"}`` stops that session's pending turns.
+Problems are reported as ``{"type": "error", "session_id", "error"}`` frames.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+from uuid import uuid4
+
+import orjson
+from langchain_core.messages import HumanMessage
+
+from app.services.websocket_manager import ConnectionWriter
+from .graph import stream_chat
+
+logger = logging.getLogger(__name__)
+
+# Turns queued or running on one socket, across all of its sessions
+MAX_PENDING_TURNS = 8
+
+
+class ChatSocket:
+    """Runs the chat turns requested on one WebSocket connection."""
+
+    def __init__(self, connection: ConnectionWriter, user_id: Optional[int]):
+        self.connection = connection
+        self.user_id = user_id
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._turns: Dict[str, Set[asyncio.Task]] = {}
+        self._phases: Dict[str, str] = {}
+
+    def _send(self, frame: Dict[str, Any]) -> None:
+        self.connection.enqueue(orjson.dumps(frame).decode())
+
+    def _error(self, session_id: Optional[str], error: str) -> None:
+        self._send({"type": "error", "session_id": session_id, "error": error})
+
+    @property
+    def pending_turns(self) -> int:
+        return sum(len(turns) for turns in self._turns.values())
+
+    def handle(self, frame: Dict[str, Any]) -> bool:
+        """Act on a chat protocol frame; False if the frame is not one."""
+        kind = frame.get("type")
+        if kind == "chat":
+            self._start_turn(frame)
+        elif kind == "cancel":
+            self._cancel(frame.get("session_id"))
+        else:
+            return False
+        return True
+
+    def _start_turn(self, frame: Dict[str, Any]) -> None:
+        session_id = frame.get("session_id") or str(uuid4())
+        message = frame.get("message")
+        if not isinstance(session_id, str) or not isinstance(message, str) or not message.strip():
+            self._error(frame.get("session_id"), "A chat frame needs a non-empty message")
+            return
+        if self.user_id is None:
+            self._error(session_id, "Chat needs a numeric user id in the socket URL")
+            return
+        if self.pending_turns >= MAX_PENDING_TURNS:
+            self._error(session_id, "Too many turns in progress")
+            return
+
+        task = asyncio.create_task(self._run_turn(session_id, message))
+        turns = self._turns.setdefault(session_id, set())
+        turns.add(task)
+        task.add_done_callback(lambda task: self._turn_finished(session_id, task))
+
+    def _turn_finished(self, session_id: str, task: asyncio.Task) -> None:
+        turns = self._turns.get(session_id)
+        if turns is not None:
+            turns.discard(task)
+            if not turns:
+                # Nothing is kept for idle sessions; the next turn of the
+                # session reports its phase again
+                del self._turns[session_id]
+                self._locks.pop(session_id, None)
+                self._phases.pop(session_id, None)
+
+    async def _run_turn(self, session_id: str, message: str) -> None:
+        # The graph keeps one state per session: a session's turns run in order
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            config = {"configurable": {"thread_id": session_id}}
+            try:
+                async for event in stream_chat(
+                    [HumanMessage(content=message)], config, user_id=self.user_id
+                ):
+                    self._send({**event, "session_id": session_id})
+                    if event["type"] == "done":
+                        phase = event["current_phase"]
+                        if self._phases.get(session_id) != phase:
+                            self._phases[session_id] = phase
+                            self._send({"type": "phase", "session_id": session_id, "current_phase": phase})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat turn failed for session {session_id}: {e}")
+                self._error(session_id, "The chat turn failed")
+
+    def _cancel(self, session_id: Optional[str]) -> None:
+        for task in list(self._turns.get(session_id, ())):
+            task.cancel()
+
+    async def close(self) -> None:
+        """Cancel every pending turn (the socket is gone)."""
+        tasks = [task for turns in self._turns.values() for task in turns]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
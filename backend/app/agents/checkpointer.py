@@ -0,0 +1,382 @@
+"""
+SQL-backed LangGraph checkpointer with a bounded in-memory hot cache.
+
+Only the latest checkpoint of each thread (and the pending writes against it)
+is kept, which is all the chat graph needs to resume a conversation. Rows live
+in the application database, so sessions survive restarts and are shared by
+every uvicorn worker, while the hot cache keeps recently active threads
+deserialization-ready without growing worker memory without limit. Another
+worker may have advanced a thread since it was cached, so a cached record is
+only used after one indexed lookup confirms it is still the stored checkpoint
+(same id, same number of pending writes). Threads idle for longer
+than ``idle_ttl`` are swept from the database, and so are the least recently
+updated ones once more than ``max_threads`` exist.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.checkpoint import GraphCheckpoint, GraphCheckpointWrite
+from app.services.cache import LRUCache
+
+# (task_id, idx, channel, (type, payload), task_path)
+_StoredWrite = Tuple[str, int, str, Tuple[str, bytes], str]
+
+
+@dataclass
+class _ThreadRecord:
+    """Serialized latest checkpoint of one (thread_id, checkpoint_ns)."""
+
+    checkpoint_id: str
+    parent_checkpoint_id: Optional[str]
+    checkpoint: Tuple[str, bytes]
+    metadata: Tuple[str, bytes]
+    writes: List[_StoredWrite] = field(default_factory=list)
+
+
+class SQLCheckpointSaver(BaseCheckpointSaver[int]):
+    """Shallow checkpointer storing each thread's latest state in SQL.
+
+    Args:
+        session_factory: Callable returning a new SQLAlchemy ``Session``.
+        cache_size: Number of threads kept deserialization-ready in memory.
+        idle_ttl: Seconds of inactivity after which a thread is deleted.
+        max_threads: Upper bound on stored threads; the least recently
+            updated ones are deleted first.
+        sweep_interval: Minimum seconds between two eviction sweeps.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        cache_size: int = 256,
+        idle_ttl: float = 7 * 24 * 3600,
+        max_threads: int = 100_000,
+        sweep_interval: float = 300,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.session_factory = session_factory
+        self.cache = LRUCache(maxsize=cache_size)
+        self.idle_ttl = idle_ttl
+        self.max_threads = max_threads
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+
+    # Storage helpers
+
+    def _stored_version(self, db: Session, thread_id: str, checkpoint_ns: str) -> Optional[Tuple[str, int]]:
+        """(checkpoint_id, pending write count) of the stored row, in one query."""
+        write_count = (
+            select(func.count())
+            .where(
+                GraphCheckpointWrite.thread_id == thread_id,
+                GraphCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                GraphCheckpointWrite.checkpoint_id == GraphCheckpoint.checkpoint_id,
+            )
+            .scalar_subquery()
+        )
+        row = db.execute(
+            select(GraphCheckpoint.checkpoint_id, write_count).where(
+                GraphCheckpoint.thread_id == thread_id,
+                GraphCheckpoint.checkpoint_ns == checkpoint_ns,
+            )
+        ).first()
+        return tuple(row) if row is not None else None
+
+    def _load(self, thread_id: str, checkpoint_ns: str) -> Optional[_ThreadRecord]:
+        key = (thread_id, checkpoint_ns)
+        cached = self.cache.get(key)
+
+        with self.session_factory() as db:
+            if cached is not None:
+                # Another worker may have written a newer checkpoint meanwhile
+                version = self._stored_version(db, thread_id, checkpoint_ns)
+                if version == (cached.checkpoint_id, len(cached.writes)):
+                    return cached
+                self.cache.pop(key)
+                if version is None:
+                    return None
+
+            row = db.get(GraphCheckpoint, (thread_id, checkpoint_ns))
+            if row is None:
+                return None
+            writes = db.execute(
+                select(GraphCheckpointWrite)
+                .where(
+                    GraphCheckpointWrite.thread_id == thread_id,
+                    GraphCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                    GraphCheckpointWrite.checkpoint_id == row.checkpoint_id,
+                )
+                .order_by(
+                    GraphCheckpointWrite.task_path,
+                    GraphCheckpointWrite.task_id,
+                    GraphCheckpointWrite.idx,
+                )
+            ).scalars().all()
+            record = _ThreadRecord(
+                checkpoint_id=row.checkpoint_id,
+                parent_checkpoint_id=row.parent_checkpoint_id,
+                checkpoint=(row.checkpoint_type, row.checkpoint),
+                metadata=(row.metadata_type, row.checkpoint_metadata),
+                writes=[
+                    (w.task_id, w.idx, w.channel, (w.value_type, w.value), w.task_path)
+                    for w in writes
+                ],
+            )
+
+        self.cache.set(key, record)
+        return record
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, record: _ThreadRecord) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": record.checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(record.checkpoint),
+            metadata=self.serde.loads_typed(record.metadata),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, _, channel, value, _ in record.writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": record.parent_checkpoint_id,
+                    }
+                }
+                if record.parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def sweep(self) -> int:
+        """Delete idle threads and trim the table to ``max_threads``."""
+        self._last_sweep = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.idle_ttl)
+        with self.session_factory() as db:
+            stale = set(db.execute(
+                select(GraphCheckpoint.thread_id).where(GraphCheckpoint.updated_at < cutoff)
+            ).scalars().all())
+            stale.update(db.execute(
+                select(GraphCheckpoint.thread_id)
+                .order_by(GraphCheckpoint.updated_at.desc())
+                .offset(self.max_threads)
+            ).scalars().all())
+            if stale:
+                db.execute(delete(GraphCheckpointWrite).where(GraphCheckpointWrite.thread_id.in_(stale)))
+                db.execute(delete(GraphCheckpoint).where(GraphCheckpoint.thread_id.in_(stale)))
+                db.commit()
+        self.cache.pop_matching(lambda key: key[0] in stale)
+        return len(stale)
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    # BaseCheckpointSaver interface
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        record = self._load(thread_id, checkpoint_ns)
+        if record is None:
+            return None
+        # Only the latest checkpoint is retained
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id != record.checkpoint_id:
+            return None
+        return self._to_tuple(thread_id, checkpoint_ns, record)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None:
+            with self.session_factory() as db:
+                keys = db.execute(
+                    select(GraphCheckpoint.thread_id, GraphCheckpoint.checkpoint_ns)
+                ).all()
+        else:
+            keys = [(config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""))]
+
+        for thread_id, checkpoint_ns in keys:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint = self.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}})
+            if checkpoint is None:
+                continue
+            if before and (before_id := get_checkpoint_id(before)) and checkpoint.config["configurable"]["checkpoint_id"] >= before_id:
+                continue
+            if filter and not all(checkpoint.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        record = _ThreadRecord(
+            checkpoint_id=checkpoint["id"],
+            parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+            checkpoint=self.serde.dumps_typed(checkpoint),
+            metadata=self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+        )
+
+        with self.session_factory() as db:
+            db.merge(GraphCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=record.checkpoint_id,
+                parent_checkpoint_id=record.parent_checkpoint_id,
+                checkpoint_type=record.checkpoint[0],
+                checkpoint=record.checkpoint[1],
+                metadata_type=record.metadata[0],
+                checkpoint_metadata=record.metadata[1],
+                updated_at=datetime.now(timezone.utc),
+            ))
+            # Writes against older checkpoints are no longer reachable
+            db.execute(delete(GraphCheckpointWrite).where(
+                GraphCheckpointWrite.thread_id == thread_id,
+                GraphCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                GraphCheckpointWrite.checkpoint_id != record.checkpoint_id,
+            ))
+            db.commit()
+
+        self.cache.set((thread_id, checkpoint_ns), record)
+        self._maybe_sweep()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        record = self._load(thread_id, checkpoint_ns)
+        is_latest = record is not None and record.checkpoint_id == checkpoint_id
+        existing = {(w[0], w[1]) for w in record.writes} if is_latest else set()
+
+        stored: List[_StoredWrite] = []
+        with self.session_factory() as db:
+            for index, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, index)
+                # Regular writes are idempotent; special (negative) ones overwrite
+                if idx >= 0 and (task_id, idx) in existing:
+                    continue
+                value_type, payload = self.serde.dumps_typed(value)
+                db.merge(GraphCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    idx=idx,
+                    channel=channel,
+                    value_type=value_type,
+                    value=payload,
+                    task_path=task_path,
+                ))
+                stored.append((task_id, idx, channel, (value_type, payload), task_path))
+            db.commit()
+
+        if is_latest:
+            # The record is shared with concurrent readers: swap in a new list
+            replaced = {(w[0], w[1]) for w in stored}
+            record.writes = sorted(
+                [w for w in record.writes if (w[0], w[1]) not in replaced] + stored,
+                key=lambda w: (w[4], w[0], w[1]),
+            )
+        else:
+            # The checkpoint is not the cached one; reload it on next access
+            self.cache.pop((thread_id, checkpoint_ns))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.session_factory() as db:
+            db.execute(delete(GraphCheckpointWrite).where(GraphCheckpointWrite.thread_id == thread_id))
+            db.execute(delete(GraphCheckpoint).where(GraphCheckpoint.thread_id == thread_id))
+            db.commit()
+        self.cache.pop_matching(lambda key: key[0] == thread_id)
+
+    # Async variants: run database work (including the freshness check) in a thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -1,22 +1,27 @@
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage, RemoveMessage
 from typing import Dict, Any, List
 import json
 import re
 from datetime import datetime
-from sqlalchemy.orm import Session
-from dependencies import get_db
+from database import SessionLocal, AsyncSessionLocal
 from app import models
 from app.pydanticModels import financial_analysis as financial_analysis_schema
 from pydantic import BaseModel, Field
 from typing import Optional
 from langchain_core.output_parsers import PydanticOutputParser
-from app.services.websocket_manager import manager
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+from app.services.scenario_engine import build_scenarios, format_for_prompt
+from app.services.analysis_cache import analysis_cache, analysis_fingerprint
+from app.services.user_context import UserContext, user_context_cache
+from app.services.latest_analysis import save_latest_analysis
 import asyncio
 
 from .state import AgentState
+from .checkpointer import SQLCheckpointSaver
+from .speculation import SpeculativeTasks
 from app.config import settings
 
 # System prompts for both agents
@@ -37,9 +42,10 @@ After collecting all information, ask for confirmation: "I have gathered all the
 
 Current conversation phase: {current_phase}
 Information collected so far: {chat_info}
+Summary of the earlier conversation: {conversation_summary}
 """
 
-AGENT2_SYSTEM_PROMPT = """You are a financial analysis expert. When provided with a user's profile, financial data, loan offers, and requirements, produce a comprehensive, human-readable loan analysis in the following structured format. Use a professional, clear, and concise tone, explaining any necessary jargon. Compute key metrics (monthly income, existing obligations, liquidity after buffer, credit score, DTI, EMI) and generate multiple scenarios. For each scenario, include EMI calculations, pros, cons, and risks. At the end, give a summary recommendation, major risk flags, and next steps.
+AGENT2_SYSTEM_PROMPT = """You are a financial analysis expert. When provided with a user's profile, financial data, loan offers, and requirements, produce a comprehensive, human-readable loan analysis in the following structured format. Use a professional, clear, and concise tone, explaining any necessary jargon. Key metrics (monthly income, existing obligations, liquidity after buffer, DTI, EMI) and loan scenarios are pre-computed in the context; use those figures exactly as given and never recalculate them. For each scenario you present, include its figures, pros, cons, and risks. At the end, give a summary recommendation, major risk flags, and next steps.
 
 Template for output (fill in actual values):
 [Brief context: purpose and amount]
@@ -68,15 +74,12 @@ Next steps: [
 ]
 
 Instructions:
-- Parse and normalize input values (amounts, rates, tenures).
-- Calculate EMIs for each loan scenario: principal, interest rate, tenure.
-- Compute DTI_after = (existing EMI burden + new EMI) / monthly income, and check against risk tolerance thresholds.
-- Determine available liquidity: total liquid assets minus emergency buffer; ensure down payment choices respect buffer preference.
+- Take EMIs, total interest, DTI and liquidity figures from the pre-computed scenarios; do not do any arithmetic yourself.
+- Present the top 2-3 pre-computed scenarios, preferring feasible ones; mention when none are feasible.
 - Factor credit score & history: if score or utilization suggests higher rate or need for credit improvement, note it.
-- Incorporate income stability: if income fixed or known future changes, adjust capacity accordingly.
-- Account for existing liabilities: sum of EMIs, upcoming commitments.
-- Use loan offers: for each offer and feasible tenure/down-payment, simulate EMI and total interest.
-- Generate alternative or delay scenarios if straightforward loan is suboptimal (e.g., insufficient buffer, high DTI, credit issues).
+- Incorporate income stability: if income fixed or known future changes, weigh the pre-computed DTI accordingly.
+- Account for upcoming commitments from the conversation against the liquidity left after each scenario.
+- Suggest alternative or delay scenarios if straightforward loan is suboptimal (e.g., insufficient buffer, high DTI, credit issues).
 - For each scenario, articulate:
    • EMI and what percentage of income it represents.
    • Total interest cost over the tenure.
@@ -99,6 +102,52 @@ llm = ChatOpenAI(
     temperature=0.7
 )
 
+# Model used to fold old exchanges into the rolling conversation summary
+summary_llm = ChatOpenAI(
+    model="gpt-4o-mini",
+    api_key=settings.openai_api_key,
+    temperature=0
+)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between FinBuddy, a financial advisor, and a user.
+Update the existing summary with the new messages below. Keep every financial fact (amounts, incomes, expenses, dependents, plans, decisions) and drop small talk. Reply with the updated summary only, in at most 150 words.
+
+Existing summary:
+{summary}
+
+New messages:
+{transcript}
+"""
+
+# Analyses started while waiting for the user's confirmation, per thread
+speculative_analyses = SpeculativeTasks()
+
+# Model calls carrying this tag are the replies shown to the user; their tokens
+# are forwarded by stream_chat while the extraction call stays internal.
+REPLY_TAG = "agent_reply"
+
+# Graph node name -> agent label used in streamed events
+AGENT_NAMES = {
+    "conversation_agent": "conversation",
+    "extract_info": "conversation",
+    "analysis_agent": "analysis",
+}
+
+def _replay_reply(agent: str, text: str) -> None:
+    """Stream an already generated reply as tokens, word by word.
+
+    Replies computed outside the running graph (a speculative or cached
+    analysis) produced no tokens in it; this lets stream_chat forward them
+    like a model reply instead of leaving the user waiting for one message.
+    """
+    write = get_stream_writer()
+    for piece in re.findall(r"\s*\S+", text):
+        write({"agent": agent, "delta": piece})
+
+# Fields of chat_info; the first three are required before analysis
+CHAT_INFO_FIELDS = ("income_details", "upcoming_spends", "dependents_info", "additional_info")
+REQUIRED_INFO_FIELDS = ("income_details", "upcoming_spends", "dependents_info")
+
 # Pydantic model for structured extraction
 class ExtractedInfo(BaseModel):
     income_details: Optional[str] = Field(description="Details about user's income sources, salary, bonuses, rental income, expected changes")
@@ -107,23 +156,40 @@ class ExtractedInfo(BaseModel):
     additional_info: Optional[str] = Field(description="Any other relevant financial information the user mentioned")
     purchase_amount: Optional[float] = Field(description="The amount of the purchase/loan the user is considering (in rupees, not lakhs)")
     purchase_type: Optional[str] = Field(description="Type of purchase - car, house, etc.")
-    all_info_collected: bool = Field(description="Whether all 4 main pieces of information have been collected")
 
-def extract_info_from_messages(messages: List[BaseMessage]) -> Dict[str, Any]:
-    """Extract collected information from conversation history using LLM."""
+def merge_chat_info(chat_info: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Overlay the non-empty fields of an extraction delta onto chat_info."""
+    merged = {field: (chat_info or {}).get(field) for field in CHAT_INFO_FIELDS}
+    for field in CHAT_INFO_FIELDS:
+        if updates.get(field):
+            merged[field] = updates[field]
+    return merged
+
+async def extract_info_from_exchange(
+    chat_info: Dict[str, Any],
+    user_message: Optional[BaseMessage],
+    assistant_message: Optional[BaseMessage],
+) -> tuple:
+    """Update chat_info from the latest user/assistant exchange using LLM.
+
+    Only the new exchange and the information collected so far are sent, so
+    the cost of each extraction stays constant as the conversation grows.
+    Returns the merged chat_info, the purchase amount if one was mentioned and
+    whether all required information has been collected.
+    """
     
     # Create parser for structured output
     parser = PydanticOutputParser(pydantic_object=ExtractedInfo)
     
-    # Combine all messages into a conversation transcript
-    conversation_transcript = "\n".join([
+    exchange = "\n".join(
         f"{'User' if isinstance(msg, HumanMessage) else 'Assistant'}: {msg.content}"
-        for msg in messages
-    ])
+        for msg in (user_message, assistant_message)
+        if msg is not None
+    )
     
     # Create extraction prompt
     extraction_prompt = f"""
-    Extract the following information from this conversation between a financial advisor and a user:
+    Update the information collected so far in a conversation between a financial advisor and a user, using only the latest exchange:
     
     1. Income details (salary, other sources, expected changes)
     2. Upcoming big spends (wedding, education, medical, travel, etc.)
@@ -131,14 +197,18 @@ def extract_info_from_messages(messages: List[BaseMessage]) -> Dict[str, Any]:
     4. Any additional relevant information
     5. Purchase amount and type if mentioned
     
-    Conversation:
-    {conversation_transcript}
+    Information collected so far:
+    {json.dumps(merge_chat_info(chat_info, {}))}
+    
+    Latest exchange:
+    {exchange}
     
     {parser.get_format_instructions()}
     
     Note: 
+    - Return null for every field the latest exchange does not add to or change
+    - When a field changes, return its complete new value, combining what was collected so far with the new details
     - For purchase_amount, convert lakhs to actual rupees (e.g., 45 lakhs = 4500000)
-    - Set all_info_collected to true only if income, upcoming spends, and dependents info are all present
     """
     
     try:
@@ -149,84 +219,144 @@ def extract_info_from_messages(messages: List[BaseMessage]) -> Dict[str, Any]:
             temperature=0
         )
         
-        response = extraction_llm.invoke([SystemMessage(content=extraction_prompt)])
+        response = await extraction_llm.ainvoke([SystemMessage(content=extraction_prompt)])
         extracted_data = parser.parse(response.content)
         
-        # Convert to dictionary format expected by the rest of the code
-        info = {
-            "income_details": extracted_data.income_details,
-            "upcoming_spends": extracted_data.upcoming_spends,
-            "dependents_info": extracted_data.dependents_info,
-            "additional_info": extracted_data.additional_info
-        }
-        
-        return info, extracted_data.purchase_amount, extracted_data.all_info_collected
+        info = merge_chat_info(chat_info, extracted_data.model_dump())
+        purchase_amount = extracted_data.purchase_amount
         
     except Exception as e:
         # Fallback to simple extraction if LLM fails
         print(f"LLM extraction failed: {e}, falling back to simple extraction")
         
-        info = {
-            "income_details": None,
-            "upcoming_spends": None,
-            "dependents_info": None,
-            "additional_info": None
-        }
-        car_price = None
-        
-        # Combine all user messages
-        user_messages = " ".join([msg.content for msg in messages if isinstance(msg, HumanMessage)])
+        info = merge_chat_info(chat_info, {})
+        purchase_amount = None
         
-        # Simple extraction logic as fallback
-        if any(word in user_messages.lower() for word in ["salary", "income", "earn", "rental", "bonus"]):
-            info["income_details"] = user_messages
-        
-        if any(word in user_messages.lower() for word in ["wedding", "education", "medical", "travel", "expense", "spend"]):
-            info["upcoming_spends"] = user_messages
+        user_text = user_message.content if isinstance(user_message, HumanMessage) else ""
+        keywords = {
+            "income_details": ["salary", "income", "earn", "rental", "bonus"],
+            "upcoming_spends": ["wedding", "education", "medical", "travel", "expense", "spend"],
+            "dependents_info": ["spouse", "children", "parents", "dependent", "family"],
+        }
         
-        if any(word in user_messages.lower() for word in ["spouse", "children", "parents", "dependent", "family"]):
-            info["dependents_info"] = user_messages
+        # Simple extraction logic as fallback, appending to what we already know
+        for field, words in keywords.items():
+            if any(word in user_text.lower() for word in words):
+                info[field] = f"{info[field]} {user_text}" if info[field] else user_text
         
         # Extract car price if mentioned
-        price_match = re.search(r'(?:₹|Rs\.?|INR)?\s*(\d+(?:\.\d+)?)\s*(?:L|lakh|lakhs|lac|lacs)', user_messages, re.IGNORECASE)
+        price_match = re.search(r'(?:₹|Rs\.?|INR)?\s*(\d+(?:\.\d+)?)\s*(?:L|lakh|lakhs|lac|lacs)', user_text, re.IGNORECASE)
         if price_match:
-            car_price = float(price_match.group(1)) * 100000
-        
-        all_collected = all([
-            info["income_details"],
-            info["upcoming_spends"],
-            info["dependents_info"]
-        ])
-        
-        return info, car_price, all_collected
+            purchase_amount = float(price_match.group(1)) * 100000
+    
+    all_collected = all(info[field] for field in REQUIRED_INFO_FIELDS)
+    
+    return info, purchase_amount, all_collected
 
-def conversation_agent(state: AgentState) -> Dict[str, Any]:
+async def conversation_agent(state: AgentState) -> Dict[str, Any]:
     """Agent 1: Handles conversation with the user to collect information."""
-    messages = state['messages']
     current_phase = state.get('current_phase', 'collecting_info')
     chat_info = state.get('chat_info', {})
     
     # Format the system prompt with current state
+    collected = {key: value for key, value in (chat_info or {}).items() if value}
     system_prompt = AGENT1_SYSTEM_PROMPT.format(
         current_phase=current_phase,
-        chat_info=json.dumps(chat_info, indent=2) if chat_info else "None"
+        chat_info=json.dumps(collected) if collected else "None",
+        conversation_summary=state.get('conversation_summary') or "None"
     )
     
-    # Ensure system message is first
-    if not messages or not isinstance(messages[0], SystemMessage):
-        messages = [SystemMessage(content=system_prompt)] + messages
-    else:
-        messages[0] = SystemMessage(content=system_prompt)
+    # Only the recent window goes verbatim; older turns live in the summary
+    messages = [SystemMessage(content=system_prompt)] + recent_window(state['messages'])
     
     # Get response from LLM
-    response = llm.invoke(messages)
-    
-    # Extract information from conversation
-    info, purchase_amount, all_collected = extract_info_from_messages(messages + [response])
+    response = await llm.ainvoke(messages, config={"tags": [REPLY_TAG]})
     
-    # Update state
+    # Update state. Information extraction runs in the extract_info step after
+    # this reply has been streamed, so the user only waits for one model call.
     updates = {
         "messages": [response],
+        "analysis_confirmed": False
+    }
+    
+    # Check if this is a response after user confirmed
+    if messages and isinstance(messages[-1], HumanMessage):
+        last_user_message = messages[-1].content.lower()
+        confirmation_words = ['yes', 'sure', 'okay', 'proceed', 'go ahead', 'analyze']
+        
+        if current_phase == 'confirming_analysis' and any(word in last_user_message for word in confirmation_words):
+            updates["analysis_confirmed"] = True
+            # Ask the client to open the analysis page while it is computed;
+            # stream_chat's caller delivers it (see the redirect event)
+            get_stream_writer()({"redirect_to": "/analysis"})
+            print(f"✅ Requested redirect to /analysis for user {state.get('user_id')}")
+    
+    return updates
+
+def _window_start(messages: List[BaseMessage]) -> int:
+    """Index where the last `chat_history_window` exchanges begin."""
+    start = max(len(messages) - settings.chat_history_window * 2, 0)
+    # Never open the window on an assistant reply whose question was cut off
+    while start < len(messages) - 1 and not isinstance(messages[start], HumanMessage):
+        start += 1
+    return start
+
+def recent_window(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """The most recent exchanges that are sent to the model verbatim."""
+    return messages[_window_start(messages):]
+
+async def summarize_history(state: AgentState) -> Dict[str, Any]:
+    """Fold exchanges that fell out of the window into the rolling summary.
+
+    Folding waits until `chat_summary_batch` exchanges have accumulated past
+    the window so the summary is not rewritten on every turn. Folded messages
+    are removed from state, which keeps checkpoints bounded as well.
+    """
+    messages = state['messages']
+    if len(messages) <= (settings.chat_history_window + settings.chat_summary_batch) * 2:
+        return {}
+    
+    older = messages[:_window_start(messages)]
+    if not older:
+        return {}
+    
+    transcript = "\n".join(
+        f"{'User' if isinstance(msg, HumanMessage) else 'Assistant'}: {msg.content}"
+        for msg in older
+    )
+    try:
+        response = await summary_llm.ainvoke([SystemMessage(content=SUMMARY_PROMPT.format(
+            summary=state.get('conversation_summary') or "None",
+            transcript=transcript
+        ))])
+    except Exception as e:
+        # Keep the messages and retry folding on a later turn
+        print(f"History summarization failed: {e}")
+        return {}
+    
+    return {
+        "conversation_summary": response.content,
+        "messages": [RemoveMessage(id=msg.id) for msg in older]
+    }
+
+async def extract_info(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Follow-up step: update chat_info from the exchange that was just streamed.
+
+    Once the graph is waiting for the user to confirm, the analysis is started
+    in the background so it is ready (or under way) when they say yes. It is
+    restarted whenever the collected inputs change.
+    """
+    messages = state['messages']
+    current_phase = state.get('current_phase', 'collecting_info')
+    response = messages[-1]
+    last_user_message = messages[-2] if len(messages) > 1 and isinstance(messages[-2], HumanMessage) else None
+    
+    # Extract information from the latest exchange only
+    info, purchase_amount, all_collected = await extract_info_from_exchange(
+        state.get('chat_info', {}), last_user_message, response
+    )
+    
+    updates = {
         "chat_info": info,
         "all_info_collected": all_collected
     }
@@ -240,154 +370,220 @@ def conversation_agent(state: AgentState) -> Dict[str, Any]:
     
     # Force confirmation message if all info collected but not yet confirming
     if all_collected and current_phase == 'collecting_info' and not any(phrase in response.content.lower() for phrase in ["shall i analyze", "should i analyze", "ready to analyze"]):
-        # Override the response to ask for confirmation
+        # Replace the streamed reply (same message id) with one that asks for confirmation
         confirmation_msg = f"""{response.content}
 
 I have gathered all the information I need. Shall I analyze your loan options now?"""
-        response = AIMessage(content=confirmation_msg)
-        updates["messages"] = [response]
+        updates["messages"] = [AIMessage(content=confirmation_msg, id=response.id)]
         updates["current_phase"] = "confirming_analysis"
     
-    # Check if this is a response after user confirmed
-    if messages and isinstance(messages[-1], HumanMessage):
-        last_user_message = messages[-1].content.lower()
-        confirmation_words = ['yes', 'sure', 'okay', 'proceed', 'go ahead', 'analyze']
-        
-        if current_phase == 'confirming_analysis' and any(word in last_user_message for word in confirmation_words):
-            # Send WebSocket redirect if we have a user_id
-            user_id = state.get('user_id')
-            if user_id:
-                # Use asyncio.create_task to avoid event loop conflict
-                try:
-                    # Schedule the redirect to be sent asynchronously
-                    asyncio.create_task(manager.send_redirect(str(user_id), "/analysis"))
-                    print(f"✅ Scheduled WebSocket redirect to /analysis for user {user_id}")
-                except Exception as e:
-                    print(f"❌ Error scheduling redirect: {e}")
+    thread_id = config["configurable"]["thread_id"]
+    if updates.get("current_phase", current_phase) == "confirming_analysis" and all_collected:
+        user_id = state.get('user_id')
+        car_price = updates.get("car_price", state.get('car_price'))
+        key = _analysis_inputs_key({"user_id": user_id, "chat_info": info, "car_price": car_price})
+        speculative_analyses.start(
+            thread_id, key, lambda: compute_analysis(user_id, info, car_price)
+        )
+    else:
+        speculative_analyses.discard(thread_id)
     
     return updates
 
-def fetch_user_data(user_id: int, db: Session) -> tuple:
-    """Fetch user profile, financials, and bank quotes from database."""
-    # Get user with financials
-    user = db.query(models.user_profile.User).filter(
-        models.user_profile.User.id == user_id
-    ).first()
+async def fetch_user_data(user_id: int) -> Optional[UserContext]:
+    """Fetch the user's profile, financials summary and bank quotes (cached)."""
+    return await user_context_cache.get(user_id)
+
+async def compute_analysis(user_id: Optional[int], chat_info: Dict[str, Any], car_price: Optional[float]) -> tuple:
+    """Build the financial analysis for the given inputs.
+
+    Returns the state update for analysis_agent and whether the analysis was
+    freshly generated (False for errors and cache hits).
+    """
+    if not user_id:
+        return {
+            "messages": [AIMessage(content="I need your user ID to perform the analysis. Please provide it.")],
+            "current_phase": "error"
+        }, False
     
-    if not user:
-        return None, None, []
+    # Fetch user data
+    context = await fetch_user_data(user_id)
     
-    # Get bank quotes
-    bank_quotes = db.query(models.bank_quote.BankQuote).filter(
-        models.bank_quote.BankQuote.user_id == user_id
-    ).all()
+    if context is None:
+        return {
+            "messages": [AIMessage(content="I couldn't find your user profile. Please make sure you're registered.")],
+            "current_phase": "error"
+        }, False
+    user, financials, profile, bank_quotes = (
+        context.user, context.financials, context.profile, context.bank_quotes
+    )
     
-    return user, user.financials if user else None, bank_quotes
-
-def analysis_agent(state: AgentState) -> Dict[str, Any]:
-    """Agent 2: Performs financial analysis based on collected information."""
-    # Get database session
-    db = next(get_db())
+    # Prepare analysis context
+    analysis_context = f"""
+    User Profile:
+    - Name: {user.full_name}
+    - Age: {(datetime.now().date() - user.date_of_birth).days // 365 if user.date_of_birth else 'Unknown'}
     
-    try:
-        # Fetch user data
-        user_id = state.get('user_id')
-        if not user_id:
-            return {
-                "messages": [AIMessage(content="I need your user ID to perform the analysis. Please provide it.")],
-                "current_phase": "error"
-            }
-        
-        user, financials, bank_quotes = fetch_user_data(user_id, db)
-        
-        if not user:
-            return {
-                "messages": [AIMessage(content="I couldn't find your user profile. Please make sure you're registered.")],
-                "current_phase": "error"
-            }
-        
-        # Prepare analysis context
-        analysis_context = f"""
-        User Profile:
-        - Name: {user.full_name}
-        - Age: {(datetime.now().date() - user.date_of_birth).days // 365 if user.date_of_birth else 'Unknown'}
-        
-        Financial Information:
-        - Credit Score: {financials.credit_score if financials else 'Not available'}
-        - Total Income: {financials.total_income if financials else 'Not available'}
-        - Active Loans: {financials.active_loans_count if financials else 0}
-        
-        User Requirements (from conversation):
-        - Income Details: {state['chat_info'].get('income_details', 'Not provided')}
-        - Upcoming Expenses: {state['chat_info'].get('upcoming_spends', 'Not provided')}
-        - Dependents: {state['chat_info'].get('dependents_info', 'Not provided')}
-        - Additional Info: {state['chat_info'].get('additional_info', 'Not provided')}
-        
-        Purchase Details:
-        - Amount: ₹{state.get('car_price', 0):,.0f}
-        
-        Available Bank Quotes:
-        """
-        
-        if bank_quotes:
-            for quote in bank_quotes:
-                analysis_context += f"""
-        - Bank Quote {quote.id} ({quote.bank_name}):
-          Amount: ₹{quote.amount:,.0f}
-          Tenure: {quote.tenure} months
-          Interest Rate: {quote.interest_rate}%
-          EMI: ₹{quote.emi:,.0f}
-        """
-        else:
-            analysis_context += "\n        No bank quotes available. Using hypothetical rates for analysis."
+    Financial Information:
+    - Credit Score: {financials.credit_score if financials else 'Not available'}
+    - Total Income: {financials.total_income if financials else 'Not available'}
+    - Active Loans: {financials.active_loans_count if financials else 0}
+    
+    User Requirements (from conversation):
+    - Income Details: {chat_info.get('income_details', 'Not provided')}
+    - Upcoming Expenses: {chat_info.get('upcoming_spends', 'Not provided')}
+    - Dependents: {chat_info.get('dependents_info', 'Not provided')}
+    - Additional Info: {chat_info.get('additional_info', 'Not provided')}
+    
+    Purchase Details:
+    - Amount: ₹{car_price or 0:,.0f}
+    
+    Available Bank Quotes:
+    """
+    
+    if bank_quotes:
+        for quote in bank_quotes:
+            analysis_context += f"""
+    - Bank Quote {quote.id} ({quote.bank_name}):
+      Amount: ₹{quote.amount:,.0f}
+      Tenure: {quote.tenure} months
+      Interest Rate: {quote.interest_rate}%
+      EMI: ₹{quote.emi:,.0f}
+    """
+    else:
+        analysis_context += "\n        No bank quotes available. Using hypothetical rates for analysis."
+    
+    # Compute the numbers locally so the LLM only writes the narrative
+    scenarios = build_scenarios(bank_quotes, profile, car_price)
+    
+    # Reuse the previous analysis when none of its inputs changed
+    fingerprint = analysis_fingerprint(
+        user, financials, profile, bank_quotes, chat_info, car_price
+    )
+    analysis_result = analysis_cache.get(user_id, fingerprint)
+    fresh = analysis_result is None
+    
+    if fresh:
+        analysis_context += "\n" + format_for_prompt(profile, scenarios)
         
         # Create analysis prompt
         analysis_prompt = f"{AGENT2_SYSTEM_PROMPT}\n\nContext:\n{analysis_context}\n\nProvide a comprehensive financial analysis."
         
         # Get analysis from LLM
-        response = llm.invoke([SystemMessage(content=analysis_prompt)])
-        
-        # Save chat info to database
-        if state['chat_info']:
-            chat_info_data = state['chat_info']
-            db_chat_info = models.user_chat_info_model.UserChatInfo(
-                **chat_info_data,
-                user_id=user_id
-            )
-            db.add(db_chat_info)
-            db.commit()
-        
-        # For now, return the analysis as a message
-        # In production, you'd parse this into the structured format and save to database
-        return {
-            "messages": [AIMessage(content=f"Here's my analysis:\n\n{response.content}")],
-            "current_phase": "discussing_results",
-            "analysis_result": {"raw_analysis": response.content}
+        response = await llm.ainvoke(
+            [SystemMessage(content=analysis_prompt)], config={"tags": [REPLY_TAG]}
+        )
+        analysis_result = {
+            "raw_analysis": response.content,
+            "scenarios": [
+                {
+                    "scenarioName": scenario.scenario_name,
+                    "assumptions": scenario.assumptions.model_dump(),
+                    "calculations": scenario.calculations.model_dump(),
+                    "feasible": scenario.feasible,
+                }
+                for scenario in scenarios
+            ],
         }
-        
-    finally:
-        db.close()
+        analysis_cache.set(user_id, fingerprint, analysis_result)
+    
+    # For now, return the analysis as a message
+    # In production, you'd parse this into the structured format and save to database
+    return {
+        "messages": [AIMessage(content=f"Here's my analysis:\n\n{analysis_result['raw_analysis']}")],
+        "current_phase": "discussing_results",
+        "analysis_result": analysis_result
+    }, fresh
+
+def _analysis_inputs_key(state: AgentState) -> str:
+    """Identifies the conversation inputs a speculative analysis was built from."""
+    return json.dumps(
+        [state.get('user_id'), state.get('chat_info') or {}, state.get('car_price')],
+        sort_keys=True,
+        default=str
+    )
+
+async def analysis_agent(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Agent 2: Performs financial analysis based on collected information.
+
+    Picks up the speculative analysis started when confirmation was requested
+    (awaiting it if still running); otherwise computes the analysis now.
+    """
+    user_id = state.get('user_id')
+    chat_info = state.get('chat_info') or {}
+    
+    result = None
+    streamed = False
+    task = speculative_analyses.take(config["configurable"]["thread_id"], _analysis_inputs_key(state))
+    if task is not None:
+        try:
+            result = await task
+            print(f"⚡ Using speculative analysis for user {user_id}")
+        except (asyncio.CancelledError, Exception) as e:
+            print(f"Speculative analysis unusable ({e!r}), computing it now")
+    
+    if result is None:
+        result = await compute_analysis(user_id, chat_info, state.get('car_price'))
+        streamed = result[1]  # a fresh analysis streamed its model call
+    updates, fresh = result
+    
+    if not streamed and updates.get("analysis_result"):
+        _replay_reply("analysis", updates["analysis_result"]["raw_analysis"])
+    
+    # Save chat info and the materialized latest analysis (a cached analysis
+    # means they are already stored)
+    if fresh:
+        analysis_result = updates["analysis_result"]
+        async with AsyncSessionLocal() as db:
+            if chat_info:
+                db.add(models.user_chat_info_model.UserChatInfo(**chat_info, user_id=user_id))
+            await save_latest_analysis(
+                db,
+                user_id,
+                raw_analysis=analysis_result["raw_analysis"],
+                scenarios=analysis_result["scenarios"],
+            )
+            await db.commit()
+    
+    return updates
+
+
+# Words of a plain confirmation ("Yes, go ahead please!"): nothing to extract
+BARE_CONFIRMATION_WORDS = {
+    "yes", "yeah", "yep", "sure", "ok", "okay", "proceed", "go", "ahead",
+    "please", "analyze", "analyse", "do", "it", "now", "lets", "let's", "thanks",
+}
+
+def _is_bare_confirmation(text: str) -> bool:
+    words = re.findall(r"[a-z']+", text.lower())
+    return bool(words) and all(word in BARE_CONFIRMATION_WORDS for word in words)
 
 def route_agent(state: AgentState) -> str:
     """Determine which agent to route to based on current state."""
-    current_phase = state.get('current_phase', 'collecting_info')
     messages = state.get('messages', [])
     
-    # Check if user confirmed analysis
-    if messages and isinstance(messages[-1], HumanMessage):
-        last_message = messages[-1].content.lower()
-        if current_phase == 'confirming_analysis' and any(word in last_message for word in ['yes', 'sure', 'okay', 'proceed', 'go ahead', 'analyze']):
-            return 'analysis_agent'
+    # conversation_agent flagged a confirmation. A plain "yes" goes straight
+    # to the analysis; anything more ("yes, but my salary changed to...") is
+    # extracted first so the analysis sees it.
+    last_user_message = next((msg for msg in reversed(messages) if isinstance(msg, HumanMessage)), None)
+    if state.get('analysis_confirmed') and last_user_message and _is_bare_confirmation(last_user_message.content):
+        return 'analysis_agent'
     
-    # Default to end the conversation (which maps to END)
-    return 'conversation_agent'
+    # Otherwise extract information from the exchange
+    return 'extract_info'
+
+def route_after_extract(state: AgentState) -> str:
+    """Run the confirmed analysis once the confirmation has been extracted."""
+    return 'analysis_agent' if state.get('analysis_confirmed') else END
 
 # Define the graph
 workflow = StateGraph(AgentState)
 
 # Add the nodes
 workflow.add_node("conversation_agent", conversation_agent)
+workflow.add_node("extract_info", extract_info)
 workflow.add_node("analysis_agent", analysis_agent)
+workflow.add_node("summarize_history", summarize_history)
 
 # Set the entrypoint
 workflow.set_entry_point("conversation_agent")
@@ -397,47 +593,96 @@ workflow.add_conditional_edges(
     "conversation_agent",
     route_agent,
     {
-        "conversation_agent": END,  # End after conversation response
+        "extract_info": "extract_info",
         "analysis_agent": "analysis_agent"
     }
 )
 
+# Extraction ends the turn after a conversation response, unless the user
+# confirmed the analysis in the same message
+workflow.add_conditional_edges(
+    "extract_info",
+    route_after_extract,
+    {
+        "analysis_agent": "analysis_agent",
+        END: END
+    }
+)
+
+# History folding runs alongside whichever branch follows the reply
+workflow.add_edge("conversation_agent", "summarize_history")
+workflow.add_edge("summarize_history", END)
+
 # Analysis agent ends after providing analysis
 workflow.add_edge("analysis_agent", END)
 
-# Compile the graph
-memory = MemorySaver()
+# Compile the graph. Checkpoints are persisted in the application database so
+# conversations survive restarts and are shared across workers.
+memory = SQLCheckpointSaver(
+    SessionLocal,
+    cache_size=settings.checkpoint_cache_size,
+    idle_ttl=settings.checkpoint_idle_ttl_seconds,
+    max_threads=settings.checkpoint_max_threads,
+)
 app = workflow.compile(checkpointer=memory)
 
 # Add a streaming method to the app
-def stream_chat(messages: list, config: dict, user_id: int = None):
-    """Stream chat responses."""
+async def stream_chat(messages: list, config: dict, user_id: int = None):
+    """Stream chat events token by token without blocking the event loop.
+
+    Yields dictionaries of five kinds:
+    - ``{"type": "token", "agent", "delta"}`` for every reply token; clients
+      append the deltas (resending the whole reply per token would make a
+      reply O(n^2) bytes).
+    - ``{"type": "message", "agent", "content"}`` with the final text of a reply
+      once its node finishes. It can differ from the streamed tokens, e.g. when
+      the confirmation question is appended.
+    - ``{"type": "analysis", "analysis_result"}`` once the analysis node has
+      produced its result, so it can be pushed without another request.
+    - ``{"type": "redirect", "redirect_to"}`` when the client should move to
+      another page (the analysis, once confirmed). Callers deliver it: on the
+      chat socket it is a frame of the session, otherwise it goes out through
+      ``manager.send_redirect``.
+    - A closing ``{"type": "done", "chat_info", "all_info_collected",
+      "current_phase", "car_price"}`` with the updated state.
+    """
     # Prepare the input for the graph - only provide new messages and user_id
     # Let LangGraph load existing state from memory (current_phase, chat_info, etc.)
     inputs = {
         "messages": messages,
         "user_id": user_id
     }
-    
-    # Use stream_mode='values' to get the full state after each node
-    for chunk in app.stream(inputs, config=config, stream_mode="values"):
-        # The chunk now contains the full state
-        # We need to transform it to match the expected format
-        if "messages" in chunk and chunk["messages"]:
-            last_message = chunk["messages"][-1]
-            
-            # Yield the conversation agent output format
-            output = {
-                "conversation_agent": {
-                    "messages": [last_message],
-                    "chat_info": chunk.get("chat_info", {}),
-                    "all_info_collected": chunk.get("all_info_collected", False),
-                    "current_phase": chunk.get("current_phase", "collecting_info")
-                }
-            }
-            
-            # Include car_price if present
-            if "car_price" in chunk:
-                output["conversation_agent"]["car_price"] = chunk["car_price"]
-                
-            yield output 
\ No newline at end of file
+
+    async for mode, chunk in app.astream(inputs, config=config, stream_mode=["messages", "custom", "updates"]):
+        if mode == "custom" and "redirect_to" in chunk:
+            yield {"type": "redirect", "redirect_to": chunk["redirect_to"]}
+        elif mode == "custom":
+            # A reply replayed by _replay_reply
+            yield {"type": "token", "agent": chunk["agent"], "delta": chunk["delta"]}
+        elif mode == "messages":
+            message_chunk, metadata = chunk
+            agent = AGENT_NAMES.get(metadata.get("langgraph_node"))
+            if not agent or REPLY_TAG not in metadata.get("tags", []) or not message_chunk.content:
+                continue
+            yield {"type": "token", "agent": agent, "delta": message_chunk.content}
+        else:
+            for node, update in chunk.items():
+                agent = AGENT_NAMES.get(node)
+                if agent and update and update.get("messages"):
+                    yield {
+                        "type": "message",
+                        "agent": agent,
+                        "content": update["messages"][-1].content,
+                    }
+                if update and update.get("analysis_result"):
+                    yield {"type": "analysis", "analysis_result": update["analysis_result"]}
+
+    snapshot = await app.aget_state(config)
+    state = snapshot.values
+    yield {
+        "type": "done",
+        "chat_info": state.get("chat_info", {}),
+        "all_info_collected": state.get("all_info_collected", False),
+        "current_phase": state.get("current_phase", "collecting_info"),
+        "car_price": state.get("car_price"),
+    }
@@ -13,11 +13,10 @@ from dotenv import load_dotenv
 from livekit import agents
 from livekit.agents import JobContext, WorkerOptions, AgentSession, Agent
 from livekit.agents import ConversationItemAddedEvent
-from livekit.plugins import deepgram, elevenlabs, openai, silero
+from livekit.plugins import deepgram, elevenlabs, silero
 from livekit import rtc  # Add this import for data messages
 from app.config import settings
-from app.agents.graph import stream_chat
-from langchain_core.messages import HumanMessage, SystemMessage
+from app.agents.voice_llm import LangGraphLLM
 from uuid import uuid4
 import logging
 
@@ -28,27 +27,22 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+GREETING = (
+    "Hi, I'm FinBuddy, your financial assistant. "
+    "How can I help you with your financial needs today?"
+)
+
 class FinancialAssistant(Agent):
     def __init__(self, user_id: int = None) -> None:
-        # Instructions for the standard OpenAI LLM - aligned with our Agent1
-        instructions = """You are FinBuddy, a friendly financial advisor. Your goal is to understand the user's financial situation before analyzing loan options.
-
-        Please collect the following information naturally in conversation:
-        1. Source of income - Ask about salary, other income sources, and any expected changes (job change, salary hike, bonus, or income dip)
-        2. Upcoming big expenses - Home purchase, children's education, wedding, medical, travel, etc.
-        3. Dependents - Spouse, children, parents, and their needs
-        4. Any other relevant information they think you should know
-
-        Also, try to understand what purchase they're planning (e.g., car, house) and the approximate amount.
-
-        Be conversational and empathetic. After collecting all information, ask for confirmation: "I have gathered all the information I need. Shall I analyze your loan options now?"
-        
-        Keep your responses concise but informative, suitable for voice conversation."""
+        # Replies come from the chat graph (LangGraphLLM), which has its own
+        # prompts; these instructions only describe the agent to the session
+        instructions = """You are FinBuddy, a friendly financial advisor. Keep your responses concise, suitable for voice conversation."""
         
         super().__init__(instructions=instructions)
         
-        # LangGraph integration
-        self.session_id = str(uuid4())
+        # LangGraph integration: the voice call continues the user's chat
+        # thread (the text chat uses the user id as its session_id)
+        self.session_id = str(user_id) if user_id is not None else str(uuid4())
         self.config = {"configurable": {"thread_id": self.session_id}}
         self.user_id = user_id
         
@@ -80,16 +74,15 @@ async def entrypoint(ctx: JobContext):
     # Create our financial assistant
     financial_assistant = FinancialAssistant(user_id=user_id)
 
-    # Create session with standard OpenAI LLM
+    # Create session with the chat graph as its LLM
     session = AgentSession(
         stt=deepgram.STT(
             model="nova-2",
             api_key=settings.deepgram_api_key
         ),
-        llm=openai.LLM(
-            model="gpt-4o-mini",
-            api_key=settings.openai_api_key
-        ),  # Standard OpenAI LLM
+        # The chat graph answers each turn on the user's chat thread and
+        # streams its tokens into TTS
+        llm=LangGraphLLM(financial_assistant.session_id, user_id=financial_assistant.user_id),
         tts=elevenlabs.TTS(
             api_key=settings.elevenlabs_api_key,
             voice_id="NeDTo4pprKj2ZwuNJceH",
@@ -118,9 +111,6 @@ async def entrypoint(ctx: JobContext):
                     logger.info(f"👤 User said: {content}")
                     financial_assistant.call_status = "USER_SPOKE"
                     
-                    # Process user input through LangGraph for context/memory
-                    asyncio.create_task(_process_user_input_with_langgraph(content, financial_assistant))
-                    
                 elif conversation_event.item.role == "assistant":
                     # Agent responded
                     if financial_assistant.conversation_buffer != "":
@@ -130,50 +120,6 @@ async def entrypoint(ctx: JobContext):
                     
                     logger.info(f"🤖 Agent said: {content}")
                     financial_assistant.call_status = "AGENT_SPOKE"
-                    
-                    # Process agent response through LangGraph for context/memory
-                    asyncio.create_task(_process_agent_response_with_langgraph(content, financial_assistant))
-
-    async def _process_user_input_with_langgraph(user_input: str, assistant: FinancialAssistant):
-        """Process user input through LangGraph for enhanced context and memory."""
-        try:
-            logger.info(f"🧠 Processing user input through LangGraph: {user_input}")
-            
-            # Create message for LangGraph
-            messages = [HumanMessage(content=user_input)]
-            
-            # Process through our chat graph for context
-            for chunk in stream_chat(messages, assistant.config, user_id=assistant.user_id):
-                if "conversation_agent" in chunk:
-                    # This gives us context and memory from our conversation agent
-                    agent_messages = chunk["conversation_agent"]["messages"]
-                    if agent_messages:
-                        logger.info(f"🧠 LangGraph processed user input, context updated")
-                        # Store the current phase if available
-                        if "current_phase" in chunk["conversation_agent"]:
-                            assistant.current_phase = chunk["conversation_agent"]["current_phase"]
-                        break
-                elif "analysis_agent" in chunk:
-                    # Analysis results from Agent2
-                    agent_messages = chunk["analysis_agent"]["messages"]
-                    if agent_messages:
-                        logger.info(f"📊 Analysis completed by Agent2")
-                        break
-            
-        except Exception as e:
-            logger.error(f"❌ Error processing user input with LangGraph: {str(e)}")
-
-    async def _process_agent_response_with_langgraph(agent_response: str, assistant: FinancialAssistant):
-        """Process agent response through LangGraph to maintain conversation context."""
-        try:
-            logger.info(f"🧠 Processing agent response through LangGraph for context")
-            
-            # We can use this to maintain conversation history in LangGraph
-            # This ensures continuity between voice and text conversations
-            # For now, we'll just log it, but you could extend this to update context
-            
-        except Exception as e:
-            logger.error(f"❌ Error processing agent response with LangGraph: {str(e)}")
 
     # Start the session
     logger.info("🏁 Starting session...")
@@ -192,9 +138,8 @@ async def entrypoint(ctx: JobContext):
 
     # Generate initial greeting
     logger.info("👋 Sending initial greeting...")
-    await session.generate_reply(
-        instructions="Greet the user warmly and briefly introduce yourself as their financial assistant. Ask how you can help them with their financial needs today."
-    )
+    # Spoken directly: the graph only answers user turns
+    await session.say(GREETING)
     logger.info("✅ Initial greeting sent")
 
     # Log conversation buffer periodically for debugging
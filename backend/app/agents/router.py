@@ -5,6 +5,7 @@ import asyncio
 import json
 from uuid import uuid4
 import logging
+from typing import Optional
 
 from app.config import settings
 from .graph import stream_chat as stream_chat_graph
@@ -13,6 +14,7 @@ from livekit.api.access_token import AccessToken
 from livekit import api
 import asyncio
 from app.services.websocket_manager import manager
+from .chat_socket import ChatSocket
 
 router = APIRouter()
 
@@ -25,30 +27,52 @@ class ChatRequest(BaseModel):
     session_id: str
     user_id: int  # Add user_id to the request
 
+def _json_frame(message: str) -> Optional[dict]:
+    """A client message as a protocol frame ({"type": ...}), or None for plain text"""
+    if '"type"' not in message:
+        return None
+    try:
+        frame = json.loads(message)
+    except ValueError:
+        return None
+    return frame if isinstance(frame, dict) else None
+
 class TestRedirectRequest(BaseModel):
     user_id: str
     redirect_to: str
 
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
-    """WebSocket endpoint for real-time communication"""
-    await manager.connect(websocket, user_id)
+    """
+    WebSocket endpoint for real-time communication: server pushes (redirects,
+    heartbeats) and chat turns multiplexed by session_id (see chat_socket).
+    """
+    connection = await manager.connect(websocket, user_id)
+    if connection is None:
+        return  # Refused: this worker is at its connection limit
+    chat = ChatSocket(connection, int(user_id) if user_id.isdigit() else None)
     try:
-        # Send a welcome message to confirm connection
-        await websocket.send_text(json.dumps({
+        # Send a welcome message to confirm connection (through the
+        # connection's send queue, so it is ordered with pushed messages)
+        connection.enqueue(json.dumps({
             "type": "connection",
             "message": "Connected successfully"
         }))
         
-        # Keep connection alive - listen for any incoming messages or disconnection
+        # Listen for incoming messages until the client disconnects or the
+        # server closes the connection (idle, replaced or too slow)
         while True:
-            try:
-                # Wait for messages from client (or disconnection)
-                message = await websocket.receive_text()
-                # Echo back any messages received
-                await websocket.send_text(f"Echo: {message}")
-            except WebSocketDisconnect:
-                break  # Exit the loop when client disconnects
+            message = await connection.receive_text()
+            if message is None:
+                break
+            frame = _json_frame(message)
+            if frame is not None:
+                if frame.get("type") == "pong":
+                    continue  # Heartbeat reply; receiving it marked the connection alive
+                if chat.handle(frame):
+                    continue
+            # Echo back any messages received
+            connection.enqueue(f"Echo: {message}")
                 
     except WebSocketDisconnect:
         pass  # Normal disconnection
@@ -56,8 +80,14 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         logging.error(f"WebSocket error for user {user_id}: {e}")
     finally:
         manager.disconnect(websocket, user_id)
+        await chat.close()
         logging.info(f"User {user_id} disconnected")
 
+@router.get("/ws-stats")
+async def websocket_stats():
+    """Live connection gauges and eviction counters of this worker"""
+    return manager.stats()
+
 @router.post("/test-redirect")
 async def test_redirect(request: TestRedirectRequest):
     """Test endpoint to verify redirect functionality"""
@@ -82,18 +112,13 @@ async def chat(request: ChatRequest):
     messages = [HumanMessage(content=request.message)]
 
     async def event_stream():
-        for chunk in stream_chat_graph(messages, config, user_id=request.user_id):
-            # Handle different agent outputs
-            if "conversation_agent" in chunk:
-                # Message from conversation agent
-                content = chunk["conversation_agent"]["messages"][-1].content
-                yield f"data: {json.dumps({'content': content, 'agent': 'conversation'})}\n\n"
-                    
-            elif "analysis_agent" in chunk:
-                # Message from analysis agent
-                content = chunk["analysis_agent"]["messages"][-1].content
-                yield f"data: {json.dumps({'content': content, 'agent': 'analysis'})}\n\n"
-            await asyncio.sleep(0.01)
+        # Token events carry only their `delta`; the `message` event that
+        # follows has the reply's final text
+        async for event in stream_chat_graph(messages, config, user_id=request.user_id):
+            if event["type"] == "redirect":
+                # SSE clients follow redirects on their WebSocket
+                await manager.send_redirect(str(request.user_id), event["redirect_to"])
+            yield f"data: {json.dumps(event)}\n\n"
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
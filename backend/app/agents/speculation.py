@@ -0,0 +1,65 @@
+"""
+Registry of speculative background tasks, one per conversation thread.
+
+The chat graph starts the analysis as soon as it asks the user for
+confirmation, because the answer is almost always yes. Each task is stored
+with a key describing its inputs; claiming it with a different key (the user
+changed something in between) cancels it instead of returning stale work.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeTasks:
+    def __init__(self, max_age: float = 600):
+        # thread_id -> (inputs key, task, started at)
+        self._tasks: Dict[str, Tuple[str, asyncio.Task, float]] = {}
+        self.max_age = max_age
+
+    def _prune(self) -> None:
+        """Forget tasks nobody claimed within ``max_age`` seconds."""
+        now = time.monotonic()
+        for thread_id, (_, task, started_at) in list(self._tasks.items()):
+            if now - started_at > self.max_age:
+                task.cancel()
+                del self._tasks[thread_id]
+
+    def start(self, thread_id: str, key: str, factory: Callable[[], Awaitable[Any]]) -> None:
+        """Run ``factory()`` in the background unless the same work is already running."""
+        self._prune()
+        current = self._tasks.get(thread_id)
+        if current and current[0] == key and not current[1].cancelled():
+            return
+        self.discard(thread_id)
+
+        # Start from an empty context so the task does not inherit the
+        # callbacks of the graph run that scheduled it (and stream into it)
+        task = contextvars.Context().run(asyncio.create_task, factory())
+        task.add_done_callback(_log_failure)
+        self._tasks[thread_id] = (key, task, time.monotonic())
+        logger.info(f"Started speculative task for thread {thread_id}")
+
+    def take(self, thread_id: str, key: str) -> Optional[asyncio.Task]:
+        """Claim the task for ``thread_id`` if it was started with ``key``."""
+        entry = self._tasks.pop(thread_id, None)
+        if entry is None:
+            return None
+        if entry[0] != key or entry[1].cancelled():
+            entry[1].cancel()
+            return None
+        return entry[1]
+
+    def discard(self, thread_id: str) -> None:
+        entry = self._tasks.pop(thread_id, None)
+        if entry is not None:
+            entry[1].cancel()
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Speculative task failed: {task.exception()}")
@@ -10,7 +10,9 @@ class AgentState(TypedDict):
     user_financials: Optional[Dict[str, Any]]
     bank_quotes: Optional[List[Dict[str, Any]]]
     chat_info: Dict[str, Any]
+    conversation_summary: Optional[str]  # Rolling summary of exchanges outside the history window
     analysis_result: Optional[Dict[str, Any]]
     current_phase: str  # "collecting_info", "confirming_analysis", "analyzing", "discussing_results"
     car_price: Optional[float]  # Extracted from conversation
-    all_info_collected: bool  # Flag to track if all 4 pieces of info are collected 
\ No newline at end of file
+    all_info_collected: bool  # Flag to track if all 4 pieces of info are collected
+    analysis_confirmed: bool  # The latest user message confirmed the analysis 
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+LiveKit ``llm.LLM`` backed by the chat graph.
+
+``AgentSession`` calls ``chat()`` once per user turn. Instead of asking a model
+of its own, the stream runs the turn through ``stream_chat`` on the session's
+graph thread and forwards the reply tokens as they arrive, so TTS starts on
+the first token and voice and text share one state machine (phases,
+extraction, analysis, redirects). The graph keeps the history in its
+checkpointer, so only the newest user message of the chat context is sent.
+"""
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+from livekit.agents import APIConnectOptions, llm, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
+from langchain_core.messages import HumanMessage
+
+from app.services.websocket_manager import manager
+from .graph import stream_chat
+
+logger = logging.getLogger(__name__)
+
+
+class LangGraphLLM(llm.LLM):
+    """Answers voice turns with the graph thread ``session_id``."""
+
+    def __init__(self, session_id: str, user_id: Optional[int] = None) -> None:
+        super().__init__()
+        self.session_id = session_id
+        self.user_id = user_id
+
+    @property
+    def model(self) -> str:
+        return "langgraph"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict] = NOT_GIVEN,
+    ) -> "LangGraphStream":
+        # Tools are the graph's business; the session has none to offer it
+        return LangGraphStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+def _latest_user_text(chat_ctx: llm.ChatContext) -> Optional[str]:
+    """Text of the last message if the user sent it, else None (nothing new to answer)."""
+    for item in reversed(chat_ctx.items):
+        if getattr(item, "type", None) != "message" or item.role in ("system", "developer"):
+            continue
+        if item.role != "user":
+            return None
+        return item.text_content or None
+    return None
+
+
+async def _spoken_deltas(events: AsyncIterator[Dict[str, Any]], user_id: Optional[int]) -> AsyncIterator[str]:
+    """The text to voice, piece by piece, from ``stream_chat`` events.
+
+    Reply tokens are voiced as they come. A node's final message is voiced
+    only for what it adds to the streamed text (the confirmation question
+    appended to a reply, or a cached analysis that was never streamed); a
+    final text that does not extend what was spoken is not repeated.
+    """
+    # Text already spoken per agent
+    spoken: Dict[str, str] = {}
+    async for event in events:
+        if event["type"] == "redirect":
+            # The user's browser follows it on their WebSocket
+            await manager.send_redirect(str(user_id), event["redirect_to"])
+            continue
+        if event["type"] == "token":
+            delta = event["delta"]
+            spoken[event["agent"]] = spoken.get(event["agent"], "") + delta
+        elif event["type"] == "message":
+            already = spoken.get(event["agent"], "")
+            content = event["content"]
+            if not content.startswith(already):
+                continue
+            delta = content[len(already):]
+            spoken[event["agent"]] = content
+        else:
+            continue
+        if delta:
+            yield delta
+
+
+class LangGraphStream(llm.LLMStream):
+    async def _run(self) -> None:
+        text = _latest_user_text(self._chat_ctx)
+        if text is None:
+            logger.warning("Voice turn without a new user message; nothing to answer")
+            return
+
+        graph_llm: LangGraphLLM = self._llm
+        config = {"configurable": {"thread_id": graph_llm.session_id}}
+        request_id = utils.shortuuid("LG_")
+        events = stream_chat([HumanMessage(content=text)], config, user_id=graph_llm.user_id)
+        async for delta in _spoken_deltas(events, graph_llm.user_id):
+            self._event_ch.send_nowait(
+                llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(role="assistant", content=delta))
+            )
@@ -15,6 +15,53 @@ class Settings(BaseSettings):
     deepgram_api_key: str = os.getenv("DEEPGRAM_API_KEY", "")
     elevenlabs_api_key: str = os.getenv("ELEVENLABS_API_KEY", "")
 
+    # Conversation checkpoints
+    checkpoint_cache_size: int = int(os.getenv("CHECKPOINT_CACHE_SIZE", "256"))
+    checkpoint_idle_ttl_seconds: int = int(os.getenv("CHECKPOINT_IDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+    checkpoint_max_threads: int = int(os.getenv("CHECKPOINT_MAX_THREADS", "100000"))
+
+    # Conversation history sent to the model: exchanges kept verbatim, and how
+    # many more may pile up before they are folded into the rolling summary
+    chat_history_window: int = int(os.getenv("CHAT_HISTORY_WINDOW", "4"))
+    chat_summary_batch: int = int(os.getenv("CHAT_SUMMARY_BATCH", "2"))
+
+    # Analysis results reused while their inputs are unchanged
+    analysis_cache_size: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "512"))
+    analysis_cache_ttl_seconds: int = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+
+    # User context (profile, financials summary, bank quotes) read-through
+    # cache; set USER_CONTEXT_CACHE_URL (redis://...) to share it across workers
+    user_context_cache_size: int = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "1024"))
+    user_context_cache_ttl_seconds: int = int(os.getenv("USER_CONTEXT_CACHE_TTL_SECONDS", "300"))
+    user_context_cache_url: str = os.getenv("USER_CONTEXT_CACHE_URL", "")
+
+    # Upper bound on the process pool an HTTP ingestion request may ask for
+    # (the default is none: batches are prepared in the server process)
+    ingestion_api_max_workers: int = int(os.getenv("INGESTION_API_MAX_WORKERS", "2"))
+
+    # Pre-encoded JSON documents (fixtures and materialized per-user documents)
+    document_cache_size: int = int(os.getenv("DOCUMENT_CACHE_SIZE", "4096"))
+
+    # WebSocket fan-out across workers: empty for in-process delivery, or a
+    # redis:// or postgresql:// URL (LISTEN/NOTIFY) shared by every worker
+    websocket_broker_url: str = os.getenv("WEBSOCKET_BROKER_URL", "")
+    websocket_broker_channel: str = os.getenv("WEBSOCKET_BROKER_CHANNEL", "finbuddy_websocket")
+
+    # Per-connection outbound queues: how many messages may wait for a slow
+    # client, what happens when it falls behind ("drop" the oldest message
+    # or "close" the connection) and how long a single send may block
+    websocket_send_queue_size: int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "256"))
+    websocket_slow_consumer_policy: str = os.getenv("WEBSOCKET_SLOW_CONSUMER_POLICY", "close")
+    websocket_send_timeout_seconds: float = float(os.getenv("WEBSOCKET_SEND_TIMEOUT_SECONDS", "10"))
+
+    # WebSocket liveness and limits: the server pings every interval and
+    # evicts connections it has not heard from (pongs included) within the
+    # idle timeout; connections are capped per worker and per user
+    websocket_heartbeat_interval_seconds: float = float(os.getenv("WEBSOCKET_HEARTBEAT_INTERVAL_SECONDS", "20"))
+    websocket_idle_timeout_seconds: float = float(os.getenv("WEBSOCKET_IDLE_TIMEOUT_SECONDS", "60"))
+    websocket_max_connections: int = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS", "10000"))
+    websocket_max_connections_per_user: int = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS_PER_USER", "5"))
+
     class Config:
         case_sensitive = True
 
@@ -2,4 +2,6 @@ from .user_profile import User
 from .user_financials_model import UserFinancials
 from .bank_quote import BankQuote
 from .user_chat_info_model import UserChatInfo
-from .financial_analysis import FinancialAnalysis
\ No newline at end of file
+from .financial_analysis import FinancialAnalysis, UserLatestAnalysis
+from .checkpoint import GraphCheckpoint, GraphCheckpointWrite
+from .transaction import BalanceRecord, MonthlyAggregate, Transaction
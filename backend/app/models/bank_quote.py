@@ -12,5 +12,5 @@ class BankQuote(Base):
     interest_rate = Column(Float, nullable=False)
     emi = Column(Float, nullable=False)
 
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User") 
\ No newline at end of file
@@ -2,4 +2,6 @@
 # imported by Alembic
 from .user_financials_model import UserFinancials  # noqa
 from .user_profile import User  # noqa
+from .transaction import BalanceRecord, MonthlyAggregate, Transaction  # noqa
+from .financial_analysis import FinancialAnalysis, UserLatestAnalysis  # noqa
 from database import Base  # noqa 
\ No newline at end of file
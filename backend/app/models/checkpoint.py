@@ -0,0 +1,39 @@
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String, func
+
+from database import Base
+
+
+class GraphCheckpoint(Base):
+    """Latest LangGraph checkpoint of a conversation thread."""
+
+    __tablename__ = "graph_checkpoints"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, nullable=False)
+    parent_checkpoint_id = Column(String, nullable=True)
+    checkpoint_type = Column(String, nullable=False)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String, nullable=False)
+    checkpoint_metadata = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+
+class GraphCheckpointWrite(Base):
+    """Pending write recorded against a thread's latest checkpoint."""
+
+    __tablename__ = "graph_checkpoint_writes"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    value_type = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+    task_path = Column(String, nullable=False, default="")
+
+    __table_args__ = (
+        Index("ix_graph_checkpoint_writes_thread", "thread_id", "checkpoint_ns"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, LargeBinary, String
 from sqlalchemy.orm import relationship
 
 from app.models.user_financials_model import PydanticType
@@ -12,5 +12,21 @@ class FinancialAnalysis(Base):
     id = Column(Integer, primary_key=True, index=True)
     analysis = Column(PydanticType(pydantic_model=FinancialAnalysisPydantic), nullable=False)
 
-    user_id = Column(Integer, ForeignKey("users.id"))
-    user = relationship("User", back_populates="financial_analyses") 
\ No newline at end of file
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user = relationship("User", back_populates="financial_analyses")
+
+
+class UserLatestAnalysis(Base):
+    """The latest analysis of each user, pre-serialized for the analysis page.
+
+    Rewritten in the same transaction as every new analysis, so a read is a
+    primary-key fetch of bytes that are sent as they are.
+    """
+
+    __tablename__ = "user_latest_analysis"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    financial_analysis_id = Column(Integer, ForeignKey("financial_analysis.id"), nullable=True)
+    document = Column(LargeBinary, nullable=False)  # LatestFinancialAnalysis JSON
+    etag = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
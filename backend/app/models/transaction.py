@@ -0,0 +1,67 @@
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from database import Base
+
+
+class Transaction(Base):
+    """One inflow or outflow, normalized out of the user_financials histories."""
+
+    __tablename__ = "transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    direction = Column(String, nullable=False)  # "inflow" or "outflow"
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    amount = Column(Float, nullable=False)
+    narration = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    balance = Column(Float, nullable=False)
+    type = Column(String, nullable=False)
+
+    user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_transactions_user_timestamp", "user_id", "timestamp"),
+        Index("ix_transactions_user_category", "user_id", "category"),
+    )
+
+
+class BalanceRecord(Base):
+    """One point of a user's bank balance history."""
+
+    __tablename__ = "balance_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    balance = Column(Float, nullable=False)
+
+    user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_balance_history_user_timestamp", "user_id", "timestamp"),
+    )
+
+
+class MonthlyAggregate(Base):
+    """Running per-user totals for one calendar month (UTC).
+
+    Maintained alongside the transactions table so profile figures never
+    need a scan of the full history.
+    """
+
+    __tablename__ = "user_monthly_aggregates"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    inflow_total = Column(Float, nullable=False, default=0.0)
+    inflow_count = Column(Integer, nullable=False, default=0)
+    outflow_total = Column(Float, nullable=False, default=0.0)
+    outflow_count = Column(Integer, nullable=False, default=0)
+    emi_outflow_total = Column(Float, nullable=False, default=0.0)
+    # Balance after the month's latest transaction
+    closing_balance = Column(Float, nullable=True)
+    closing_balance_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User")
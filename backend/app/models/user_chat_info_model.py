@@ -11,6 +11,6 @@ class UserChatInfo(Base):
     dependents_info = Column(Text, nullable=True)
     additional_info = Column(Text, nullable=True)
 
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User", back_populates="chat_info")
     
\ No newline at end of file
@@ -1,10 +1,10 @@
-import json
-from typing import Any, List, Type, TypeVar
-from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, List, Type, TypeVar
 
-from pydantic import BaseModel
+import orjson
+from pydantic import BaseModel, TypeAdapter
 from sqlalchemy import Column, Float, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship, undefer
 from sqlalchemy.types import JSON, TypeDecorator
 
 from app.pydanticModels.financials import (
@@ -18,16 +18,35 @@ from database import Base
 
 T = TypeVar("T", bound=BaseModel)
 
+# Heavy JSON columns are deferred: they are neither fetched nor decoded until
+# accessed or explicitly undeferred (see undefer_financials)
+HOLDINGS_GROUP = "holdings"
+HISTORY_GROUP = "history"
+HOLDINGS_FIELDS = ("mutual_funds_summary", "equities_summary", "etf_summary")
+HISTORY_FIELDS = ("bank_balance_history", "inflow_history", "outflow_history")
+HEAVY_FIELDS = HOLDINGS_FIELDS + HISTORY_FIELDS
 
-class DateTimeEncoder(json.JSONEncoder):
-    """Custom JSON encoder that handles datetime objects."""
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+
+def _orjson_default(obj: Any) -> Any:
+    """orjson fallback for Pydantic models nested in otherwise plain data."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=None)
+def _type_adapter(pydantic_model: Type[T], as_list: bool) -> TypeAdapter:
+    """Cached adapter for a model (or a list of it); building one is expensive."""
+    return TypeAdapter(List[pydantic_model] if as_list else pydantic_model)
 
 
 class PydanticType(TypeDecorator):
+    """Stores a Pydantic model, or a list of them, as JSON.
+
+    Encoding goes through pydantic-core (or orjson for plain dicts) and
+    decoding validates the whole document in one TypeAdapter call.
+    """
+
     impl = JSON
     cache_ok = True
 
@@ -38,39 +57,31 @@ class PydanticType(TypeDecorator):
         self.pydantic_model = pydantic_model
         self.as_list = as_list
 
+    @property
+    def adapter(self) -> TypeAdapter:
+        return _type_adapter(self.pydantic_model, self.as_list)
+
     def process_bind_param(self, value: Any, dialect: Any) -> str | None:
         if value is None:
             return None
 
         if self.as_list:
-            # Handle both Pydantic models and dictionaries
-            result = []
-            for item in value:
-                if hasattr(item, 'model_dump'):
-                    # It's a Pydantic model
-                    result.append(item.model_dump(mode="json"))
-                else:
-                    # It's already a dictionary
-                    result.append(item)
-            return json.dumps(result, cls=DateTimeEncoder)
-        else:
-            # Single value
-            if hasattr(value, 'model_dump'):
-                # It's a Pydantic model
-                return json.dumps(value.model_dump(mode="json"))
-            else:
-                # It's already a dictionary
-                return json.dumps(value, cls=DateTimeEncoder)
+            if all(isinstance(item, self.pydantic_model) for item in value):
+                # Serialized in one pass by pydantic-core
+                return self.adapter.dump_json(value).decode()
+        elif isinstance(value, self.pydantic_model):
+            return value.model_dump_json()
+
+        # Dictionaries (or a mix of dictionaries and models)
+        return orjson.dumps(value, default=_orjson_default).decode()
 
     def process_result_value(self, value: Any, dialect: Any) -> List[T] | T | None:
         if value is None:
             return None
 
-        data = json.loads(value)
-
-        if self.as_list:
-            return [self.pydantic_model.model_validate(item) for item in data]
-        return self.pydantic_model.model_validate(data)
+        if isinstance(value, (str, bytes)):
+            return self.adapter.validate_json(value)
+        return self.adapter.validate_python(value)
 
 
 class UserFinancials(Base):
@@ -92,19 +103,40 @@ class UserFinancials(Base):
     active_loans_count = Column(Integer, nullable=True)
 
     # Investment Summaries
-    mutual_funds_summary = Column(
-        PydanticType(MutualFundHolding, as_list=True), nullable=True
+    mutual_funds_summary = deferred(
+        Column(PydanticType(MutualFundHolding, as_list=True), nullable=True),
+        group=HOLDINGS_GROUP,
+    )
+    equities_summary = deferred(
+        Column(PydanticType(EquityHolding, as_list=True), nullable=True),
+        group=HOLDINGS_GROUP,
+    )
+    etf_summary = deferred(
+        Column(PydanticType(EtfHolding, as_list=True), nullable=True),
+        group=HOLDINGS_GROUP,
     )
-    equities_summary = Column(PydanticType(EquityHolding, as_list=True), nullable=True)
-    etf_summary = Column(PydanticType(EtfHolding, as_list=True), nullable=True)
 
-    # Banking History
-    bank_balance_history = Column(
-        PydanticType(BalancePoint, as_list=True), nullable=True
+    # Banking History, as imported: the transactions and balance_history rows
+    # are the source of truth and also hold the transactions appended since
+    bank_balance_history = deferred(
+        Column(PydanticType(BalancePoint, as_list=True), nullable=True),
+        group=HISTORY_GROUP,
     )
-    inflow_history = Column(PydanticType(TransactionPoint, as_list=True), nullable=True)
-    outflow_history = Column(
-        PydanticType(TransactionPoint, as_list=True), nullable=True
+    inflow_history = deferred(
+        Column(PydanticType(TransactionPoint, as_list=True), nullable=True),
+        group=HISTORY_GROUP,
     )
-  
+    outflow_history = deferred(
+        Column(PydanticType(TransactionPoint, as_list=True), nullable=True),
+        group=HISTORY_GROUP,
+    )
+
+
+def undefer_financials(loader: Any, fields: Iterable[str] = HEAVY_FIELDS) -> Any:
+    """Extend a loader option on UserFinancials to also load the given heavy fields.
 
+    Async sessions cannot load deferred columns on attribute access, so
+    callers there must name the heavy fields they read up front.
+    """
+    wanted = [undefer(getattr(UserFinancials, name)) for name in fields if name in HEAVY_FIELDS]
+    return loader.options(*wanted) if wanted else loader
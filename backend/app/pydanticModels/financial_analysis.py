@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Union, Any
+from typing import List, Literal, Optional, Dict, Union, Any
 
 
 class PersonalProfile(BaseModel):
@@ -66,7 +67,7 @@ class ScenarioAssumptions(BaseModel):
     downPayment: int
     loanAmount: int
     interestRate: Optional[float]
-    tenureYears: int
+    tenureYears: float  # e.g. 3.5 for a 42-month loan
 
 
 class ScenarioCalculations(BaseModel):
@@ -125,4 +126,17 @@ class FinancialAnalysis(BaseModel):
 
 
 class FinancialAnalysisCreate(FinancialAnalysis):
-    pass 
\ No newline at end of file
+    pass
+
+
+class LatestFinancialAnalysis(BaseModel):
+    """A user's most recent analysis, as materialized at write time.
+
+    `analysis` is set when it was stored through the API; analyses produced
+    by the agent carry `raw_analysis` and `scenarios` instead.
+    """
+    source: Literal["api", "agent"]
+    updated_at: datetime
+    analysis: Optional[FinancialAnalysis] = None
+    raw_analysis: Optional[str] = None
+    scenarios: Optional[List[Dict[str, Any]]] = None
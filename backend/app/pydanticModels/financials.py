@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -67,6 +69,74 @@ class TransactionPoint(BaseModel):
     type: str = Field(..., description="The type of the transaction. whether it is a credit or debit.")
 
 
+class TransactionRecord(TransactionPoint):
+    """
+    A stored transaction, as returned by the transaction range endpoints.
+    """
+
+    id: int = Field(..., description="Unique identifier for the transaction.")
+    direction: str = Field(..., description="Either inflow or outflow.")
+
+    class Config:
+        from_attributes = True
+
+
+class BalanceRecord(BalancePoint):
+    """
+    A stored point of the balance history.
+    """
+
+    class Config:
+        from_attributes = True
+
+
+class CategoryTotal(BaseModel):
+    """
+    Transactions of one category and direction, aggregated over a period.
+    """
+
+    category: str = Field(..., description="The transaction category.")
+    direction: str = Field(..., description="Either inflow or outflow.")
+    total: float = Field(..., description="Sum of the transaction amounts.")
+    count: int = Field(..., description="Number of transactions.")
+
+
+class TransactionAppend(BaseModel):
+    """
+    New transactions to append to a user's history.
+    """
+
+    inflow_history: List[TransactionPoint] = Field(default_factory=list, description="New inflows.")
+    outflow_history: List[TransactionPoint] = Field(default_factory=list, description="New outflows.")
+
+
+class TransactionAppendResult(BaseModel):
+    """
+    Outcome of a transaction append.
+    """
+
+    inserted: int = Field(..., description="Number of transactions stored.")
+    duplicates: int = Field(..., description="Number of transactions skipped as already stored.")
+
+
+class MonthlyTotals(BaseModel):
+    """
+    Running inflow/outflow totals of a user for one calendar month (UTC).
+    """
+
+    month: date = Field(..., description="First day of the month.")
+    inflow_total: float = Field(..., description="Sum of the month's inflows.")
+    inflow_count: int = Field(..., description="Number of inflows.")
+    outflow_total: float = Field(..., description="Sum of the month's outflows.")
+    outflow_count: int = Field(..., description="Number of outflows.")
+    emi_outflow_total: float = Field(..., description="Outflows towards existing loans.")
+    closing_balance: Optional[float] = Field(None, description="Balance after the month's latest transaction.")
+    closing_balance_at: Optional[datetime] = Field(None, description="Timestamp of that transaction.")
+
+    class Config:
+        from_attributes = True
+
+
 class BankQuoteCreate(BaseModel):
     """
     Schema for creating a new bank quote.
@@ -29,6 +29,21 @@ class UserFinancialsBase(BaseModel):
     outflow_history: Optional[List[TransactionPoint]] = []
 
 
+class UserFinancialsSummary(BaseModel):
+    """Scalar credit report fields, without the histories and holdings."""
+
+    credit_score_name: Optional[str] = None
+    credit_score: Optional[int] = None
+    total_income: Optional[float] = None
+    loans_balance: Optional[float] = None
+    loans_sanctioned_amount: Optional[float] = None
+    loans_past_due_amount: Optional[float] = None
+    active_loans_count: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
 class UserFinancialsCreate(UserFinancialsBase):
     pass
 
@@ -1 +1,3 @@
-from .users_router import router as users_router 
\ No newline at end of file
+from .users_router import router as users_router 
+from .transactions_router import router as transactions_router
+from .ingestion_router import router as ingestion_router
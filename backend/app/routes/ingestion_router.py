@@ -0,0 +1,33 @@
+import asyncio
+from fastapi import APIRouter, File, Query, UploadFile
+
+from app.config import settings
+from app.services.ingestion import DEFAULT_BATCH_SIZE, ingest_stream
+import logging
+
+router = APIRouter()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+@router.post("/users")
+async def ingest_users(
+    *,
+    file: UploadFile = File(...),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    workers: int = Query(1, ge=1, le=settings.ingestion_api_max_workers),
+):
+    """
+    Bulk-load users from an account-aggregator dump: one user.json-shaped
+    object or an array of them. The upload is spooled to disk and parsed
+    incrementally; the response reports throughput and peak memory per batch.
+    Batches are prepared in this server process unless more `workers` are
+    requested (bounded by INGESTION_API_MAX_WORKERS); large loads belong to
+    the CLI: python -m app.services.ingestion load.
+    """
+    # Ingestion uses the sync engine; keep it off the event loop
+    report = await asyncio.to_thread(ingest_stream, file.file, batch_size, workers)
+    logger.info(f"Ingested {report.users} users with {len(report.errors)} errors")
+    return report.summary()
@@ -0,0 +1,171 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.pydanticModels import financials as financials_schema
+from app.services.analysis_cache import analysis_cache
+from app.services.ingestion import append_transactions, to_utc
+from app.services.user_context import user_context_cache, user_exists
+from dependencies import get_async_db
+import logging
+
+router = APIRouter()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+Direction = Literal["inflow", "outflow"]
+
+
+async def _ensure_user(db: AsyncSession, user_id: int) -> None:
+    if not await user_exists(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+def _in_range(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Half-open [start, end) filter on a timestamp column."""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= to_utc(start))
+    if end is not None:
+        conditions.append(column < to_utc(end))
+    return conditions
+
+
+@router.get("/{user_id}/transactions", response_model=List[financials_schema.TransactionRecord])
+async def get_transactions(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    direction: Optional[Direction] = None,
+    category: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Retrieve a user's transactions in [start, end), oldest first, optionally
+    restricted to one direction and category.
+    """
+    await _ensure_user(db, user_id)
+
+    Transaction = models.Transaction
+    query = select(Transaction).where(
+        Transaction.user_id == user_id, *_in_range(Transaction.timestamp, start, end)
+    )
+    if direction is not None:
+        query = query.where(Transaction.direction == direction)
+    if category is not None:
+        query = query.where(Transaction.category == category)
+
+    result = await db.execute(query.order_by(Transaction.timestamp, Transaction.id).limit(limit))
+    return result.scalars().all()
+
+
+@router.patch("/{user_id}/transactions", response_model=financials_schema.TransactionAppendResult)
+async def append_user_transactions(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int,
+    transactions_in: financials_schema.TransactionAppend,
+):
+    """
+    Append new inflows/outflows to a user's history. Transactions already
+    stored (same timestamp, amount and narration) are skipped, and the
+    user's monthly aggregates are updated in the same transaction.
+    """
+    result = await append_transactions(
+        db, user_id, transactions_in.inflow_history, transactions_in.outflow_history
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    inserted, duplicates = result
+    if inserted:
+        analysis_cache.invalidate_user(user_id)
+        await user_context_cache.invalidate(user_id)
+    return financials_schema.TransactionAppendResult(inserted=inserted, duplicates=duplicates)
+
+
+@router.get("/{user_id}/transactions/by-category", response_model=List[financials_schema.CategoryTotal])
+async def get_transactions_by_category(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    direction: Optional[Direction] = None,
+):
+    """
+    Total and count of a user's transactions per category and direction in
+    [start, end), largest totals first.
+    """
+    await _ensure_user(db, user_id)
+
+    Transaction = models.Transaction
+    total = func.sum(Transaction.amount).label("total")
+    query = (
+        select(
+            Transaction.category,
+            Transaction.direction,
+            total,
+            func.count(Transaction.id).label("count"),
+        )
+        .where(Transaction.user_id == user_id, *_in_range(Transaction.timestamp, start, end))
+        .group_by(Transaction.category, Transaction.direction)
+        .order_by(total.desc())
+    )
+    if direction is not None:
+        query = query.where(Transaction.direction == direction)
+
+    result = await db.execute(query)
+    return [financials_schema.CategoryTotal(**row) for row in result.mappings()]
+
+
+@router.get("/{user_id}/balances", response_model=List[financials_schema.BalanceRecord])
+async def get_balances(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Retrieve a user's balance history in [start, end), oldest first.
+    """
+    await _ensure_user(db, user_id)
+
+    BalanceRecord = models.BalanceRecord
+    result = await db.execute(
+        select(BalanceRecord)
+        .where(BalanceRecord.user_id == user_id, *_in_range(BalanceRecord.timestamp, start, end))
+        .order_by(BalanceRecord.timestamp, BalanceRecord.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+@router.get("/{user_id}/aggregates/monthly", response_model=List[financials_schema.MonthlyTotals])
+async def get_monthly_aggregates(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int,
+):
+    """
+    Retrieve a user's running monthly inflow/outflow totals, oldest first.
+    """
+    await _ensure_user(db, user_id)
+
+    MonthlyAggregate = models.MonthlyAggregate
+    result = await db.execute(
+        select(MonthlyAggregate)
+        .where(MonthlyAggregate.user_id == user_id)
+        .order_by(MonthlyAggregate.month)
+    )
+    return result.scalars().all()
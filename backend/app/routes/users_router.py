@@ -1,39 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app import models
+from app.models.user_financials_model import HISTORY_FIELDS, undefer_financials
 from app.pydanticModels import user as user_schema
 from app.pydanticModels import financials as financials_schema
 from app.pydanticModels import user_chat_info as user_chat_info_schema
 from app.pydanticModels import financial_analysis as financial_analysis_schema
 from app.security import get_password_hash
-from dependencies import get_db
+from app.services.analysis_cache import analysis_cache
+from app.services.document_cache import document_cache
+from app.services.http_cache import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    conditional_json,
+    conditional_response,
+    decode_cursor,
+    encode_cursor,
+)
+from app.services.ingestion import history_rows, load_history
+from app.services.latest_analysis import load_latest_analysis, save_latest_analysis
+from app.services.user_context import user_context_cache, user_exists
+from dependencies import get_async_db
 import logging
-from typing import List
-import json
-import os
+from typing import List, Optional, Tuple
 
 router = APIRouter()
 
+FINANCIALS_FIELDS = tuple(user_schema.UserFinancials.model_fields)
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+async def _page_for_user(
+    db: AsyncSession, model, user_id: int, cursor: Optional[str], limit: int
+) -> Optional[Tuple[list, Optional[str]]]:
+    """
+    One page of `model` rows owned by a user, oldest first, with the cursor
+    of the next page (None on the last one); None if the user does not exist.
+
+    One round trip: the user is outer-joined to the rows after the cursor,
+    so a user without any still comes back as a single row with no match.
+    One extra row is fetched to tell whether another page follows.
+    """
+    after_id = decode_cursor(cursor)
+    User = models.user_profile.User
+    result = await db.execute(
+        select(User.id, model)
+        .outerjoin(model, and_(model.user_id == User.id, model.id > after_id))
+        .where(User.id == user_id)
+        .order_by(model.id)
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+
+    items = [row[1] for row in rows if row[1] is not None]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].id)
+    return items, next_cursor
+
+
 @router.post("/", response_model=user_schema.User)
-def create_user_profile(
+async def create_user_profile(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: user_schema.UserCreate,
 ):
     # This is a simplified check. In a real application, you'd have a
     # dedicated service function like `get_user_by_email`.
     # For now, this check is commented out to keep it simple, but it is a good practice
     # existing_user = (
-    #     db.query(models.user_profile.User)
-    #     .filter(models.user_profile.User.email == user_in.email)
-    #     .first()
-    # )
+    #     await db.execute(
+    #         select(models.user_profile.User)
+    #         .where(models.user_profile.User.email == user_in.email)
+    #     )
+    # ).scalar_one_or_none()
     # if existing_user:
     #     raise HTTPException(
     #         status_code=400,
@@ -42,7 +94,8 @@ def create_user_profile(
     user_data = user_in.model_dump(exclude={"financials", "password"})
     financials_data = user_in.financials.model_dump()
 
-    hashed_password = get_password_hash(user_in.password)
+    # bcrypt is deliberately slow; keep it off the event loop
+    hashed_password = await asyncio.to_thread(get_password_hash, user_in.password)
 
     db_user = models.user_profile.User(**user_data, hashed_password=hashed_password)
     db_financials = models.user_financials_model.UserFinancials(
@@ -51,36 +104,95 @@ def create_user_profile(
 
     db.add(db_user)
     db.add(db_financials)
-    db.commit()
-    db.refresh(db_user)
+    db.add_all(history_rows(user_in.financials, user=db_user))
+    await db.commit()
+    await db.refresh(db_user)
+    analysis_cache.invalidate_user(db_user.id)
 
     return db_user 
 
 
-@router.get("/{user_id}", response_model=user_schema.UserWithFinancials)
-def get_user_profile(
+@router.get(
+    "/{user_id}",
+    response_model=user_schema.UserWithFinancials,
+    response_model_exclude_unset=True,
+)
+async def get_user_profile(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
     user_id: int,
+    fields: Optional[str] = None,
 ):
     """
     Retrieve the full profile for a specific user, including their financial data.
+
+    `fields` is an optional comma-separated list of financials fields to
+    return (e.g. `credit_score,total_income`). The transaction histories and
+    holdings are only loaded when requested, so leaving them out keeps the
+    response small. The histories are read from the stored transaction and
+    balance rows, so they include transactions appended since the import.
+    Responses carry an ETag; send it back in If-None-Match to get a 304 when
+    nothing changed.
     """
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
+    if fields is None:
+        requested = list(FINANCIALS_FIELDS)
+    else:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(FINANCIALS_FIELDS))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown financials fields: {', '.join(unknown)}",
+            )
+
+    # The histories come from the transaction and balance rows, which also
+    # hold the transactions appended after the profile was imported
+    history_fields = [name for name in requested if name in HISTORY_FIELDS]
+    db_user = await db.get(
+        models.user_profile.User,
+        user_id,
+        options=[
+            undefer_financials(
+                selectinload(models.user_profile.User.financials),
+                [name for name in requested if name not in HISTORY_FIELDS],
+            )
+        ],
     )
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return db_user
+    # Only the requested fields are set, so the rest are left out of the response
+    financials = None
+    if db_user.financials is not None:
+        values = {
+            name: getattr(db_user.financials, name)
+            for name in requested
+            if name not in HISTORY_FIELDS
+        }
+        if history_fields:
+            histories = await load_history(db, user_id, history_fields)
+            # Users never backfilled only have the histories they were imported with
+            unloaded = [name for name, points in histories.items() if not points]
+            if unloaded:
+                await db.refresh(db_user.financials, attribute_names=unloaded)
+                histories.update({name: getattr(db_user.financials, name) for name in unloaded})
+            values.update(histories)
+        financials = user_schema.UserFinancials(**values)
+    profile = user_schema.UserWithFinancials(
+        **user_schema.User.model_validate(db_user).model_dump(),
+        financials=financials,
+    )
+
+    return conditional_json(
+        request, user_schema.UserWithFinancials, profile, exclude_unset=True
+    )
 
 
 @router.post("/{user_id}/bank-quotes", response_model=financials_schema.BankQuote)
-def create_bank_quote(
+async def create_bank_quote(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int,
     bank_quote_in: financials_schema.BankQuoteCreate,
 ):
@@ -88,12 +200,7 @@ def create_bank_quote(
     Create a new bank quote for a specific user.
     """
     # Check if user exists
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
-    )
-    if not db_user:
+    if not await user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
     # Create bank quote
@@ -103,56 +210,49 @@ def create_bank_quote(
     )
 
     db.add(db_bank_quote)
-    db.commit()
-    db.refresh(db_bank_quote)
+    await db.commit()
+    await db.refresh(db_bank_quote)
+    analysis_cache.invalidate_user(user_id)
+    await user_context_cache.invalidate(user_id)
 
     return db_bank_quote
 
 
 @router.get("/{user_id}/bank-quotes", response_model=List[financials_schema.BankQuote])
-def get_user_bank_quotes(
+async def get_user_bank_quotes(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
     user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
     """
-    Retrieve all bank quotes for a specific user.
+    Retrieve the bank quotes for a specific user, oldest first, one page
+    at a time. The cursor of the next page is returned in the X-Next-Cursor
+    and Link headers; responses carry an ETag for conditional requests.
     """
-    # Check if user exists
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
-    )
-    if not db_user:
+    page = await _page_for_user(db, models.bank_quote.BankQuote, user_id, cursor, limit)
+    if page is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all bank quotes for the user
-    bank_quotes = (
-        db.query(models.bank_quote.BankQuote)
-        .filter(models.bank_quote.BankQuote.user_id == user_id)
-        .all()
+    bank_quotes, next_cursor = page
+    return conditional_json(
+        request, List[financials_schema.BankQuote], bank_quotes, next_cursor=next_cursor
     )
 
-    return bank_quotes
-
 
 @router.post("/{user_id}/chat-info", response_model=user_chat_info_schema.UserChatInfo)
-def create_user_chat_info(
+async def create_user_chat_info(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int,
     chat_info_in: user_chat_info_schema.UserChatInfoCreate,
 ):
     """
     Create new chat info for a specific user.
     """
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
-    )
-    if not db_user:
+    if not await user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
     chat_info_data = chat_info_in.model_dump()
@@ -161,28 +261,23 @@ def create_user_chat_info(
     )
 
     db.add(db_chat_info)
-    db.commit()
-    db.refresh(db_chat_info)
+    await db.commit()
+    await db.refresh(db_chat_info)
 
     return db_chat_info
 
 
 @router.post("/{user_id}/financial-analysis", response_model=financial_analysis_schema.FinancialAnalysis)
-def create_financial_analysis(
+async def create_financial_analysis(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int,
     financial_analysis_in: financial_analysis_schema.FinancialAnalysisCreate,
 ):
     """
     Create new financial analysis for a specific user.
     """
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
-    )
-    if not db_user:
+    if not await user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
     analysis_data = financial_analysis_in
@@ -191,99 +286,123 @@ def create_financial_analysis(
     )
 
     db.add(db_financial_analysis)
-    db.commit()
-    db.refresh(db_financial_analysis)
+    await db.flush()
+    await save_latest_analysis(
+        db,
+        user_id,
+        analysis=analysis_data,
+        financial_analysis_id=db_financial_analysis.id,
+    )
+    await db.commit()
+    await db.refresh(db_financial_analysis)
     
     # We need to return a pydantic model, not a db model with a pydantic model inside
     return db_financial_analysis.analysis
 
 
 @router.get("/{user_id}/chat-info", response_model=List[user_chat_info_schema.UserChatInfo])
-def get_user_chat_info(
+async def get_user_chat_info(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
     user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
     """
-    Retrieve all chat info records for a specific user.
+    Retrieve the chat info records for a specific user, oldest first, one page
+    at a time. The cursor of the next page is returned in the X-Next-Cursor
+    and Link headers; responses carry an ETag for conditional requests.
     """
-    # Check if user exists
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
+    page = await _page_for_user(
+        db, models.user_chat_info_model.UserChatInfo, user_id, cursor, limit
     )
-    if not db_user:
+    if page is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all chat info for the user
-    chat_infos = (
-        db.query(models.user_chat_info_model.UserChatInfo)
-        .filter(models.user_chat_info_model.UserChatInfo.user_id == user_id)
-        .all()
+    chat_infos, next_cursor = page
+    return conditional_json(
+        request, List[user_chat_info_schema.UserChatInfo], chat_infos, next_cursor=next_cursor
     )
 
-    return chat_infos
-
 
 @router.get("/{user_id}/financial-analyses", response_model=List[financial_analysis_schema.FinancialAnalysis])
-def get_user_financial_analyses(
+async def get_user_financial_analyses(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
     user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
     """
-    Retrieve all financial analyses for a specific user.
+    Retrieve the financial analyses for a specific user, oldest first, one page
+    at a time. The cursor of the next page is returned in the X-Next-Cursor
+    and Link headers; responses carry an ETag for conditional requests.
     """
-    # Check if user exists
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
+    page = await _page_for_user(
+        db, models.financial_analysis.FinancialAnalysis, user_id, cursor, limit
     )
-    if not db_user:
+    if page is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all financial analyses for the user
-    analyses = (
-        db.query(models.financial_analysis.FinancialAnalysis)
-        .filter(models.financial_analysis.FinancialAnalysis.user_id == user_id)
-        .all()
+    analyses, next_cursor = page
+    # Extract the Pydantic models from the database models
+    return conditional_json(
+        request,
+        List[financial_analysis_schema.FinancialAnalysis],
+        [analysis.analysis for analysis in analyses],
+        next_cursor=next_cursor,
     )
 
-    # Extract the Pydantic models from the database models
-    return [analysis.analysis for analysis in analyses]
+
+@router.get(
+    "/{user_id}/financial-analyses/latest",
+    response_model=financial_analysis_schema.LatestFinancialAnalysis,
+)
+async def get_latest_financial_analysis(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
+    user_id: int,
+):
+    """
+    Retrieve the most recent analysis for a specific user, whether stored
+    through the API or produced by the analysis agent. It is kept
+    pre-serialized, so this is a single indexed fetch of the response body,
+    served from the document cache while its ETag is unchanged.
+    """
+    latest = await load_latest_analysis(db, user_id)
+    if latest is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    document, etag = latest
+    if document is None:
+        raise HTTPException(status_code=404, detail="No analysis for this user yet")
+
+    return conditional_response(request, document, etag)
 
 
 @router.get("/{user_id}/financial-info")
-def get_financial_info(
+async def get_financial_info(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request,
     user_id: int,
 ):
     """
     Retrieve financial information including scenarios from info.json for a specific user.
     """
-    # Check if user exists
-    db_user = (
-        db.query(models.user_profile.User)
-        .filter(models.user_profile.User.id == user_id)
-        .first()
-    )
-    if not db_user:
+    # Check if user exists (remembered once seen: a warm request does not query)
+    if not await user_context_cache.exists(user_id, db):
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Read the info.json file
+    # info.json is served from memory, pre-encoded; it is only re-read when it changes
     try:
-        # Get the path to the info.json file
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        info_json_path = os.path.join(current_dir, "..", "inputapidata", "info.json")
-        
-        with open(info_json_path, 'r', encoding='utf-8') as f:
-            info_data = json.load(f)
-        
-        return info_data
+        document = document_cache.get_fixture("info.json")
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Financial info file not found")
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Error reading financial info file")
+
+    return conditional_response(request, document.body, document.etag)
@@ -0,0 +1,85 @@
+"""
+Content-addressed cache for analysis_agent results.
+
+An analysis depends only on the user's profile, financials, bank quotes, the
+chat_info gathered in conversation and the purchase amount. Hashing those
+inputs gives a key that changes whenever any of them does, so a repeated
+confirmation or a reconnect reuses the previous result instead of paying for
+another LLM call.
+"""
+import hashlib
+import json
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Sequence
+
+from app.config import settings
+from app.services.cache import LRUCache
+from app.services.scenario_engine import FinancialProfile
+
+# Bump when the analysis prompt changes so stale narratives are not reused
+ANALYSIS_CACHE_VERSION = 1
+
+FINANCIALS_SCALAR_FIELDS = (
+    "credit_score_name",
+    "credit_score",
+    "total_income",
+    "loans_balance",
+    "loans_sanctioned_amount",
+    "loans_past_due_amount",
+    "active_loans_count",
+)
+
+
+def analysis_fingerprint(
+    user: Any,
+    financials: Any,
+    profile: FinancialProfile,
+    bank_quotes: Sequence[Any],
+    chat_info: Optional[Dict[str, Any]],
+    car_price: Optional[float],
+) -> str:
+    """Stable SHA-256 of every input that shapes an analysis."""
+    payload = {
+        "version": ANALYSIS_CACHE_VERSION,
+        "user": [user.full_name, str(user.date_of_birth)],
+        "financials": {
+            name: getattr(financials, name, None) for name in FINANCIALS_SCALAR_FIELDS
+        },
+        # Histories and holdings enter through the figures derived from them
+        "profile": asdict(profile),
+        "bank_quotes": sorted(
+            [q.id, q.bank_name, q.amount, q.tenure, q.interest_rate, q.emi]
+            for q in bank_quotes
+        ),
+        "chat_info": chat_info or {},
+        "car_price": car_price,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """LRU + TTL store of analysis results keyed by (user_id, fingerprint)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get((user_id, fingerprint))
+
+    def set(self, user_id: int, fingerprint: str, result: Dict[str, Any]) -> None:
+        self._cache.set((user_id, fingerprint), result)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Drop every cached analysis of a user after their data was written."""
+        return self._cache.pop_matching(lambda key: key[0] == user_id)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+# Create a singleton instance
+analysis_cache = AnalysisCache(
+    maxsize=settings.analysis_cache_size,
+    ttl=settings.analysis_cache_ttl_seconds,
+)
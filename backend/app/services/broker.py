@@ -0,0 +1,255 @@
+"""
+Pub/sub brokers that fan WebSocket messages out to every worker.
+
+Each worker's ConnectionManager subscribes a handler and publishes instead of
+writing to sockets directly; the broker hands every published payload to the
+handler of every subscribed worker, which delivers it to the sockets it
+holds. The in-process broker (the default) keeps the single-worker behaviour;
+set WEBSOCKET_BROKER_URL to a redis:// or postgresql:// URL to share messages
+across workers and hosts.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterator, List, Optional, Protocol, Set
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str], Awaitable[None]]
+
+# pg_notify rejects payloads of 8000 bytes or more; larger ones are split
+POSTGRES_MAX_PAYLOAD = 7999
+# Partly received messages a Postgres listener keeps (a lost connection can
+# leave one incomplete; the oldest is dropped first)
+POSTGRES_MAX_PARTIAL = 64
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class Broker(Protocol):
+    async def start(self, handler: Handler) -> None: ...
+
+    async def publish(self, payload: str) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class InProcessBroker:
+    """Delivers straight to this worker's handler."""
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+
+    async def publish(self, payload: str) -> None:
+        if self._handler is not None:
+            await self._handler(payload)
+
+    async def stop(self) -> None:
+        self._handler = None
+
+
+class RedisBroker:
+    """Redis PUBLISH/SUBSCRIBE on one channel (needs the redis package)."""
+
+    def __init__(self, url: str, channel: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self.channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, handler))
+
+    async def _listen(self, pubsub, handler: Handler) -> None:
+        while True:
+            try:
+                message = await pubsub.get_message(timeout=None)
+                if message is not None:
+                    data = message["data"]
+                    await handler(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception as e:
+                # redis-py resubscribes on the next read after a reconnect
+                logger.error(f"Redis broker listener error: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def publish(self, payload: str) -> None:
+        await self._client.publish(self.channel, payload)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self._client.aclose()
+
+
+def _split_utf8(payload: str, max_bytes: int) -> Iterator[str]:
+    """Consecutive pieces of ``payload`` of at most ``max_bytes`` UTF-8 bytes each."""
+    encoded = payload.encode()
+    start = 0
+    while start < len(encoded):
+        end = min(start + max_bytes, len(encoded))
+        # Never cut inside a character: back off over continuation bytes
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        yield encoded[start:end].decode()
+        start = end
+
+
+def postgres_notifications(payload: str, max_bytes: int = POSTGRES_MAX_PAYLOAD) -> List[str]:
+    """The NOTIFY payloads carrying ``payload``.
+
+    Each is prefixed: ``m:`` and the whole payload when it fits, otherwise
+    ``c:<message id>:<index>:<count>:`` and one piece of it.
+    """
+    if len(payload.encode()) + 2 <= max_bytes:
+        return ["m:" + payload]
+    message_id = uuid4().hex
+    # Room for the largest header: index and count of up to 6 digits each
+    header_bytes = len(f"c:{message_id}:000000:000000:")
+    pieces = list(_split_utf8(payload, max_bytes - header_bytes))
+    return [
+        f"c:{message_id}:{index}:{len(pieces)}:{piece}"
+        for index, piece in enumerate(pieces)
+    ]
+
+
+class PostgresBroker:
+    """LISTEN/NOTIFY on the application database (asyncpg).
+
+    Payloads over the NOTIFY size limit are sent as several notifications in
+    one transaction (so they arrive together and in order) and reassembled by
+    the listeners; see ``postgres_notifications``.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._handler: Optional[Handler] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # message id -> pieces received so far
+        self._partial: "OrderedDict[str, List[Optional[str]]]" = OrderedDict()
+
+    def _reassemble(self, notification: str) -> Optional[str]:
+        """The complete payload once ``notification`` completes it, else None."""
+        if notification.startswith("m:"):
+            return notification[2:]
+        _, message_id, index, count, piece = notification.split(":", 4)
+        pieces = self._partial.get(message_id)
+        if pieces is None:
+            pieces = self._partial[message_id] = [None] * int(count)
+            while len(self._partial) > POSTGRES_MAX_PARTIAL:
+                dropped, _ = self._partial.popitem(last=False)
+                logger.error(f"Postgres broker dropped incomplete message {dropped}")
+        pieces[int(index)] = piece
+        if any(piece is None for piece in pieces):
+            return None
+        del self._partial[message_id]
+        return "".join(pieces)
+
+    def _notified(self, connection, pid, channel, notification: str) -> None:
+        # asyncpg calls listeners synchronously; deliver in a task
+        if self._handler is None:
+            return
+        try:
+            payload = self._reassemble(notification)
+        except ValueError:
+            logger.error(f"Postgres broker ignored a malformed notification: {notification[:80]!r}")
+            return
+        if payload is None:
+            return
+        task = asyncio.create_task(self._handler(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        self._listen_conn.add_termination_listener(self._terminated)
+        await self._listen_conn.add_listener(self.channel, self._notified)
+
+    def _terminated(self, connection) -> None:
+        if self._handler is None:
+            return  # stopped
+        logger.error("Postgres broker lost its LISTEN connection, reconnecting")
+        task = asyncio.create_task(self._reconnect())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reconnect(self) -> None:
+        while self._handler is not None:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._listen()
+                return
+            except Exception as e:
+                logger.error(f"Postgres broker reconnect failed: {e}")
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        await self._listen()
+
+    async def publish(self, payload: str) -> None:
+        import asyncpg
+
+        notifications = postgres_notifications(payload)
+        # A connection runs one statement at a time
+        async with self._publish_lock:
+            if self._publish_conn is None or self._publish_conn.is_closed():
+                self._publish_conn = await asyncpg.connect(self.dsn)
+            if len(notifications) == 1:
+                await self._publish_conn.execute("SELECT pg_notify($1, $2)", self.channel, notifications[0])
+                return
+            # Delivered at commit, together and in order
+            async with self._publish_conn.transaction():
+                await self._publish_conn.executemany(
+                    "SELECT pg_notify($1, $2)",
+                    [(self.channel, notification) for notification in notifications],
+                )
+
+    async def stop(self) -> None:
+        self._handler = None
+        if self._listen_conn is not None and not self._listen_conn.is_closed():
+            await self._listen_conn.remove_listener(self.channel, self._notified)
+            await self._listen_conn.close()
+        self._listen_conn = None
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+            self._publish_conn = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def make_broker(url: Optional[str] = None, channel: Optional[str] = None) -> Broker:
+    """Broker for a WEBSOCKET_BROKER_URL (default: the configured one); in-process when empty."""
+    url = settings.websocket_broker_url if url is None else url
+    channel = channel or settings.websocket_broker_channel
+    if not url:
+        return InProcessBroker()
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ("redis", "rediss"):
+        return RedisBroker(url, channel)
+    if backend in ("postgresql", "postgres"):
+        # asyncpg takes a plain libpq URL, without a SQLAlchemy driver suffix
+        dsn = parsed.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBroker(dsn, channel)
+    raise ValueError(f"Unsupported WebSocket broker URL scheme: {parsed.drivername}")
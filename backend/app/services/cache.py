@@ -0,0 +1,101 @@
+"""
+Small in-process LRU cache with optional time-to-live.
+
+Shared by the checkpointer hot cache and the other read-through caches.
+Thread-safe, because callers reach it both from the event loop and from
+worker threads.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry first.
+
+    Entries older than ``ttl`` seconds are treated as absent. ``hits``,
+    ``misses`` and ``evictions`` are counted for monitoring.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Return the cached value and mark it as recently used."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    del self._data[key]
+                    self.evictions += 1
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Read-through helper: compute and store the value on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def pop_matching(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def keys(self) -> Iterator[Hashable]:
+        with self._lock:
+            return iter(list(self._data))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,113 @@
+"""
+In-memory cache of JSON documents kept both parsed and pre-encoded.
+
+Static fixtures (info.json, bankquotes.json, ...) are read once and reloaded
+only when the file's mtime or size changes; materialized documents (e.g. a
+user's latest analysis) are stored under a key with the version they were
+built from. Either way a request is answered from the cached bytes, without
+parsing or re-encoding, and with a precomputed ETag.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import orjson
+
+from app.config import settings
+from app.services.cache import LRUCache
+from app.services.http_cache import etag_for
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "inputapidata")
+
+
+@dataclass(frozen=True)
+class Document:
+    data: Any
+    body: bytes
+    etag: str
+    version: Any = None
+
+    @classmethod
+    def from_data(cls, data: Any, version: Any = None) -> "Document":
+        body = orjson.dumps(data)
+        return cls(data=data, body=body, etag=etag_for(body), version=version)
+
+
+class DocumentCache:
+    """Parsed + encoded JSON documents, from files or stored under a key."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._files: Dict[str, Document] = {}
+        self._files_lock = threading.Lock()
+        self._documents = LRUCache(maxsize=maxsize)
+        self.loads = 0
+
+    @staticmethod
+    def _file_version(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_file(self, path: str) -> Document:
+        """
+        The document stored in a JSON file, reloaded when the file changes.
+
+        Raises FileNotFoundError, or ValueError (orjson.JSONDecodeError) for
+        invalid JSON. A hit costs one stat() call.
+        """
+        path = os.path.abspath(path)
+        version = self._file_version(path)
+        document = self._files.get(path)
+        if document is not None and document.version == version:
+            return document
+
+        with self._files_lock:
+            document = self._files.get(path)
+            if document is None or document.version != version:
+                with open(path, "rb") as f:
+                    data = orjson.loads(f.read())
+                document = Document.from_data(data, version)
+                self._files[path] = document
+                self.loads += 1
+            return document
+
+    def get_fixture(self, name: str) -> Document:
+        """A JSON file from app/inputapidata, e.g. ``get_fixture("info.json")``."""
+        return self.get_file(os.path.join(FIXTURES_DIR, name))
+
+    def put(
+        self,
+        key: Hashable,
+        data: Any,
+        version: Any = None,
+        *,
+        body: Optional[bytes] = None,
+        etag: Optional[str] = None,
+    ) -> Document:
+        """
+        Encode ``data`` once and keep it under ``key``. A caller that already
+        holds the encoded ``body`` (and its ``etag``) passes it instead.
+        """
+        if body is None:
+            document = Document.from_data(data, version)
+        else:
+            document = Document(data=data, body=body, etag=etag or etag_for(body), version=version)
+        self._documents.set(key, document)
+        return document
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Document]:
+        """The document stored under ``key``; None if absent or built from another version."""
+        document = self._documents.get(key)
+        if document is None or (version is not None and document.version != version):
+            return None
+        return document
+
+    def invalidate(self, key: Hashable) -> None:
+        self._documents.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"files": len(self._files), "file_loads": self.loads, **self._documents.stats()}
+
+
+# Create a singleton instance
+document_cache = DocumentCache(settings.document_cache_size)
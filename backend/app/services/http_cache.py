@@ -0,0 +1,98 @@
+"""
+Keyset pagination cursors and conditional GET helpers for the list and
+profile endpoints.
+
+A cursor is the opaque, URL-safe encoding of the last id of a page; the next
+page is the rows with a larger id. Responses carry an ETag computed from the
+serialized body, so a client repeating a request with ``If-None-Match`` gets
+an empty 304 instead of the payload.
+"""
+import base64
+import binascii
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import TypeAdapter
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Largest id a cursor may carry (a signed 64-bit column)
+MAX_CURSOR_ID = 2**63 - 1
+
+# Lets browser clients read the pagination and validator headers
+EXPOSED_HEADERS = ["ETag", "Link", "X-Next-Cursor"]
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Id after which the requested page starts; 0 for the first page."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not 0 <= last_id <= MAX_CURSOR_ID:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def etag_for(body: bytes) -> str:
+    """Strong validator for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def conditional_response(
+    request: Request, body: bytes, etag: str, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """JSON ``body`` with its ETag, or an empty 304 when If-None-Match matches it."""
+    headers = {**(headers or {}), "ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def conditional_json(
+    request: Request,
+    response_type: Any,
+    content: Any,
+    *,
+    next_cursor: Optional[str] = None,
+    exclude_unset: bool = False,
+) -> Response:
+    """
+    Serialize ``content`` as ``response_type`` and answer with 304 Not
+    Modified when the client already holds this representation.
+
+    ``next_cursor`` is sent as ``X-Next-Cursor`` and as a ``Link: rel="next"``
+    header, and is part of the ETag so a page that gained a successor is not
+    reported unchanged.
+    """
+    body = _adapter(response_type).dump_json(content, exclude_unset=exclude_unset)
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return conditional_response(request, body, etag_for(body + (next_cursor or "").encode()), headers)
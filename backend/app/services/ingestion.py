@@ -0,0 +1,732 @@
+"""
+Loads users and their transaction histories into the database.
+
+The histories arrive as lists of TransactionPoint / BalancePoint inside the
+user profile; storing them as rows lets range and per-category queries read
+only what they need instead of decoding the whole JSON history. Once loaded,
+the rows are the source of truth: transactions appended later exist only as
+rows, and the JSON histories in user_financials stay as they were imported.
+
+Bulk onboarding streams account-aggregator dumps (a user.json-shaped object,
+or an array of them) through three overlapping stages: incremental parsing
+with ijson, validation and password hashing in a process pool, and chunked
+bulk inserts (COPY on PostgreSQL, executemany elsewhere).
+"""
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import os
+import resource
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from itertools import chain, islice
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import ijson
+from pydantic import ValidationError
+from sqlalchemy import Table, delete, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.models.user_financials_model import HISTORY_FIELDS, undefer_financials
+from app.pydanticModels.financials import BalancePoint, TransactionPoint
+from app.services.scenario_engine import is_emi_category
+from app.services.user_context import user_context_cache
+
+logger = logging.getLogger(__name__)
+
+INFLOW = "inflow"
+OUTFLOW = "outflow"
+
+
+def to_utc(timestamp: datetime) -> datetime:
+    """Store every timestamp in UTC so rows order correctly across offsets."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def transaction_values(direction: str, points: Iterable[Any]) -> List[dict]:
+    """Column values of Transaction rows for TransactionPoint-like objects."""
+    return [
+        {
+            "direction": direction,
+            "timestamp": to_utc(point.timestamp),
+            "amount": point.amount,
+            "narration": point.narration,
+            "category": point.category,
+            "balance": point.balance,
+            "type": point.type,
+        }
+        for point in points or []
+    ]
+
+
+def balance_values(points: Iterable[Any]) -> List[dict]:
+    return [
+        {"timestamp": to_utc(point.timestamp), "balance": point.balance}
+        for point in points or []
+    ]
+
+
+def _month(timestamp: datetime) -> date:
+    timestamp = to_utc(timestamp)
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def monthly_totals(transactions: Iterable[dict]) -> Dict[date, dict]:
+    """Per-month MonthlyAggregate values of a set of transaction values."""
+    totals: Dict[date, dict] = {}
+    for values in transactions:
+        month = totals.setdefault(_month(values["timestamp"]), {
+            "inflow_total": 0.0,
+            "inflow_count": 0,
+            "outflow_total": 0.0,
+            "outflow_count": 0,
+            "emi_outflow_total": 0.0,
+            "closing_balance": None,
+            "closing_balance_at": None,
+        })
+        if values["direction"] == INFLOW:
+            month["inflow_total"] += values["amount"]
+            month["inflow_count"] += 1
+        else:
+            month["outflow_total"] += values["amount"]
+            month["outflow_count"] += 1
+            if is_emi_category(values["category"]):
+                month["emi_outflow_total"] += values["amount"]
+        if month["closing_balance_at"] is None or values["timestamp"] >= month["closing_balance_at"]:
+            month["closing_balance"] = values["balance"]
+            month["closing_balance_at"] = values["timestamp"]
+    return totals
+
+
+def merge_monthly(aggregate: models.MonthlyAggregate, totals: dict) -> None:
+    """Fold the totals of newly added transactions into an existing month."""
+    for name in ("inflow_total", "inflow_count", "outflow_total", "outflow_count", "emi_outflow_total"):
+        setattr(aggregate, name, getattr(aggregate, name) + totals[name])
+    closing_at = aggregate.closing_balance_at
+    if closing_at is None or totals["closing_balance_at"] >= to_utc(closing_at):
+        aggregate.closing_balance = totals["closing_balance"]
+        aggregate.closing_balance_at = totals["closing_balance_at"]
+
+
+def history_values(financials: Any) -> Tuple[List[dict], List[dict], List[dict]]:
+    """Transaction, balance and monthly aggregate values for a UserFinancials row or schema."""
+    transactions = (
+        transaction_values(INFLOW, financials.inflow_history)
+        + transaction_values(OUTFLOW, financials.outflow_history)
+    )
+    monthly = [
+        {"month": month, **totals} for month, totals in monthly_totals(transactions).items()
+    ]
+    return transactions, balance_values(financials.bank_balance_history), monthly
+
+
+def history_rows(financials: Any, **owner: Any) -> List[Any]:
+    """Transaction, balance and monthly aggregate rows for a UserFinancials row or schema.
+
+    ``owner`` is either ``user_id=...`` or ``user=...`` (for users that are
+    not flushed yet).
+    """
+    transactions, balances, monthly = history_values(financials)
+    return (
+        [models.Transaction(**owner, **values) for values in transactions]
+        + [models.BalanceRecord(**owner, **values) for values in balances]
+        + [models.MonthlyAggregate(**owner, **values) for values in monthly]
+    )
+
+
+async def load_history(db: AsyncSession, user_id: int, fields: Iterable[str]) -> Dict[str, list]:
+    """The requested history fields of a user's financials, read from the rows.
+
+    ``fields`` may name any financials fields; only those in HISTORY_FIELDS
+    are loaded, oldest point first.
+    """
+    Transaction = models.Transaction
+    BalanceRecord = models.BalanceRecord
+    fields = set(fields)
+    histories: Dict[str, list] = {}
+    directions = [
+        direction for direction in (INFLOW, OUTFLOW) if f"{direction}_history" in fields
+    ]
+    if directions:
+        for direction in directions:
+            histories[f"{direction}_history"] = []
+        rows = await db.execute(
+            select(Transaction)
+            .where(Transaction.user_id == user_id, Transaction.direction.in_(directions))
+            .order_by(Transaction.timestamp, Transaction.id)
+        )
+        for row in rows.scalars():
+            histories[f"{row.direction}_history"].append(TransactionPoint(
+                timestamp=row.timestamp,
+                amount=row.amount,
+                narration=row.narration,
+                category=row.category,
+                balance=row.balance,
+                type=row.type,
+            ))
+    if "bank_balance_history" in fields:
+        rows = await db.execute(
+            select(BalanceRecord.timestamp, BalanceRecord.balance)
+            .where(BalanceRecord.user_id == user_id)
+            .order_by(BalanceRecord.timestamp, BalanceRecord.id)
+        )
+        histories["bank_balance_history"] = [
+            BalancePoint(timestamp=timestamp, balance=balance) for timestamp, balance in rows
+        ]
+    return histories
+
+
+def _dedup_key(timestamp: datetime, amount: float, narration: str) -> tuple:
+    return to_utc(timestamp), round(amount, 2), narration
+
+
+async def append_transactions(
+    db: AsyncSession, user_id: int, inflows: Iterable[Any], outflows: Iterable[Any]
+) -> Optional[Tuple[int, int]]:
+    """Append new transactions for a user and update their monthly aggregates.
+
+    Transactions already stored (same timestamp, amount and narration) are
+    skipped. Only the time window spanned by the new transactions and the
+    months they fall in are read, so the cost follows the size of the
+    update, not of the history. Returns (inserted, duplicates), or None when
+    the user does not exist.
+
+    A user without any monthly aggregate yet (created before history rows
+    existed and never backfilled) has their JSON history loaded into rows
+    first, so the aggregates cover every month and not only the appended
+    ones.
+    """
+    User = models.user_profile.User
+    Transaction = models.Transaction
+    MonthlyAggregate = models.MonthlyAggregate
+
+    # Serializes concurrent appends for the same user
+    locked = await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+    if locked.scalar_one_or_none() is None:
+        return None
+
+    has_aggregates = (await db.execute(
+        select(MonthlyAggregate.month).where(MonthlyAggregate.user_id == user_id).limit(1)
+    )).first()
+    if has_aggregates is None:
+        await _sync_history(db, user_id)
+
+    incoming = transaction_values(INFLOW, inflows) + transaction_values(OUTFLOW, outflows)
+    if not incoming:
+        return 0, 0
+
+    timestamps = [values["timestamp"] for values in incoming]
+    stored = await db.execute(
+        select(Transaction.timestamp, Transaction.amount, Transaction.narration).where(
+            Transaction.user_id == user_id,
+            Transaction.timestamp >= min(timestamps),
+            Transaction.timestamp <= max(timestamps),
+        )
+    )
+    seen = {_dedup_key(*row) for row in stored}
+    fresh = []
+    for values in incoming:
+        key = _dedup_key(values["timestamp"], values["amount"], values["narration"])
+        if key not in seen:
+            seen.add(key)
+            fresh.append(values)
+
+    if fresh:
+        await db.execute(insert(Transaction), [{**values, "user_id": user_id} for values in fresh])
+
+        totals = monthly_totals(fresh)
+        aggregates = {
+            aggregate.month: aggregate
+            for aggregate in (await db.execute(
+                select(MonthlyAggregate)
+                .where(MonthlyAggregate.user_id == user_id, MonthlyAggregate.month.in_(totals))
+                .with_for_update()
+            )).scalars()
+        }
+        for month, month_totals in totals.items():
+            if month in aggregates:
+                merge_monthly(aggregates[month], month_totals)
+            else:
+                db.add(MonthlyAggregate(user_id=user_id, month=month, **month_totals))
+
+    await db.commit()
+    return len(fresh), len(incoming) - len(fresh)
+
+
+def _missing(incoming: List[dict], stored: Iterable[tuple], key) -> List[dict]:
+    """The values of ``incoming`` not stored yet, counting repeated keys."""
+    remaining = Counter(stored)
+    missing = []
+    for values in incoming:
+        values_key = key(values)
+        if remaining[values_key]:
+            remaining[values_key] -= 1
+        else:
+            missing.append(values)
+    return missing
+
+
+async def _sync_history(db: AsyncSession, user_id: int) -> int:
+    """Add the user_financials history points missing from a user's rows (not committed).
+
+    Rows already stored, including transactions appended since the import,
+    are kept; the monthly aggregates are then recomputed from the stored
+    transactions. Returns the number of transaction and balance rows added.
+    """
+    Transaction = models.Transaction
+    BalanceRecord = models.BalanceRecord
+    MonthlyAggregate = models.MonthlyAggregate
+    user = await db.get(
+        models.user_profile.User,
+        user_id,
+        options=[undefer_financials(selectinload(models.user_profile.User.financials), HISTORY_FIELDS)],
+    )
+    if user is None or user.financials is None:
+        return 0
+
+    transactions, balances, _ = history_values(user.financials)
+    stored = await db.execute(
+        select(Transaction.timestamp, Transaction.amount, Transaction.narration)
+        .where(Transaction.user_id == user_id)
+    )
+    transactions = _missing(
+        transactions,
+        (_dedup_key(*row) for row in stored),
+        lambda values: _dedup_key(values["timestamp"], values["amount"], values["narration"]),
+    )
+    stored = await db.execute(
+        select(BalanceRecord.timestamp, BalanceRecord.balance).where(BalanceRecord.user_id == user_id)
+    )
+    balances = _missing(
+        balances,
+        ((to_utc(timestamp), balance) for timestamp, balance in stored),
+        lambda values: (values["timestamp"], values["balance"]),
+    )
+    if transactions:
+        await db.execute(insert(Transaction), [{**values, "user_id": user_id} for values in transactions])
+    if balances:
+        await db.execute(insert(BalanceRecord), [{**values, "user_id": user_id} for values in balances])
+
+    stored = await db.execute(
+        select(
+            Transaction.direction,
+            Transaction.timestamp,
+            Transaction.amount,
+            Transaction.category,
+            Transaction.balance,
+        ).where(Transaction.user_id == user_id)
+    )
+    totals = monthly_totals({**row._asdict(), "timestamp": to_utc(row.timestamp)} for row in stored)
+    await db.execute(delete(MonthlyAggregate).where(MonthlyAggregate.user_id == user_id))
+    db.add_all(
+        MonthlyAggregate(user_id=user_id, month=month, **month_totals)
+        for month, month_totals in totals.items()
+    )
+    await db.flush()
+    return len(transactions) + len(balances)
+
+
+async def backfill_history(db: AsyncSession, user_id: int) -> int:
+    """Load a user's user_financials histories into their transaction and balance rows.
+
+    Only points not stored yet are added, so rows appended since the import
+    survive; the monthly aggregates are recomputed. Returns the number of
+    rows added.
+    """
+    written = await _sync_history(db, user_id)
+    await db.commit()
+    return written
+
+
+async def backfill_all() -> None:
+    from database import AsyncSessionLocal, async_engine
+
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(select(models.user_profile.User.id))).scalars().all()
+        for user_id in user_ids:
+            written = await backfill_history(db, user_id)
+            await user_context_cache.invalidate(user_id)
+            logger.info(f"Backfilled {written} missing history rows for user {user_id}")
+    await async_engine.dispose()
+
+
+# Users validated per process pool task, and rows per INSERT/COPY round trip
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CHUNK_ROWS = 5000
+
+
+@dataclass
+class BatchReport:
+    batch: int
+    users: int = 0
+    transactions: int = 0
+    balances: int = 0
+    seconds: float = 0.0
+    peak_memory_mb: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.users + self.transactions + self.balances
+        return rows / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class IngestionReport:
+    batches: List[BatchReport] = field(default_factory=list)
+
+    @property
+    def users(self) -> int:
+        return sum(batch.users for batch in self.batches)
+
+    @property
+    def transactions(self) -> int:
+        return sum(batch.transactions for batch in self.batches)
+
+    @property
+    def balances(self) -> int:
+        return sum(batch.balances for batch in self.batches)
+
+    @property
+    def errors(self) -> List[str]:
+        return [error for batch in self.batches for error in batch.errors]
+
+    @property
+    def peak_memory_mb(self) -> float:
+        return max((batch.peak_memory_mb for batch in self.batches), default=_peak_memory_mb())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "users": self.users,
+            "transactions": self.transactions,
+            "balances": self.balances,
+            "errors": self.errors,
+            "peak_memory_mb": round(self.peak_memory_mb, 1),
+            "batches": [
+                {
+                    "batch": batch.batch,
+                    "users": batch.users,
+                    "transactions": batch.transactions,
+                    "balances": batch.balances,
+                    "seconds": round(batch.seconds, 3),
+                    "rows_per_second": round(batch.rows_per_second),
+                    "peak_memory_mb": round(batch.peak_memory_mb, 1),
+                    "errors": len(batch.errors),
+                }
+                for batch in self.batches
+            ],
+        }
+
+
+def _peak_memory_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def iter_user_documents(stream: IO[bytes]) -> Iterator[dict]:
+    """Yield user documents one at a time from a single object or an array."""
+    events = ijson.parse(stream, use_float=True)
+    first = next(events, None)
+    if first is None:
+        return
+    prefix = "item" if first[1] == "start_array" else ""
+    yield from ijson.items(chain([first], events), prefix)
+
+
+def prepare_user(document: dict) -> Dict[str, Any]:
+    """Validate one user document and turn it into insertable column values.
+
+    Runs in a worker process: validation and bcrypt hashing are the CPU-heavy
+    part of ingestion.
+    """
+    from app.pydanticModels.user import UserCreate
+    from app.security import get_password_hash
+
+    user_in = UserCreate.model_validate(document)
+    transactions, balances, monthly = history_values(user_in.financials)
+    return {
+        "user": {
+            **user_in.model_dump(exclude={"financials", "password"}),
+            "hashed_password": get_password_hash(user_in.password),
+        },
+        "financials": user_in.financials.model_dump(),
+        "transactions": transactions,
+        "balances": balances,
+        "monthly": monthly,
+    }
+
+
+def prepare_batch(documents: List[dict]) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """prepare_user over a batch; failures come back as messages, not exceptions."""
+    prepared = []
+    for document in documents:
+        try:
+            prepared.append((prepare_user(document), None))
+        except (ValidationError, ValueError) as e:
+            email = document.get("email") if isinstance(document, dict) else None
+            prepared.append((None, f"{email or 'user'}: {e}"))
+    return prepared
+
+
+def _copy_rows(connection: Connection, table: Table, rows: List[dict]) -> None:
+    """Stream rows through PostgreSQL COPY (psycopg2 only)."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row.values()]
+        )
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def bulk_insert(connection: Connection, table: Table, rows: List[dict], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    """Insert rows in chunks: COPY on PostgreSQL, executemany elsewhere."""
+    use_copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        if use_copy:
+            _copy_rows(connection, table, chunk)
+        else:
+            connection.execute(insert(table), chunk)
+
+
+# User columns with a unique constraint, checked before inserting a batch
+UNIQUE_USER_FIELDS = ("email", "pan_id", "passport_id")
+
+
+def write_batch(db: Session, prepared: List[dict], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[int, int, int, List[str]]:
+    """Insert a batch of prepared users in one transaction.
+
+    Users whose email, PAN or passport number is already registered (or
+    taken by an earlier user of the batch) are skipped. Returns the number
+    of users, transactions and balance points written, and the skip messages.
+    """
+    User = models.user_profile.User
+    seen: Dict[str, set] = {}
+    for name in UNIQUE_USER_FIELDS:
+        column = getattr(User, name)
+        values = [item["user"][name] for item in prepared if item["user"].get(name) is not None]
+        seen[name] = set(
+            db.execute(select(column).where(column.in_(values))).scalars()
+        ) if values else set()
+    errors = []
+    fresh = []
+    for item in prepared:
+        user = item["user"]
+        taken = [
+            name for name in UNIQUE_USER_FIELDS
+            if user.get(name) is not None and user[name] in seen[name]
+        ]
+        if taken:
+            what = "" if taken == ["email"] else " and ".join(taken) + " "
+            errors.append(f"{user['email']}: {what}already registered")
+            continue
+        for name in UNIQUE_USER_FIELDS:
+            if user.get(name) is not None:
+                seen[name].add(user[name])
+        fresh.append(item)
+    if not fresh:
+        return 0, 0, 0, errors
+
+    user_ids = db.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [item["user"] for item in fresh],
+    ).all()
+    db.execute(
+        insert(models.user_financials_model.UserFinancials),
+        [{**item["financials"], "user_id": user_id} for item, user_id in zip(fresh, user_ids)],
+    )
+
+    transactions = [
+        {**values, "user_id": user_id}
+        for item, user_id in zip(fresh, user_ids)
+        for values in item["transactions"]
+    ]
+    balances = [
+        {**values, "user_id": user_id}
+        for item, user_id in zip(fresh, user_ids)
+        for values in item["balances"]
+    ]
+    monthly = [
+        {**values, "user_id": user_id}
+        for item, user_id in zip(fresh, user_ids)
+        for values in item["monthly"]
+    ]
+    connection = db.connection()
+    bulk_insert(connection, models.Transaction.__table__, transactions, chunk_rows)
+    bulk_insert(connection, models.BalanceRecord.__table__, balances, chunk_rows)
+    bulk_insert(connection, models.MonthlyAggregate.__table__, monthly, chunk_rows)
+    db.commit()
+
+    return len(fresh), len(transactions), len(balances), errors
+
+
+def write_batch_isolating_conflicts(
+    db: Session, prepared: List[dict], chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Tuple[int, int, int, List[str]]:
+    """write_batch, retried one user at a time if the batch hits a constraint.
+
+    A conflict the pre-check could not see (e.g. a concurrent writer taking
+    the same email) then fails only the offending users, not the batch.
+    """
+    try:
+        return write_batch(db, prepared, chunk_rows)
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning(f"Batch hit a constraint ({e.orig}), retrying user by user")
+
+    users = transactions = balances = 0
+    errors = []
+    for item in prepared:
+        try:
+            written = write_batch(db, [item], chunk_rows)
+        except IntegrityError as e:
+            db.rollback()
+            errors.append(f"{item['user']['email']}: {e.orig}")
+            continue
+        users += written[0]
+        transactions += written[1]
+        balances += written[2]
+        errors.extend(written[3])
+    return users, transactions, balances, errors
+
+
+def _batches(documents: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        batch = list(islice(documents, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _InlineExecutor:
+    """Runs each submitted call right away in this process (``workers=1``)."""
+
+    def __enter__(self) -> "_InlineExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def submit(self, fn, *args: Any) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def ingest_stream(
+    stream: IO[bytes],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> IngestionReport:
+    """Stream users from ``stream`` into the database.
+
+    Parsing stays a few batches ahead of the database: while one batch is
+    inserted the pool validates the next ones, and at most ``workers + 1``
+    batches are held in memory at once. ``workers`` defaults to the CPU
+    count; with ``workers=1`` batches are prepared in this process, one at
+    a time, without forking a pool. Each batch report carries the process's
+    peak memory so far.
+    """
+    from database import SessionLocal
+
+    workers = workers or os.cpu_count() or 1
+    lookahead = workers + 1 if workers > 1 else 1
+    report = IngestionReport()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+    with executor as pool:
+        pending: Deque[Future] = deque()
+        batches = _batches(iter_user_documents(stream), batch_size)
+
+        def refill() -> None:
+            while len(pending) < lookahead:
+                batch = next(batches, None)
+                if batch is None:
+                    return
+                pending.append(pool.submit(prepare_batch, batch))
+
+        refill()
+        with SessionLocal() as db:
+            while pending:
+                started = time.perf_counter()
+                prepared = pending.popleft().result()
+                refill()
+
+                batch_report = BatchReport(batch=len(report.batches) + 1)
+                batch_report.errors = [error for _, error in prepared if error]
+                valid = [item for item, _ in prepared if item is not None]
+                if valid:
+                    try:
+                        users, transactions, balances, skipped = write_batch_isolating_conflicts(
+                            db, valid, chunk_rows
+                        )
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Batch {batch_report.batch} failed: {e}")
+                        batch_report.errors.append(f"batch {batch_report.batch}: {e}")
+                    else:
+                        batch_report.users = users
+                        batch_report.transactions = transactions
+                        batch_report.balances = balances
+                        batch_report.errors.extend(skipped)
+
+                batch_report.seconds = time.perf_counter() - started
+                batch_report.peak_memory_mb = _peak_memory_mb()
+                report.batches.append(batch_report)
+                logger.info(
+                    f"Batch {batch_report.batch}: {batch_report.users} users, "
+                    f"{batch_report.transactions} transactions, {batch_report.balances} balances "
+                    f"in {batch_report.seconds:.2f}s ({batch_report.rows_per_second:,.0f} rows/s), "
+                    f"peak memory {batch_report.peak_memory_mb:.0f} MB, "
+                    f"{len(batch_report.errors)} errors"
+                )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.services.ingestion")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="stream users from a JSON dump")
+    load.add_argument("path", help="user.json-shaped object or array of them ('-' for stdin)")
+    load.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    load.add_argument("--workers", type=int, default=None)
+    load.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    commands.add_parser("backfill", help="add missing history rows from user_financials")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        asyncio.run(backfill_all())
+    else:
+        source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+        with source:
+            result = ingest_stream(source, args.batch_size, args.workers, args.chunk_rows)
+        summary = result.summary()
+        print(
+            f"Loaded {summary['users']} users, {summary['transactions']} transactions, "
+            f"{summary['balances']} balances; {len(summary['errors'])} errors; "
+            f"peak memory {summary['peak_memory_mb']} MB"
+        )
+        for error in summary["errors"]:
+            print(f"  {error}")
@@ -0,0 +1,85 @@
+"""
+Materialized latest analysis per user.
+
+Every writer of an analysis (the financial-analysis endpoint and the
+analysis agent) calls ``save_latest_analysis`` in its own transaction, so the
+user_latest_analysis row always holds the most recent one, already encoded
+with its ETag. Readers fetch those bytes by primary key and send them as-is.
+Each worker also keeps the documents it served in the document cache, keyed
+by user and versioned by ETag; the read then brings the bytes over from the
+database only when the row's ETag differs from the cached one.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import case, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.pydanticModels import financial_analysis as financial_analysis_schema
+from app.services.document_cache import document_cache
+from app.services.http_cache import etag_for
+
+LATEST_ANALYSIS_KEY = "latest_analysis"
+
+
+async def save_latest_analysis(
+    db: AsyncSession,
+    user_id: int,
+    *,
+    analysis: Optional[financial_analysis_schema.FinancialAnalysis] = None,
+    financial_analysis_id: Optional[int] = None,
+    raw_analysis: Optional[str] = None,
+    scenarios: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """Replace the user's materialized analysis; the caller commits."""
+    latest = financial_analysis_schema.LatestFinancialAnalysis(
+        source="api" if analysis is not None else "agent",
+        updated_at=datetime.now(timezone.utc),
+        analysis=analysis,
+        raw_analysis=raw_analysis,
+        scenarios=scenarios,
+    )
+    document = latest.model_dump_json().encode()
+    await db.merge(
+        models.UserLatestAnalysis(
+            user_id=user_id,
+            financial_analysis_id=financial_analysis_id,
+            document=document,
+            etag=etag_for(document),
+            updated_at=latest.updated_at,
+        )
+    )
+
+
+async def load_latest_analysis(
+    db: AsyncSession, user_id: int
+) -> Optional[Tuple[Optional[bytes], Optional[str]]]:
+    """
+    The user's materialized analysis and its ETag, (None, None) if there is
+    none yet, or None if the user does not exist. One indexed query, which
+    leaves the document out when the cached copy is still current.
+    """
+    User = models.user_profile.User
+    Latest = models.UserLatestAnalysis
+    key = (LATEST_ANALYSIS_KEY, user_id)
+    cached = document_cache.get(key)
+    document = Latest.document
+    if cached is not None:
+        document = case((Latest.etag == cached.version, null()), else_=Latest.document)
+    row = (await db.execute(
+        select(User.id, Latest.etag, document.label("document"))
+        .outerjoin(Latest, Latest.user_id == User.id)
+        .where(User.id == user_id)
+    )).first()
+    if row is None:
+        return None
+    if row.etag is None:
+        return None, None
+    if row.document is None:
+        return cached.body, cached.etag
+    cached = document_cache.put(
+        key, orjson.loads(row.document), version=row.etag, body=row.document, etag=row.etag
+    )
+    return cached.body, cached.etag
@@ -0,0 +1,277 @@
+"""
+Deterministic loan scenario engine.
+
+Evaluates every bank quote over a grid of tenures and down payments in one
+vectorized NumPy pass, so analysis_agent can hand the LLM finished figures
+instead of asking it to do the arithmetic.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.pydanticModels.financial_analysis import ScenarioAssumptions, ScenarioCalculations
+
+# Grid explored for every quote, on top of the quote's own tenure
+DEFAULT_TENURES_MONTHS = (36, 60, 84)
+DEFAULT_DOWN_PAYMENT_RATIOS = (0.1, 0.2, 0.3)
+
+# Months of expenses kept aside as an emergency buffer
+EMERGENCY_BUFFER_MONTHS = 6
+# Highest debt-to-income ratio considered affordable
+MAX_DTI = 0.5
+# Outflow categories that count as existing loan obligations
+EMI_CATEGORY_KEYWORDS = ("emi", "loan")
+
+
+def is_emi_category(category: str) -> bool:
+    """Whether an outflow category counts as an existing loan obligation."""
+    category = category.lower()
+    return any(word in category for word in EMI_CATEGORY_KEYWORDS)
+
+
+def _months(points: Iterable[Any]) -> int:
+    """Number of distinct calendar months covered by a transaction history."""
+    return len({(p.timestamp.year, p.timestamp.month) for p in points}) or 1
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    # SQLite hands timezone-aware columns back naive (stored in UTC)
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+@dataclass
+class FinancialProfile:
+    """Monthly figures the scenarios are measured against."""
+
+    monthly_income: float
+    existing_emi: float
+    monthly_expenses: float
+    cash_balance: float
+    investments: float
+    credit_score: Optional[int] = None
+
+    @property
+    def emergency_buffer(self) -> float:
+        return self.monthly_expenses * EMERGENCY_BUFFER_MONTHS
+
+    @property
+    def liquidity_after_buffer(self) -> float:
+        return max(self.cash_balance + self.investments - self.emergency_buffer, 0.0)
+
+    @property
+    def max_affordable_emi(self) -> float:
+        return max(self.monthly_income * MAX_DTI - self.existing_emi, 0.0)
+
+    @classmethod
+    def from_financials(
+        cls, financials: Any, monthly: Optional[Sequence[Any]] = None
+    ) -> "FinancialProfile":
+        """Build a profile from a UserFinancials row (or anything shaped like one).
+
+        When the user's MonthlyAggregate rows are given, income, outflows and
+        the latest balance come from them, so transactions appended after
+        onboarding are included without decoding the JSON histories.
+        """
+        if financials is None:
+            return cls(0.0, 0.0, 0.0, 0.0, 0.0)
+
+        balances = financials.bank_balance_history or []
+        latest_balance = max(balances, key=lambda p: p.timestamp) if balances else None
+        cash_balance = latest_balance.balance if latest_balance else 0.0
+
+        if monthly:
+            income_months = sum(1 for m in monthly if m.inflow_count) or 1
+            outflow_months = sum(1 for m in monthly if m.outflow_count) or 1
+            inflow_total = sum(m.inflow_total for m in monthly)
+            existing_emi = sum(m.emi_outflow_total for m in monthly) / outflow_months
+            monthly_expenses = sum(m.outflow_total for m in monthly) / outflow_months
+
+            closing = max(
+                (m for m in monthly if m.closing_balance_at is not None),
+                key=lambda m: _as_utc(m.closing_balance_at),
+                default=None,
+            )
+            if closing is not None and (
+                latest_balance is None
+                or _as_utc(closing.closing_balance_at) > _as_utc(latest_balance.timestamp)
+            ):
+                cash_balance = closing.closing_balance
+        else:
+            inflows = financials.inflow_history or []
+            outflows = financials.outflow_history or []
+            income_months = _months(inflows)
+            inflow_total = sum(t.amount for t in inflows)
+            existing_emi = (
+                sum(t.amount for t in outflows if is_emi_category(t.category)) / _months(outflows)
+            )
+            monthly_expenses = sum(t.amount for t in outflows) / _months(outflows)
+
+        if financials.total_income:
+            monthly_income = financials.total_income / 12
+        else:
+            monthly_income = inflow_total / income_months
+
+        investments = sum(
+            holding.current_value
+            for holdings in (
+                financials.mutual_funds_summary,
+                financials.equities_summary,
+                financials.etf_summary,
+            )
+            for holding in holdings or []
+        )
+
+        return cls(
+            monthly_income=float(monthly_income),
+            existing_emi=float(existing_emi),
+            monthly_expenses=float(monthly_expenses),
+            cash_balance=float(cash_balance),
+            investments=float(investments),
+            credit_score=financials.credit_score,
+        )
+
+
+@dataclass
+class ScenarioResult:
+    """One evaluated (quote, tenure, down payment) combination."""
+
+    bank_name: str
+    quote_id: Optional[int]
+    tenure_months: int
+    assumptions: ScenarioAssumptions
+    calculations: ScenarioCalculations
+    dti_ratio: float
+    feasible: bool
+
+    @property
+    def scenario_name(self) -> str:
+        return (
+            f"{self.bank_name} - {self.tenure_months} months, "
+            f"₹{self.assumptions.downPayment:,} down"
+        )
+
+
+def compute_emi(principal: np.ndarray, annual_rate: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Standard reducing-balance EMI, element-wise over broadcastable arrays."""
+    monthly_rate = annual_rate / 1200.0
+    growth = np.power(1.0 + monthly_rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        emi = principal * monthly_rate * growth / (growth - 1.0)
+    return np.where(monthly_rate > 0, emi, principal / months)
+
+
+def build_scenarios(
+    bank_quotes: Sequence[Any],
+    profile: FinancialProfile,
+    purchase_amount: Optional[float],
+    tenures_months: Sequence[int] = DEFAULT_TENURES_MONTHS,
+    down_payment_ratios: Sequence[float] = DEFAULT_DOWN_PAYMENT_RATIOS,
+) -> List[ScenarioResult]:
+    """Evaluate every quote × tenure × down payment and rank the results.
+
+    The loan is capped at each quote's sanctioned amount, so the down payment
+    grows to cover the remainder. Feasible scenarios (DTI within MAX_DTI and
+    the emergency buffer intact) come first, then the cheapest in total interest.
+    """
+    if not bank_quotes:
+        return []
+
+    amounts = np.array([q.amount for q in bank_quotes], dtype=float)
+    rates = np.array([q.interest_rate for q in bank_quotes], dtype=float)
+    tenures = np.array(
+        sorted(set(tenures_months) | {q.tenure for q in bank_quotes}), dtype=float
+    )
+    ratios = np.array(down_payment_ratios, dtype=float)
+    price = float(purchase_amount or amounts.max())
+
+    # Shapes: quotes (Q, 1, 1), tenures (1, T, 1), down payments (1, 1, D)
+    amount_q = amounts[:, None, None]
+    rate_q = rates[:, None, None]
+    tenure_t = tenures[None, :, None]
+    loan = np.minimum(price * (1.0 - ratios[None, None, :]), amount_q)
+    loan = np.broadcast_to(loan, (len(amounts), len(tenures), len(ratios)))
+    down_payment = price - loan
+
+    emi = compute_emi(loan, rate_q, tenure_t)
+    total_interest = emi * tenure_t - loan
+    if profile.monthly_income > 0:
+        dti = (profile.existing_emi + emi) / profile.monthly_income
+    else:
+        dti = np.full_like(emi, np.inf)
+
+    from_cash = np.minimum(down_payment, profile.cash_balance)
+    remaining_investments = profile.investments - (down_payment - from_cash)
+    buffer_after = profile.cash_balance + profile.investments - down_payment
+    feasible = (dti <= MAX_DTI) & (buffer_after >= profile.emergency_buffer)
+
+    results: List[ScenarioResult] = []
+    seen = set()
+    for q, t, d in np.ndindex(emi.shape):
+        # Several down payment ratios collapse onto the same capped loan
+        key = (q, t, round(float(loan[q, t, d])))
+        if key in seen:
+            continue
+        seen.add(key)
+        quote = bank_quotes[q]
+        # Rounded so that the down payment and the loan still add up to the price
+        loan_amount = int(round(loan[q, t, d]))
+        results.append(ScenarioResult(
+            bank_name=quote.bank_name,
+            quote_id=getattr(quote, "id", None),
+            tenure_months=int(tenures[t]),
+            assumptions=ScenarioAssumptions(
+                downPayment=int(round(price)) - loan_amount,
+                loanAmount=loan_amount,
+                interestRate=float(rates[q]),
+                tenureYears=round(float(tenures[t]) / 12, 2),
+            ),
+            calculations=ScenarioCalculations(
+                estimatedEMI=int(round(emi[q, t, d])),
+                totalInterestPayable=int(round(total_interest[q, t, d])),
+                DTI=f"{dti[q, t, d] * 100:.1f}%" if np.isfinite(dti[q, t, d]) else "n/a",
+                remainingLiquidInvestments=int(round(remaining_investments[q, t, d])),
+                bufferAfterDownPayment=int(round(buffer_after[q, t, d])),
+            ),
+            dti_ratio=float(dti[q, t, d]),
+            feasible=bool(feasible[q, t, d]),
+        ))
+
+    results.sort(key=lambda r: (
+        not r.feasible,
+        r.calculations.totalInterestPayable,
+        r.dti_ratio,
+    ))
+    return results
+
+
+def format_for_prompt(profile: FinancialProfile, scenarios: Sequence[ScenarioResult], limit: int = 6) -> str:
+    """Render the profile metrics and top scenarios as prompt context."""
+    lines = [
+        "Pre-computed Metrics (use these figures as given):",
+        f"- Monthly income: ₹{profile.monthly_income:,.0f}",
+        f"- Existing EMI obligations: ₹{profile.existing_emi:,.0f} per month",
+        f"- Average monthly outflows: ₹{profile.monthly_expenses:,.0f}",
+        f"- Liquid assets: ₹{profile.cash_balance:,.0f} bank balance + ₹{profile.investments:,.0f} investments",
+        f"- Emergency buffer ({EMERGENCY_BUFFER_MONTHS} months of outflows): ₹{profile.emergency_buffer:,.0f}",
+        f"- Liquidity after buffer: ₹{profile.liquidity_after_buffer:,.0f}",
+        f"- Max affordable EMI (DTI ≤ {MAX_DTI:.0%}): ₹{profile.max_affordable_emi:,.0f}",
+        "",
+        "Pre-computed Scenarios (ranked; feasible first, then lowest total interest):",
+    ]
+    if not scenarios:
+        lines.append("- No bank quotes available to compute scenarios.")
+    for index, scenario in enumerate(scenarios[:limit], start=1):
+        a, c = scenario.assumptions, scenario.calculations
+        lines.append(
+            f"{index}. {scenario.scenario_name} at {a.interestRate}%: "
+            f"loan ₹{a.loanAmount:,}, EMI ₹{c.estimatedEMI:,}, DTI {c.DTI}, "
+            f"total interest ₹{c.totalInterestPayable:,}, "
+            f"liquidity left ₹{c.bufferAfterDownPayment:,}, "
+            f"investments left ₹{c.remainingLiquidInvestments:,}, "
+            f"{'feasible' if scenario.feasible else 'NOT feasible'}"
+        )
+    return "\n".join(lines)
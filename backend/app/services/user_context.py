@@ -0,0 +1,256 @@
+"""
+Read-through cache of per-user context shared by the routes and the agents.
+
+A user context is everything the analysis and most endpoints read about a
+user: the profile, the scalar financials, the derived FinancialProfile and
+the bank quotes. It is small, detached from any session and picklable, so it
+can live in process memory or in a shared backend such as Redis (set
+USER_CONTEXT_CACHE_URL) so that every worker benefits. Writers call
+``invalidate`` after committing. With the in-process backend and more than one
+worker, invalidations are published through the WebSocket broker
+(WEBSOCKET_BROKER_URL) so every worker drops its copy; without either, other
+workers may serve a stale context for up to USER_CONTEXT_CACHE_TTL_SECONDS.
+
+Plain existence checks should use ``user_exists``, or ``user_context_cache.exists``
+on hot paths, rather than loading a context.
+"""
+import logging
+import pickle
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app import models
+from app.config import settings
+from app.services.broker import Broker, make_broker
+from app.models.user_financials_model import HEAVY_FIELDS, HOLDINGS_FIELDS, undefer_financials
+from app.pydanticModels import financials as financials_schema
+from app.pydanticModels import user as user_schema
+from app.services.cache import LRUCache
+from app.services.scenario_engine import FinancialProfile
+
+logger = logging.getLogger(__name__)
+
+# Bump when UserContext changes shape so shared backends drop old entries
+USER_CONTEXT_VERSION = 1
+
+
+@dataclass
+class UserContext:
+    user: user_schema.User
+    financials: Optional[user_schema.UserFinancialsSummary]
+    profile: FinancialProfile
+    bank_quotes: List[financials_schema.BankQuote]
+
+
+async def load_user_context(db: AsyncSession, user_id: int) -> Optional[UserContext]:
+    """Build a user's context from the database; None if the user does not exist."""
+    monthly = (await db.execute(
+        select(models.MonthlyAggregate)
+        .where(models.MonthlyAggregate.user_id == user_id)
+        .order_by(models.MonthlyAggregate.month)
+    )).scalars().all()
+
+    # Only the deferred fields the profile needs: with monthly aggregates
+    # available the transaction histories are not read at all
+    heavy_fields = HOLDINGS_FIELDS + ("bank_balance_history",) if monthly else HEAVY_FIELDS
+    user = await db.get(
+        models.user_profile.User,
+        user_id,
+        options=[undefer_financials(selectinload(models.user_profile.User.financials), heavy_fields)],
+    )
+    if user is None:
+        return None
+
+    bank_quotes = (await db.execute(
+        select(models.bank_quote.BankQuote).where(models.bank_quote.BankQuote.user_id == user_id)
+    )).scalars().all()
+
+    financials = user.financials
+    return UserContext(
+        user=user_schema.User.model_validate(user),
+        financials=(
+            user_schema.UserFinancialsSummary.model_validate(financials) if financials else None
+        ),
+        profile=FinancialProfile.from_financials(financials, monthly),
+        bank_quotes=[financials_schema.BankQuote.model_validate(quote) for quote in bank_quotes],
+    )
+
+
+async def user_exists(db: AsyncSession, user_id: int) -> bool:
+    """Whether the user exists: one primary-key lookup, no context loaded."""
+    return (await db.execute(
+        select(models.user_profile.User.id).where(models.user_profile.User.id == user_id)
+    )).first() is not None
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[UserContext]: ...
+
+    async def set(self, key: str, value: UserContext) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class InProcessBackend:
+    """LRU + TTL cache local to this worker."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[UserContext]:
+        return self._cache.get(key, count=False)
+
+    async def set(self, key: str, value: UserContext) -> None:
+        self._cache.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        self._cache.pop(key)
+
+
+class RedisBackend:
+    """Cache shared by every worker through Redis (needs the redis package)."""
+
+    def __init__(self, url: str, ttl: float):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self.ttl = int(ttl)
+
+    async def get(self, key: str) -> Optional[UserContext]:
+        payload = await self._client.get(key)
+        return pickle.loads(payload) if payload is not None else None
+
+    async def set(self, key: str, value: UserContext) -> None:
+        await self._client.set(key, pickle.dumps(value), ex=self.ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+
+class UserContextCache:
+    """Read-through cache of UserContext keyed by user id, with hit/miss counters."""
+
+    def __init__(self, backend: CacheBackend, broker: Optional[Broker] = None, maxsize: int = 1024):
+        self.backend = backend
+        # Ids known to exist; users are never deleted, so entries never go stale
+        self._known = LRUCache(maxsize=maxsize)
+        # Tells the other workers to drop their copy (per-worker backends only)
+        self.broker = broker
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user_context:v{USER_CONTEXT_VERSION}:{user_id}"
+
+    async def get(self, user_id: int, db: Optional[AsyncSession] = None) -> Optional[UserContext]:
+        """Return the user's context, loading it through ``db`` (or a new session) on a miss."""
+        key = self._key(user_id)
+        try:
+            context = await self.backend.get(key)
+        except Exception as e:
+            # A shared backend being down must not take the API with it
+            self.errors += 1
+            logger.warning(f"User context cache read failed: {e}")
+            context = None
+        if context is not None:
+            self.hits += 1
+            return context
+
+        self.misses += 1
+        if db is None:
+            from database import AsyncSessionLocal
+
+            async with AsyncSessionLocal() as session:
+                context = await load_user_context(session, user_id)
+        else:
+            context = await load_user_context(db, user_id)
+
+        if context is not None:
+            try:
+                await self.backend.set(key, context)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"User context cache write failed: {e}")
+        return context
+
+    async def exists(self, user_id: int, db: AsyncSession) -> bool:
+        """Whether the user exists, without a query once this worker has seen them."""
+        if user_id in self._known:
+            self.hits += 1
+            return True
+        try:
+            cached = await self.backend.get(self._key(user_id)) is not None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"User context cache read failed: {e}")
+            cached = False
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if not await user_exists(db, user_id):
+                return False
+        self._known.set(user_id, True)
+        return True
+
+    async def start(self) -> None:
+        """Subscribe to invalidations published by other workers."""
+        if self.broker is not None:
+            await self.broker.start(self._on_invalidation)
+
+    async def stop(self) -> None:
+        if self.broker is not None:
+            await self.broker.stop()
+
+    async def _on_invalidation(self, payload: str) -> None:
+        try:
+            await self.backend.delete(self._key(int(payload)))
+        except Exception as e:
+            logger.warning(f"Ignoring user context invalidation {payload!r}: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop a user's context after a write that changes it, on every worker."""
+        try:
+            await self.backend.delete(self._key(user_id))
+            if self.broker is not None:
+                await self.broker.publish(str(user_id))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"User context cache invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def _make_cache() -> UserContextCache:
+    if settings.user_context_cache_url:
+        return UserContextCache(
+            RedisBackend(settings.user_context_cache_url, settings.user_context_cache_ttl_seconds),
+            maxsize=settings.user_context_cache_size,
+        )
+    # Per-worker copies: invalidate them all through the broker when one is set up
+    broker = (
+        make_broker(channel=f"{settings.websocket_broker_channel}_user_context")
+        if settings.websocket_broker_url
+        else None
+    )
+    return UserContextCache(
+        InProcessBackend(settings.user_context_cache_size, settings.user_context_cache_ttl_seconds),
+        broker,
+        maxsize=settings.user_context_cache_size,
+    )
+
+
+# Create a singleton instance
+user_context_cache = _make_cache()
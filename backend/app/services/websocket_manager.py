@@ -1,42 +1,324 @@
-from typing import List, Dict
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
 from fastapi import WebSocket
 import json
 import logging
 
+from app.config import settings
+from app.services.broker import Broker, make_broker
+
 logger = logging.getLogger(__name__)
 
+# Close codes: falling behind or server full ("try again later"), idle
+# ("going away"), and replaced by a newer connection of the same user. The
+# client only reconnects after non-1000 closes, so a replaced tab stays
+# closed instead of evicting the newer one in turn.
+SLOW_CONSUMER_CLOSE_CODE = 1013
+OVERLOADED_CLOSE_CODE = 1013
+IDLE_CLOSE_CODE = 1001
+REPLACED_CLOSE_CODE = 1000
+
+SLOW_CONSUMER_POLICIES = ("drop", "close")
+CLOSE_TIMEOUT_SECONDS = 5.0
+
+# Reasons a connection is closed by the server, counted in stats()
+EVICTION_REASONS = ("slow", "idle", "user_limit")
+
+PING_MESSAGE = json.dumps({"type": "ping"})
+
+
+class ConnectionWriter:
+    """Bounded outbound queue of one WebSocket, drained by its own task.
+
+    Senders only enqueue, so a slow or half-dead client never delays
+    messages to anyone else. When the queue is full the slow-consumer policy
+    applies: "drop" discards the oldest queued message, "close" disconnects
+    the client. A send that fails disconnects it too, and so does one that
+    the manager finds stuck for longer than the send timeout.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_closed: Callable[["ConnectionWriter"], None],
+        max_queue: int,
+        policy: str,
+    ):
+        loop = asyncio.get_running_loop()
+        self.websocket = websocket
+        self.policy = policy
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.closed = False
+        # Why the server closed the connection (see EVICTION_REASONS)
+        self.eviction_reason: Optional[str] = None
+        # Loop time the in-flight send started at, None when idle
+        self.sending_since: Optional[float] = None
+        # Loop times of the last message from the client and the last ping
+        self.last_seen = self.last_ping = loop.time()
+        self._queue: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Future] = None
+        self._closed_event = asyncio.Event()
+        self._on_closed = on_closed
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, message: str) -> bool:
+        """Queue a message without waiting; False if the connection was dropped instead."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "close":
+                logger.warning("Closing slow WebSocket client: send queue full")
+                self.evict("slow", SLOW_CONSUMER_CLOSE_CODE)
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append(message)
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+        return True
+
+    async def _run(self):
+        # A plain deque and one wake-up future keep the per-message cost low
+        # with thousands of writers; the send timeout is enforced by the
+        # manager's sweep instead of a timer per send
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup = loop.create_future()
+                    await self._wakeup
+                    continue
+                message = self._queue.popleft()
+                self.sending_since = loop.time()
+                await self.websocket.send_text(message)
+                self.sending_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending WebSocket message, closing connection: {e}")
+            self.close()
+
+    async def receive_text(self) -> Optional[str]:
+        """
+        Next message from the client, or None once the server has closed the
+        connection (so a handler blocked on a dead peer still returns).
+        Raises WebSocketDisconnect when the client goes away.
+        """
+        if self.closed:
+            return None
+        receive = asyncio.ensure_future(self.websocket.receive_text())
+        closed = asyncio.ensure_future(self._closed_event.wait())
+        done, pending = await asyncio.wait({receive, closed}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if receive not in done:
+            return None
+        self.last_seen = asyncio.get_running_loop().time()
+        return receive.result()
+
+    def evict(self, reason: str, code: int):
+        """Close the connection from the server side for `reason`."""
+        if not self.closed:
+            self.eviction_reason = reason
+            self.close(code)
+
+    def close(self, code: Optional[int] = None):
+        """Stop the writer and unregister the connection; closes the socket when `code` is given."""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._closed_event.set()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._on_closed(self)
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass  # The client is gone or not reading either way
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+
 class ConnectionManager:
-    def __init__(self):
-        # Store active connections by user_id
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    """Tracks this worker's WebSockets and routes messages to them.
+
+    Sends go through the broker, so a message published on any worker
+    reaches the user's sockets on every worker; each worker hands it to the
+    writers of the connections it holds.
+
+    Memory stays bounded under reconnect storms: a worker holds at most
+    `max_connections` sockets (more are refused), a user at most
+    `max_connections_per_user` (the oldest is replaced), and connections
+    that stop answering heartbeats are evicted after `idle_timeout`.
+    """
+
+    def __init__(
+        self,
+        broker: Optional[Broker] = None,
+        max_queue: int = settings.websocket_send_queue_size,
+        send_timeout: float = settings.websocket_send_timeout_seconds,
+        slow_consumer_policy: str = settings.websocket_slow_consumer_policy,
+        heartbeat_interval: float = settings.websocket_heartbeat_interval_seconds,
+        idle_timeout: float = settings.websocket_idle_timeout_seconds,
+        max_connections: int = settings.websocket_max_connections,
+        max_connections_per_user: int = settings.websocket_max_connections_per_user,
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        # Writers of the active connections, by user_id, oldest first
+        self.active_connections: Dict[str, Dict[WebSocket, ConnectionWriter]] = {}
+        self.broker = broker if broker is not None else make_broker()
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.max_connections_per_user = max_connections_per_user
+        self.connection_count = 0
+        self.rejected = 0
+        self.evictions = dict.fromkeys(EVICTION_REASONS, 0)
+        self._sweeper: Optional[asyncio.Task] = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Subscribe to the broker (also done on the first send)"""
+        async with self._start_lock:
+            if not self._started:
+                await self.broker.start(self._on_broker_message)
+                self._started = True
+                logger.info(f"WebSocket broker started: {type(self.broker).__name__}")
+
+    async def stop(self):
+        async with self._start_lock:
+            if self._started:
+                await self.broker.stop()
+                self._started = False
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    async def _sweep(self):
+        """Ping connections, and evict idle ones and ones stuck in a send"""
+        loop = asyncio.get_running_loop()
+        interval = min(1.0, self.send_timeout / 2, self.heartbeat_interval / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = loop.time()
+            for writer in self._writers():
+                if writer.sending_since is not None and now - writer.sending_since > self.send_timeout:
+                    logger.warning("Closing slow WebSocket client: send timed out")
+                    writer.evict("slow", SLOW_CONSUMER_CLOSE_CODE)
+                elif now - writer.last_seen > self.idle_timeout:
+                    writer.evict("idle", IDLE_CLOSE_CODE)
+                elif now - writer.last_ping >= self.heartbeat_interval:
+                    writer.last_ping = now
+                    writer.enqueue(PING_MESSAGE)
+
+    def _writers(self) -> List[ConnectionWriter]:
+        return [
+            writer
+            for connections in list(self.active_connections.values())
+            for writer in list(connections.values())
+        ]
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> Optional[ConnectionWriter]:
+        """Accept a new WebSocket connection; None if it was refused"""
+        if self.connection_count >= self.max_connections:
+            self.rejected += 1
+            logger.warning(f"Refusing WebSocket for user {user_id}: {self.connection_count} connections open")
+            await websocket.close(code=OVERLOADED_CLOSE_CODE)
+            return None
 
-    async def connect(self, websocket: WebSocket, user_id: str):
-        """Accept a new WebSocket connection"""
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        # Reconnects replace the user's oldest connections rather than pile up
+        connections = list(self.active_connections.get(user_id, {}).values())
+        for oldest in connections[: max(0, len(connections) - self.max_connections_per_user + 1)]:
+            oldest.evict("user_limit", REPLACED_CLOSE_CODE)
+
+        writer = ConnectionWriter(
+            websocket,
+            on_closed=lambda writer: self._remove(writer, user_id),
+            max_queue=self.max_queue,
+            policy=self.slow_consumer_policy,
+        )
+        self.active_connections.setdefault(user_id, {})[websocket] = writer
+        self.connection_count += 1
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
         logger.info(f"WebSocket connected for user: {user_id}")
+        return writer
 
-    def disconnect(self, websocket: WebSocket, user_id: str):
-        """Remove a WebSocket connection"""
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
+    def _remove(self, writer: ConnectionWriter, user_id: str):
+        if writer.eviction_reason is not None:
+            self.evictions[writer.eviction_reason] += 1
+        connections = self.active_connections.get(user_id)
+        if connections is not None and connections.get(writer.websocket) is writer:
+            del connections[writer.websocket]
+            self.connection_count -= 1
+            if not connections:
                 del self.active_connections[user_id]
-        logger.info(f"WebSocket disconnected for user: {user_id}")
+            logger.info(f"WebSocket disconnected for user: {user_id}")
+
+    def disconnect(self, websocket: WebSocket, user_id: str):
+        """Remove a WebSocket connection (safe to call more than once)"""
+        writer = self.active_connections.get(user_id, {}).get(websocket)
+        if writer is not None:
+            writer.close()
+
+    def send_to_connection(self, websocket: WebSocket, user_id: str, message: str) -> bool:
+        """Queue a message for one of this worker's connections"""
+        writer = self.active_connections.get(user_id, {}).get(websocket)
+        if writer is None:
+            return False
+        return writer.enqueue(message)
+
+    async def _publish(self, user_id: Optional[str], message: str):
+        payload = json.dumps({"user_id": user_id, "message": message})
+        try:
+            if not self._started:
+                await self.start()
+            await self.broker.publish(payload)
+        except Exception as e:
+            # Other workers miss this one, but this worker's sockets still get it
+            logger.error(f"WebSocket broker publish failed, delivering locally only: {e}")
+            await self._deliver(user_id, message)
+
+    async def _on_broker_message(self, payload: str):
+        try:
+            envelope = json.loads(payload)
+            user_id, message = envelope["user_id"], envelope["message"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Ignoring malformed broker message: {e}")
+            return
+        await self._deliver(user_id, message)
+
+    async def _deliver(self, user_id: Optional[str], message: str):
+        """Queue a message for this worker's connections of a user, or for all of them"""
+        if user_id is None:
+            writers = self._writers()
+        else:
+            # Every connection of the user (they might have multiple tabs)
+            writers = list(self.active_connections.get(user_id, {}).values())
+
+        # Enqueuing never waits, so the writers send concurrently
+        for writer in writers:
+            writer.enqueue(message)
 
     async def send_personal_message(self, message: str, user_id: str):
-        """Send a message to all connections for a specific user"""
-        if user_id in self.active_connections:
-            # Send to all connections for this user (they might have multiple tabs)
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id}: {e}")
-                    # Remove dead connections
-                    self.disconnect(connection, user_id)
+        """Send a message to all connections for a specific user, on every worker"""
+        await self._publish(str(user_id), message)
 
     async def send_redirect(self, user_id: str, redirect_to: str):
         """Send a redirect command to a specific user"""
@@ -48,14 +330,21 @@ class ConnectionManager:
         logger.info(f"Sent redirect to {redirect_to} for user {user_id}")
 
     async def broadcast(self, message: str):
-        """Send a message to all connected clients"""
-        for user_id, connections in self.active_connections.items():
-            for connection in connections:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to user {user_id}: {e}")
-                    self.disconnect(connection, user_id)
+        """Send a message to all connected clients, on every worker"""
+        await self._publish(None, message)
+
+    def stats(self) -> Dict[str, Any]:
+        """Gauges of this worker's connections and counters of refusals and evictions"""
+        writers = self._writers()
+        return {
+            "users": len(self.active_connections),
+            "connections": self.connection_count,
+            "max_connections": self.max_connections,
+            "queued_messages": sum(writer.queued for writer in writers),
+            "dropped_messages": sum(writer.dropped for writer in writers),
+            "rejected_connections": self.rejected,
+            "evictions": dict(self.evictions),
+        }
 
 # Create a singleton instance
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()
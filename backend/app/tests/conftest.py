@@ -0,0 +1,11 @@
+"""
+Point the application at a throwaway SQLite database before any test module
+imports `database`, and give the OpenAI client a placeholder key so the agent
+graph can be imported (tests never call the model).
+Run from backend/: python -m pytest -q app/tests
+"""
+import os
+import tempfile
+
+os.environ["DB_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
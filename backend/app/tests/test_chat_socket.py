@@ -0,0 +1,66 @@
+"""
+Chat turns carried over the user WebSocket, multiplexed by session_id.
+"""
+import asyncio
+import json
+
+from app.agents import chat_socket
+from app.agents.chat_socket import ChatSocket
+
+
+class FakeConnection:
+    def __init__(self):
+        self.frames = []
+
+    def enqueue(self, message: str):
+        self.frames.append(json.loads(message))
+
+
+async def fake_stream_chat(messages, config, user_id=None):
+    text = messages[0].content
+    if text == "wait":
+        await asyncio.sleep(10)
+    for ch in text:
+        yield {"type": "token", "agent": "conversation", "delta": ch}
+        await asyncio.sleep(0)
+    if text == "xy":
+        yield {"type": "redirect", "redirect_to": "/analysis"}
+    yield {"type": "done", "current_phase": "collecting_info", "user_id": user_id}
+
+
+def test_sessions_are_multiplexed_and_cancellable(monkeypatch):
+    monkeypatch.setattr(chat_socket, "stream_chat", fake_stream_chat)
+
+    async def scenario():
+        connection = FakeConnection()
+        chat = ChatSocket(connection, 7)
+        chat.handle({"type": "chat", "session_id": "a", "message": "ab"})
+        chat.handle({"type": "chat", "session_id": "a", "message": "cd"})
+        chat.handle({"type": "chat", "session_id": "b", "message": "xy"})
+        chat.handle({"type": "chat", "session_id": "c", "message": "wait"})
+        chat.handle({"type": "cancel", "session_id": "c"})
+        chat.handle({"type": "chat", "session_id": "d"})
+        assert not chat.handle({"type": "pong"})
+        for _ in range(20):
+            await asyncio.sleep(0)
+        # Finished sessions leave nothing behind
+        assert chat._turns == chat._locks == chat._phases == {}
+        await chat.close()
+        return connection.frames, chat.pending_turns
+
+    frames, pending = asyncio.run(scenario())
+    by_session = {}
+    for frame in frames:
+        by_session.setdefault(frame["session_id"], []).append(frame)
+
+    # Turns of one session run in order; sessions interleave
+    assert [f.get("delta") for f in by_session["a"] if f["type"] == "token"] == ["a", "b", "c", "d"]
+    assert [f["type"] for f in by_session["b"]] == ["token", "token", "redirect", "done", "phase"]
+    # Tokens carry only their delta, redirects belong to the session
+    assert by_session["b"][0] == {"type": "token", "session_id": "b", "agent": "conversation", "delta": "x"}
+    assert by_session["b"][2] == {"type": "redirect", "redirect_to": "/analysis", "session_id": "b"}
+    assert by_session["b"][3]["user_id"] == 7
+    assert [f["type"] for f in by_session["a"]].count("phase") == 1  # only on change
+    assert "c" not in by_session
+    assert by_session["d"] == [{"type": "error", "session_id": "d", "error": "A chat frame needs a non-empty message"}]
+    assert pending == 0
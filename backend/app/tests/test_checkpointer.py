@@ -0,0 +1,37 @@
+"""
+The checkpointer's hot cache must not outlive a newer checkpoint written by
+another worker: two savers on one database stand in for two workers.
+"""
+from langgraph.checkpoint.base import empty_checkpoint
+
+import app.models  # noqa: F401
+from app.agents.checkpointer import SQLCheckpointSaver
+from app.models.base import Base
+from database import SessionLocal, engine
+
+
+def _put(saver, config, channel_values):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = channel_values
+    return saver.put(config, checkpoint, {}, {})
+
+
+def test_cached_thread_is_reloaded_after_another_worker_writes():
+    Base.metadata.create_all(bind=engine)
+    worker_a, worker_b = SQLCheckpointSaver(SessionLocal), SQLCheckpointSaver(SessionLocal)
+    thread = {"configurable": {"thread_id": "shared", "checkpoint_ns": ""}}
+
+    first = _put(worker_a, thread, {"turn": 1})
+    assert worker_a.get_tuple(thread).checkpoint["channel_values"] == {"turn": 1}
+
+    # Worker B handles the next turn
+    worker_b.get_tuple(thread)
+    second = _put(worker_b, first, {"turn": 2})
+    assert worker_a.get_tuple(thread).checkpoint["channel_values"] == {"turn": 2}
+
+    # ... and records a pending write against it
+    worker_b.put_writes(second, [("messages", "hi")], "task")
+    assert worker_a.get_tuple(thread).pending_writes == [("task", "messages", "hi")]
+
+    worker_b.delete_thread("shared")
+    assert worker_a.get_tuple(thread) is None
@@ -0,0 +1,212 @@
+"""
+Speculative analyses and history folding in the chat graph, with the model
+calls replaced by fakes.
+"""
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+
+from app.agents import graph
+from app.agents.speculation import SpeculativeTasks
+
+CHAT_INFO = {"income_details": "salary", "upcoming_spends": "none", "dependents_info": "spouse"}
+STATE = {"user_id": 7, "chat_info": CHAT_INFO, "car_price": 900000.0}
+CONFIG = {"configurable": {"thread_id": "t"}}
+
+
+class FakeSummaryLLM:
+    def __init__(self, fail: bool = False):
+        self.prompts = []
+        self.fail = fail
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content="summary")
+
+
+def fake_compute(calls, text):
+    async def compute_analysis(user_id, chat_info, car_price):
+        calls.append((user_id, car_price))
+        await asyncio.sleep(0)
+        return {"analysis_result": {"raw_analysis": text}}, False
+
+    return compute_analysis
+
+
+def patch_analysis(monkeypatch, calls, replayed):
+    monkeypatch.setattr(graph, "speculative_analyses", SpeculativeTasks())
+    monkeypatch.setattr(graph, "compute_analysis", fake_compute(calls, "computed now"))
+    monkeypatch.setattr(graph, "_replay_reply", lambda agent, text: replayed.append((agent, text)))
+
+
+def test_speculative_analysis_is_used_when_the_inputs_match(monkeypatch):
+    calls, replayed, speculative_calls = [], [], []
+    patch_analysis(monkeypatch, calls, replayed)
+
+    async def scenario():
+        key = graph._analysis_inputs_key(STATE)
+        graph.speculative_analyses.start("t", key, lambda: fake_compute(speculative_calls, "speculative")(7, CHAT_INFO, 900000.0))
+        # Asking again for the same inputs keeps the running task
+        graph.speculative_analyses.start("t", key, lambda: fake_compute(speculative_calls, "again")(7, CHAT_INFO, 900000.0))
+        return await graph.analysis_agent(STATE, CONFIG)
+
+    updates = asyncio.run(scenario())
+    assert updates["analysis_result"]["raw_analysis"] == "speculative"
+    assert speculative_calls == [(7, 900000.0)] and calls == []
+    # Not streamed by a model call in the graph: replayed as tokens
+    assert replayed == [("analysis", "speculative")]
+
+
+def test_speculative_analysis_is_dropped_when_the_inputs_changed(monkeypatch):
+    calls, replayed, speculative_calls = [], [], []
+    patch_analysis(monkeypatch, calls, replayed)
+
+    async def scenario():
+        graph.speculative_analyses.start(
+            "t", graph._analysis_inputs_key({**STATE, "car_price": 500000.0}),
+            lambda: fake_compute(speculative_calls, "stale")(7, CHAT_INFO, 500000.0),
+        )
+        task = graph.speculative_analyses._tasks["t"][1]
+        updates = await graph.analysis_agent(STATE, CONFIG)
+        await asyncio.sleep(0)
+        return updates, task
+
+    updates, task = asyncio.run(scenario())
+    assert updates["analysis_result"]["raw_analysis"] == "computed now"
+    assert calls == [(7, 900000.0)]
+    assert task.cancelled()
+    assert graph.speculative_analyses._tasks == {}
+
+
+def test_extract_info_starts_and_cancels_the_speculative_analysis(monkeypatch):
+    monkeypatch.setattr(graph, "speculative_analyses", SpeculativeTasks())
+    started = []
+
+    async def compute_analysis(user_id, chat_info, car_price):
+        started.append(car_price)
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(graph, "compute_analysis", compute_analysis)
+    collected = {"value": True}
+
+    async def extract(chat_info, user_message, response):
+        return CHAT_INFO, 900000.0, collected["value"]
+
+    monkeypatch.setattr(graph, "extract_info_from_exchange", extract)
+    messages = [HumanMessage(content="hi", id="1"), AIMessage(content="Shall I analyze your loan options?", id="2")]
+
+    async def scenario():
+        updates = await graph.extract_info({"messages": messages, "user_id": 7}, CONFIG)
+        await asyncio.sleep(0)
+        task = graph.speculative_analyses._tasks["t"][1]
+
+        # The user adds something that is not a confirmation: back to collecting
+        collected["value"] = False
+        await graph.extract_info({"messages": messages, "user_id": 7, "current_phase": "collecting_info"}, CONFIG)
+        await asyncio.sleep(0)
+        return updates, task
+
+    updates, task = asyncio.run(scenario())
+    assert updates["current_phase"] == "confirming_analysis"
+    assert started == [900000.0]
+    assert task.cancelled() and graph.speculative_analyses._tasks == {}
+
+
+def test_unclaimed_speculative_tasks_expire():
+    async def scenario():
+        tasks = SpeculativeTasks(max_age=0)
+        tasks.start("a", "k", lambda: asyncio.sleep(10))
+        first = tasks._tasks["a"][1]
+        await asyncio.sleep(0.01)
+        tasks.start("b", "k", lambda: asyncio.sleep(10))
+        await asyncio.sleep(0)
+        tasks.discard("b")
+        return first, tasks
+
+    first, tasks = asyncio.run(scenario())
+    assert first.cancelled() and tasks._tasks == {}
+
+
+def _exchanges(count: int):
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+def test_summarize_history_folds_only_past_the_window(monkeypatch):
+    monkeypatch.setattr(graph.settings, "chat_history_window", 2)
+    monkeypatch.setattr(graph.settings, "chat_summary_batch", 1)
+    llm = FakeSummaryLLM()
+    monkeypatch.setattr(graph, "summary_llm", llm)
+
+    # Window (2 exchanges) + batch (1 exchange): nothing to fold yet
+    assert asyncio.run(graph.summarize_history({"messages": _exchanges(3)})) == {}
+    assert llm.prompts == []
+
+    messages = _exchanges(4)
+    updates = asyncio.run(graph.summarize_history({"messages": messages, "conversation_summary": "earlier"}))
+    assert updates["conversation_summary"] == "summary"
+    assert [m.id for m in updates["messages"]] == ["h0", "a0", "h1", "a1"]
+    assert all(isinstance(m, RemoveMessage) for m in updates["messages"])
+    assert "earlier" in llm.prompts[0]
+    assert "User: question 1" in llm.prompts[0] and "question 2" not in llm.prompts[0]
+
+
+def test_summarize_history_never_opens_the_window_on_a_reply(monkeypatch):
+    monkeypatch.setattr(graph.settings, "chat_history_window", 2)
+    monkeypatch.setattr(graph.settings, "chat_summary_batch", 1)
+    monkeypatch.setattr(graph, "summary_llm", FakeSummaryLLM())
+
+    # The pending user question makes the boundary fall on an assistant reply
+    messages = _exchanges(4) + [HumanMessage(content="question 4", id="h4")]
+    updates = asyncio.run(graph.summarize_history({"messages": messages}))
+    assert [m.id for m in updates["messages"]] == ["h0", "a0", "h1", "a1", "h2", "a2"]
+    assert isinstance(graph.recent_window(messages)[0], HumanMessage)
+
+
+def test_summarize_history_keeps_messages_when_the_model_fails(monkeypatch):
+    monkeypatch.setattr(graph.settings, "chat_history_window", 2)
+    monkeypatch.setattr(graph.settings, "chat_summary_batch", 1)
+    monkeypatch.setattr(graph, "summary_llm", FakeSummaryLLM(fail=True))
+    assert asyncio.run(graph.summarize_history({"messages": _exchanges(5)})) == {}
+
+
+class FakeApp:
+    """Replays a fixed ``astream`` trace and ends in a fixed state."""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    async def astream(self, inputs, config, stream_mode):
+        for item in self.trace:
+            yield item
+
+    async def aget_state(self, config):
+        return type("Snapshot", (), {"values": {"current_phase": "collecting_info"}})()
+
+
+def test_stream_chat_sends_each_token_once(monkeypatch):
+    reply = {"langgraph_node": "conversation_agent", "tags": [graph.REPLY_TAG]}
+    monkeypatch.setattr(graph, "app", FakeApp([
+        ("messages", (AIMessage(content="Hel"), reply)),
+        ("messages", (AIMessage(content="lo."), reply)),
+        ("custom", {"agent": "analysis", "delta": "Looks good"}),
+        ("updates", {"conversation_agent": {"messages": [AIMessage(content="Hello. Shall I analyze?")]}}),
+    ]))
+
+    async def collect():
+        return [event async for event in graph.stream_chat([HumanMessage(content="hi")], CONFIG)]
+
+    events = asyncio.run(collect())
+    assert events[:4] == [
+        {"type": "token", "agent": "conversation", "delta": "Hel"},
+        {"type": "token", "agent": "conversation", "delta": "lo."},
+        {"type": "token", "agent": "analysis", "delta": "Looks good"},
+        # The full text goes out once, with the final message
+        {"type": "message", "agent": "conversation", "content": "Hello. Shall I analyze?"},
+    ]
+    assert events[4]["type"] == "done"
@@ -0,0 +1,80 @@
+"""
+Bulk ingestion: a user that conflicts with a unique constraint is reported on
+its own instead of failing its whole batch.
+"""
+import io
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+
+import app.models  # noqa: F401
+from app import models, security
+from app.models.base import Base
+from app.services import ingestion
+from database import SessionLocal, engine
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "inputapidata")
+
+
+def _documents(*users):
+    with open(os.path.join(INPUT_DIR, "user.json"), encoding="utf-8") as f:
+        template = json.load(f)
+    return io.BytesIO(json.dumps([
+        {**template, "passport_id": None, **user} for user in users
+    ]).encode())
+
+
+def _stored(emails):
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(models.User.email).where(models.User.email.in_(emails))
+        ).scalars())
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    # Batches run in this process with workers=1; hashing is not under test
+    monkeypatch.setattr(security, "get_password_hash", lambda password: "hashed")
+
+
+def test_conflicting_users_are_skipped_before_the_insert():
+    ingestion.ingest_stream(_documents({"email": "first@example.com", "pan_id": "PAN0000001"}), workers=1)
+
+    report = ingestion.ingest_stream(_documents(
+        {"email": "a@example.com", "pan_id": "PAN0000002"},
+        {"email": "b@example.com", "pan_id": "PAN0000002"},  # PAN taken earlier in the batch
+        {"email": "first@example.com", "pan_id": "PAN0000003"},  # email already registered
+        {"email": "c@example.com", "pan_id": "PAN0000001"},  # PAN already registered
+    ), workers=1)
+
+    assert report.users == 1 and report.transactions == 24
+    assert report.errors == [
+        "b@example.com: pan_id already registered",
+        "first@example.com: already registered",
+        "c@example.com: pan_id already registered",
+    ]
+    assert _stored(["a@example.com", "b@example.com", "c@example.com"]) == {"a@example.com"}
+
+
+def test_a_constraint_error_fails_only_the_offending_user(monkeypatch):
+    # Without the PAN pre-check the duplicate reaches the database
+    monkeypatch.setattr(ingestion, "UNIQUE_USER_FIELDS", ("email",))
+
+    report = ingestion.ingest_stream(_documents(
+        {"email": "d@example.com", "pan_id": "PAN0000004"},
+        {"email": "e@example.com", "pan_id": "PAN0000004"},
+        {"email": "f@example.com", "pan_id": "PAN0000005"},
+    ), workers=1)
+
+    assert report.users == 2 and report.transactions == 48
+    assert len(report.errors) == 1 and report.errors[0].startswith("e@example.com: ")
+    assert _stored(["d@example.com", "e@example.com", "f@example.com"]) == {"d@example.com", "f@example.com"}
@@ -0,0 +1,225 @@
+"""
+Query-count regression tests for the per-user list endpoints.
+
+Each endpoint must answer, including its 404, in a single round trip; a
+change that reintroduces a separate existence check or lazy loads fails here.
+"""
+import base64
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+import app.models  # noqa: F401
+from app import models
+from app.models.base import Base
+from app.routes.users_router import router as users_router
+from app.services.document_cache import document_cache
+from app.services.http_cache import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from database import SessionLocal, async_engine, engine
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "inputapidata")
+
+# Endpoint -> queries it may issue
+EXPECTED_QUERIES = {
+    "/bank-quotes": 1,
+    "/chat-info": 1,
+    "/financial-analyses": 1,
+}
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture(scope="module")
+def user_ids():
+    Base.metadata.create_all(bind=engine)
+    with open(os.path.join(INPUT_DIR, "bankquotes.json"), encoding="utf-8") as f:
+        quotes = json.load(f)
+
+    db = SessionLocal()
+    try:
+        populated = models.User(email="populated@example.com", hashed_password="x")
+        empty = models.User(email="empty@example.com", hashed_password="x")
+        db.add_all([populated, empty])
+        db.flush()
+        db.add_all(models.BankQuote(**quote, user_id=populated.id) for quote in quotes)
+        db.add_all(
+            models.UserChatInfo(income_details=f"salary {i}", user_id=populated.id)
+            for i in range(3)
+        )
+        db.add(models.UserLatestAnalysis(
+            user_id=populated.id,
+            document=b'{"source":"agent","raw_analysis":"ok"}',
+            etag='"latest"',
+            updated_at=datetime.now(timezone.utc),
+        ))
+        db.commit()
+        ids = {"populated": populated.id, "empty": empty.id, "missing": empty.id + 1000}
+    finally:
+        db.close()
+
+    yield ids
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def client(user_ids):
+    api = FastAPI()
+    api.include_router(users_router, prefix="/api/v1/users")
+    with TestClient(api) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+
+@pytest.mark.parametrize("path", sorted(EXPECTED_QUERIES))
+@pytest.mark.parametrize("user", ["populated", "empty", "missing"])
+def test_list_endpoint_query_count(client, user_ids, path, user):
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/users/{user_ids[user]}{path}")
+
+    if user == "missing":
+        assert response.status_code == 404
+    else:
+        assert response.status_code == 200
+    assert len(statements) <= EXPECTED_QUERIES[path], statements
+
+
+def test_list_endpoint_returns_rows(client, user_ids):
+    response = client.get(f"/api/v1/users/{user_ids['populated']}/chat-info")
+    assert [row["income_details"] for row in response.json()] == ["salary 0", "salary 1", "salary 2"]
+    # A list shorter than the default page has no next page
+    assert "x-next-cursor" not in response.headers
+
+    response = client.get(f"/api/v1/users/{user_ids['empty']}/bank-quotes")
+    assert response.json() == []
+
+
+def test_list_endpoint_is_capped_by_default(client, user_ids):
+    db = SessionLocal()
+    try:
+        user = models.User(email="many@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            models.UserChatInfo(income_details=f"salary {i}", user_id=user.id)
+            for i in range(DEFAULT_PAGE_SIZE + 1)
+        )
+        db.commit()
+        url = f"/api/v1/users/{user.id}/chat-info"
+    finally:
+        db.close()
+
+    response = client.get(url)
+    assert len(response.json()) == DEFAULT_PAGE_SIZE
+    response = client.get(url, params={"cursor": response.headers["x-next-cursor"]})
+    assert [row["income_details"] for row in response.json()] == [f"salary {DEFAULT_PAGE_SIZE}"]
+    assert client.get(url, params={"limit": MAX_PAGE_SIZE + 1}).status_code == 422
+
+
+def test_list_endpoint_pages_with_cursor(client, user_ids):
+    url = f"/api/v1/users/{user_ids['populated']}/chat-info"
+    seen = []
+    params = {"limit": 2}
+    while True:
+        with count_queries() as statements:
+            response = client.get(url, params=params)
+        assert response.status_code == 200
+        assert len(statements) == 1, statements
+        seen.extend(row["income_details"] for row in response.json())
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    assert seen == ["salary 0", "salary 1", "salary 2"]
+    assert client.get(url, params={"cursor": "not-a-cursor"}).status_code == 400
+    # Ids beyond a 64-bit integer are rejected before they reach the driver
+    too_large = base64.urlsafe_b64encode(str(2**63).encode()).decode().rstrip("=")
+    assert client.get(url, params={"cursor": too_large}).status_code == 400
+    assert client.get(url, params={"cursor": "OTk5OTk5OTk5OTk5OTk5OTk5OTk5OTk5"}).status_code == 400
+
+
+@pytest.mark.parametrize("path", ["", "/bank-quotes", "/chat-info"])
+def test_conditional_get_returns_not_modified(client, user_ids, path):
+    url = f"/api/v1/users/{user_ids['populated']}{path}"
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(url, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("user, status", [("populated", 200), ("empty", 404), ("missing", 404)])
+def test_latest_analysis_is_one_query(client, user_ids, user, status):
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/users/{user_ids[user]}/financial-analyses/latest")
+
+    assert response.status_code == status
+    assert len(statements) == 1, statements
+    if status == 200:
+        assert response.content == b'{"source":"agent","raw_analysis":"ok"}'
+        assert response.headers["etag"] == '"latest"'
+
+
+
+def test_latest_analysis_is_served_from_cache_until_it_changes(client, user_ids):
+    url = f"/api/v1/users/{user_ids['populated']}/financial-analyses/latest"
+    key = ("latest_analysis", user_ids["populated"])
+    client.get(url)
+    cached = document_cache.get(key, '"latest"')
+    assert cached is not None and cached.data == {"source": "agent", "raw_analysis": "ok"}
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(models.UserLatestAnalysis)
+            .where(models.UserLatestAnalysis.user_id == user_ids["populated"])
+            .values(document=b'{"source":"agent","raw_analysis":"new"}', etag='"newer"')
+        )
+        db.commit()
+        with count_queries() as statements:
+            response = client.get(url)
+        assert len(statements) == 1, statements
+        assert response.content == b'{"source":"agent","raw_analysis":"new"}'
+        assert response.headers["etag"] == '"newer"'
+        assert document_cache.get(key, '"latest"') is None
+    finally:
+        db.execute(
+            update(models.UserLatestAnalysis)
+            .where(models.UserLatestAnalysis.user_id == user_ids["populated"])
+            .values(document=b'{"source":"agent","raw_analysis":"ok"}', etag='"latest"')
+        )
+        db.commit()
+        db.close()
+
+
+def test_financial_info_does_not_query_once_the_user_is_known(client, user_ids):
+    url = f"/api/v1/users/{user_ids['empty']}/financial-info"
+    assert client.get(url).status_code == 200
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert statements == []
+    assert client.get(f"/api/v1/users/{user_ids['missing']}/financial-info").status_code == 404
@@ -0,0 +1,110 @@
+"""
+Loan scenario engine: the vectorized EMI grid, affordability and rounding.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from app.services.scenario_engine import (
+    MAX_DTI,
+    FinancialProfile,
+    build_scenarios,
+    compute_emi,
+)
+
+
+@dataclass
+class Quote:
+    bank_name: str
+    amount: float
+    interest_rate: float
+    tenure: int
+    id: Optional[int] = None
+
+
+def closed_form_emi(principal: float, annual_rate: float, months: int) -> float:
+    if annual_rate == 0:
+        return principal / months
+    r = annual_rate / 1200
+    return principal * r * (1 + r) ** months / ((1 + r) ** months - 1)
+
+
+PROFILE = FinancialProfile(
+    monthly_income=150_000,
+    existing_emi=20_000,
+    monthly_expenses=60_000,
+    cash_balance=900_000,
+    investments=300_000,
+)
+
+
+def test_vectorized_emi_matches_closed_form():
+    principals = np.array([100_000.0, 1_234_567.0, 5_000_000.0])[:, None, None]
+    rates = np.array([0.0, 8.5, 12.25])[None, :, None]
+    months = np.array([12.0, 42.0, 84.0])[None, None, :]
+
+    emi = compute_emi(principals, rates, months)
+
+    assert emi.shape == (3, 3, 3)
+    for p, r, m in np.ndindex(emi.shape):
+        expected = closed_form_emi(principals[p, 0, 0], rates[0, r, 0], int(months[0, 0, m]))
+        assert emi[p, r, m] == pytest.approx(expected, rel=1e-12)
+
+
+def test_scenarios_report_exact_tenure_and_consistent_rounding():
+    quote = Quote("Bank A", amount=700_000, interest_rate=9.0, tenure=42, id=7)
+    scenarios = build_scenarios([quote], PROFILE, purchase_amount=1_000_000.6, tenures_months=(36,))
+
+    by_tenure = {s.tenure_months: s for s in scenarios}
+    assert set(by_tenure) == {36, 42}
+    assert by_tenure[42].assumptions.tenureYears == 3.5
+    assert by_tenure[36].assumptions.tenureYears == 3
+    for scenario in scenarios:
+        a = scenario.assumptions
+        assert scenario.quote_id == 7
+        assert a.loanAmount <= quote.amount
+        assert a.downPayment + a.loanAmount == 1_000_001
+        expected = closed_form_emi(a.loanAmount, 9.0, scenario.tenure_months)
+        assert abs(scenario.calculations.estimatedEMI - expected) < 1
+
+
+def test_down_payment_ratios_collapse_onto_the_capped_loan():
+    # 10%, 20% and 30% down all exceed the sanctioned amount: one loan remains
+    quote = Quote("Bank A", amount=500_000, interest_rate=9.0, tenure=60)
+    scenarios = build_scenarios([quote], PROFILE, purchase_amount=1_000_000, tenures_months=())
+
+    assert len(scenarios) == 1
+    assert scenarios[0].assumptions.loanAmount == 500_000
+    assert scenarios[0].assumptions.downPayment == 500_000
+
+
+def test_affordability_filtering_and_ranking():
+    quotes = [
+        Quote("Cheap", amount=2_000_000, interest_rate=8.0, tenure=84),
+        Quote("Dear", amount=2_000_000, interest_rate=14.0, tenure=12),
+    ]
+    scenarios = build_scenarios(quotes, PROFILE, purchase_amount=2_000_000)
+
+    for scenario in scenarios:
+        emi = closed_form_emi(scenario.assumptions.loanAmount, scenario.assumptions.interestRate, scenario.tenure_months)
+        dti = (PROFILE.existing_emi + emi) / PROFILE.monthly_income
+        buffer_after = PROFILE.cash_balance + PROFILE.investments - scenario.assumptions.downPayment
+        assert scenario.dti_ratio == pytest.approx(dti)
+        assert scenario.feasible == (dti <= MAX_DTI and buffer_after >= PROFILE.emergency_buffer)
+
+    feasible = [s.feasible for s in scenarios]
+    assert any(feasible) and not all(feasible)
+    # Feasible first, each group by total interest
+    assert feasible == sorted(feasible, reverse=True)
+    for group in (True, False):
+        interest = [s.calculations.totalInterestPayable for s in scenarios if s.feasible is group]
+        assert interest == sorted(interest)
+
+
+def test_no_income_is_never_feasible():
+    profile = FinancialProfile(0, 0, 0, 10_000_000, 0)
+    scenarios = build_scenarios([Quote("Bank A", 500_000, 9.0, 60)], profile, 500_000)
+    assert scenarios and not any(s.feasible for s in scenarios)
+    assert {s.calculations.DTI for s in scenarios} == {"n/a"}
@@ -0,0 +1,125 @@
+"""
+Appended transactions and the history backfill.
+
+The transaction and balance rows are the source of truth for a user's
+history: a backfill from the imported JSON adds what is missing and never
+drops rows appended since, and the profile reads its histories from the rows.
+"""
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.models  # noqa: F401
+from app import models
+from app.models.base import Base
+from app.pydanticModels.user import UserCreate
+from app.routes.transactions_router import router as transactions_router
+from app.routes.users_router import router as users_router
+from app.services.ingestion import backfill_history, history_rows
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "inputapidata")
+
+NEW_OUTFLOW = {
+    "timestamp": "2024-08-03T10:00:00+05:30",
+    "amount": 1234.5,
+    "narration": "Groceries",
+    "category": "Groceries",
+    "balance": 400000.0,
+    "type": "debit",
+}
+
+
+def _create_user(email: str, with_rows: bool) -> int:
+    with open(os.path.join(INPUT_DIR, "user.json"), encoding="utf-8") as f:
+        user_in = UserCreate.model_validate({**json.load(f), "email": email, "pan_id": None})
+    db = SessionLocal()
+    try:
+        user = models.User(email=email, hashed_password="x")
+        db.add(user)
+        db.add(models.user_financials_model.UserFinancials(**user_in.financials.model_dump(), user=user))
+        if with_rows:
+            db.add_all(history_rows(user_in.financials, user=user))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _rows(user_id: int):
+    db = SessionLocal()
+    try:
+        transactions = db.execute(
+            select(models.Transaction.narration).where(models.Transaction.user_id == user_id)
+        ).scalars().all()
+        aggregates = db.execute(
+            select(models.MonthlyAggregate).where(models.MonthlyAggregate.user_id == user_id)
+        ).scalars().all()
+        return transactions, aggregates
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def client():
+    Base.metadata.create_all(bind=engine)
+    api = FastAPI()
+    api.include_router(users_router, prefix="/api/v1/users")
+    api.include_router(transactions_router, prefix="/api/v1/users")
+    with TestClient(api) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+    engine.dispose()
+
+
+def _backfill(client, user_id: int) -> int:
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await backfill_history(db, user_id)
+
+    return client.portal.call(run)
+
+
+@pytest.mark.parametrize("with_rows", [True, False], ids=["imported", "never-backfilled"])
+def test_backfill_keeps_appended_transactions(client, with_rows):
+    user_id = _create_user(f"append-{with_rows}@example.com", with_rows)
+    url = f"/api/v1/users/{user_id}/transactions"
+
+    response = client.patch(url, json={"outflow_history": [NEW_OUTFLOW]})
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "duplicates": 0}
+    transactions, aggregates = _rows(user_id)
+    assert len(transactions) == 25
+
+    # Nothing is missing any more: the backfill adds nothing and drops nothing
+    assert _backfill(client, user_id) == 0
+    after, aggregates_after = _rows(user_id)
+    assert sorted(after) == sorted(transactions)
+    august = {aggregate.month.month: aggregate for aggregate in aggregates_after}[8]
+    assert august.outflow_count == 1 and august.outflow_total == pytest.approx(1234.5)
+    assert sum(aggregate.outflow_count for aggregate in aggregates_after) == 13
+
+    amounts = [row["amount"] for row in client.get(url, params={"direction": "outflow"}).json()]
+    assert len(amounts) == 13 and amounts.count(1234.5) == 1
+
+    profile = client.get(f"/api/v1/users/{user_id}", params={"fields": "outflow_history,credit_score"}).json()
+    outflows = profile["financials"]["outflow_history"]
+    assert len(outflows) == 13 and outflows[-1]["amount"] == 1234.5
+    assert profile["financials"]["credit_score"] == 720
+
+
+def test_backfill_loads_never_backfilled_users_and_profile_falls_back_to_json(client):
+    user_id = _create_user("legacy@example.com", with_rows=False)
+
+    profile = client.get(f"/api/v1/users/{user_id}").json()
+    assert len(profile["financials"]["inflow_history"]) == 12
+    assert len(profile["financials"]["bank_balance_history"]) == 12
+
+    assert _backfill(client, user_id) == 36
+    assert _backfill(client, user_id) == 0
+    transactions, aggregates = _rows(user_id)
+    assert len(transactions) == 24 and aggregates
@@ -0,0 +1,58 @@
+"""
+What the LiveKit adapter voices from a graph turn. Needs livekit-agents.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from app.agents.voice_llm import _latest_user_text, _spoken_deltas
+
+
+def _message(role, text):
+    return SimpleNamespace(type="message", role=role, text_content=text)
+
+
+def test_latest_user_text():
+    chat_ctx = SimpleNamespace(items=[
+        _message("system", "instructions"),
+        _message("assistant", "Hi"),
+        _message("user", "My salary is 5k"),
+        _message("developer", "note"),
+    ])
+    assert _latest_user_text(chat_ctx) == "My salary is 5k"
+
+    # Already answered, or nothing said yet: no turn to run
+    chat_ctx.items.append(_message("assistant", "Thanks"))
+    assert _latest_user_text(chat_ctx) is None
+    assert _latest_user_text(SimpleNamespace(items=[_message("system", "instructions")])) is None
+
+
+def _voiced(events):
+    async def stream():
+        for event in events:
+            yield event
+
+    async def collect():
+        return [delta async for delta in _spoken_deltas(stream(), 1)]
+
+    return asyncio.run(collect())
+
+
+def test_spoken_deltas():
+    voiced = _voiced([
+        {"type": "token", "agent": "conversation", "delta": "Hel"},
+        {"type": "token", "agent": "conversation", "delta": "lo."},
+        # Extends the streamed reply: only the addition is voiced
+        {"type": "message", "agent": "conversation", "content": "Hello. Shall I analyze?"},
+        {"type": "token", "agent": "analysis", "delta": "Looks good"},
+        # Does not extend what was streamed: not repeated
+        {"type": "message", "agent": "analysis", "content": "Here's my analysis:\n\nLooks good"},
+        {"type": "done", "current_phase": "discussing_results"},
+    ])
+    assert voiced == ["Hel", "lo.", " Shall I analyze?", "Looks good"]
+
+    # Never streamed (e.g. a cached analysis): voiced whole
+    assert _voiced([{"type": "message", "agent": "analysis", "content": "All set"}]) == ["All set"]
@@ -0,0 +1,336 @@
+"""
+Cross-worker WebSocket fan-out through the broker interface.
+
+Two ConnectionManagers stand in for two workers, joined by a local bus with
+the publish/subscribe semantics of the Redis and Postgres brokers. The
+Postgres and Redis brokers themselves run against in-memory fakes of their
+client libraries.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services import broker as broker_module
+from app.services.broker import POSTGRES_MAX_PAYLOAD, InProcessBroker, PostgresBroker, make_broker
+from app.services.websocket_manager import ConnectionManager
+
+
+class LocalBus:
+    """Shared channel: every published payload reaches every subscriber."""
+
+    def __init__(self):
+        self.handlers = []
+
+    def broker(self) -> "LocalBusBroker":
+        return LocalBusBroker(self)
+
+
+class LocalBusBroker:
+    def __init__(self, bus: LocalBus):
+        self.bus = bus
+        self.handler = None
+
+    async def start(self, handler):
+        self.handler = handler
+        self.bus.handlers.append(handler)
+
+    async def publish(self, payload: str):
+        await asyncio.gather(*(handler(payload) for handler in self.bus.handlers))
+
+    async def stop(self):
+        self.bus.handlers.remove(self.handler)
+
+
+class FakePostgres:
+    """Channels of one database: NOTIFY reaches every LISTEN, at commit in a transaction."""
+
+    def __init__(self):
+        self.listeners = []
+        self.notifications = []
+
+    async def connect(self, dsn):
+        return FakePostgresConnection(self)
+
+    def notify(self, channel, payload):
+        if len(payload.encode()) > POSTGRES_MAX_PAYLOAD:
+            raise ValueError("payload string too long")
+        self.notifications.append(payload)
+        for listen_channel, callback in list(self.listeners):
+            if listen_channel == channel:
+                callback(None, 0, channel, payload)
+
+
+class FakePostgresConnection:
+    def __init__(self, server: FakePostgres):
+        self.server = server
+        self.pending = None
+        self.closed = False
+
+    def add_termination_listener(self, callback):
+        pass
+
+    async def add_listener(self, channel, callback):
+        self.server.listeners.append((channel, callback))
+
+    async def remove_listener(self, channel, callback):
+        self.server.listeners.remove((channel, callback))
+
+    async def execute(self, query, channel, payload):
+        assert query == "SELECT pg_notify($1, $2)"
+        if self.pending is not None:
+            self.pending.append((channel, payload))
+        else:
+            self.server.notify(channel, payload)
+
+    async def executemany(self, query, args):
+        for channel, payload in args:
+            await self.execute(query, channel, payload)
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.pending = []
+        try:
+            yield
+        finally:
+            pending, self.pending = self.pending, None
+        for channel, payload in pending:
+            self.server.notify(channel, payload)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeWebSocket:
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.sent = []
+        self.fail = fail
+        self.delay = delay
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.fail:
+            raise RuntimeError("connection closed")
+        await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+def test_redirect_reaches_sockets_on_other_workers():
+    async def scenario():
+        bus = LocalBus()
+        worker_a, worker_b = ConnectionManager(bus.broker()), ConnectionManager(bus.broker())
+        await worker_a.start()
+        await worker_b.start()
+
+        on_a, on_b, other_user = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await worker_a.connect(on_a, "1")
+        await worker_b.connect(on_b, "1")
+        await worker_b.connect(other_user, "2")
+
+        await worker_a.send_redirect("1", "/analysis")
+        await worker_b.broadcast("hello")
+        await asyncio.sleep(0.01)  # let the writers run
+
+        await worker_a.stop()
+        await worker_b.stop()
+        return on_a, on_b, other_user
+
+    on_a, on_b, other_user = asyncio.run(scenario())
+    redirect = json.dumps({"type": "redirect", "redirect_to": "/analysis"})
+    assert on_a.sent == [redirect, "hello"]
+    assert on_b.sent == [redirect, "hello"]
+    assert other_user.sent == ["hello"]
+
+
+def test_in_process_broker_delivers_locally_and_drops_dead_sockets():
+    async def scenario():
+        manager = ConnectionManager(InProcessBroker())
+        alive, dead = FakeWebSocket(), FakeWebSocket(fail=True)
+        await manager.connect(alive, "1")
+        await manager.connect(dead, "1")
+        # Started on first send
+        await manager.send_personal_message("ping", 1)
+        await asyncio.sleep(0.01)  # let the writers run
+        await manager.stop()
+        return manager, alive
+
+    manager, alive = asyncio.run(scenario())
+    assert alive.sent == ["ping"]
+    assert list(manager.active_connections["1"]) == [alive]
+
+
+def test_slow_consumer_does_not_delay_others():
+    async def scenario(policy):
+        manager = ConnectionManager(
+            InProcessBroker(), max_queue=2, send_timeout=5, slow_consumer_policy=policy
+        )
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=1)
+        await manager.connect(fast, "1")
+        await manager.connect(slow, "2")
+        for i in range(5):
+            await manager.broadcast(str(i))
+            await asyncio.sleep(0.001)
+        stats = manager.stats()
+        for connections in list(manager.active_connections.values()):
+            for writer in list(connections.values()):
+                writer.close()
+        return fast, slow, stats
+
+    fast, slow, stats = asyncio.run(scenario("close"))
+    assert fast.sent == ["0", "1", "2", "3", "4"]
+    assert slow.close_code == 1013
+    assert stats["connections"] == 1 and stats["evictions"]["slow"] == 1
+
+    fast, slow, stats = asyncio.run(scenario("drop"))
+    assert fast.sent == ["0", "1", "2", "3", "4"]
+    assert slow.close_code is None
+    assert stats["connections"] == 2 and stats["dropped_messages"] == 2
+
+
+def test_heartbeats_idle_eviction_and_caps():
+    async def scenario():
+        manager = ConnectionManager(
+            InProcessBroker(),
+            heartbeat_interval=0.02,
+            idle_timeout=0.1,
+            max_connections=3,
+            max_connections_per_user=2,
+        )
+        tabs = [FakeWebSocket() for _ in range(3)]
+        for tab in tabs:
+            await manager.connect(tab, "1")
+        other = FakeWebSocket()
+        answering = await manager.connect(other, "2")
+        refused = await manager.connect(FakeWebSocket(), "3")
+        after_connect = manager.stats()
+
+        # Only user 2 answers the pings; user 1's remaining tabs go idle
+        for _ in range(10):
+            await asyncio.sleep(0.02)
+            answering.last_seen = asyncio.get_running_loop().time()
+        stats = manager.stats()
+        await manager.stop()
+        return tabs, other, refused, after_connect, stats
+
+    tabs, other, refused, after_connect, stats = asyncio.run(scenario())
+    assert refused is None
+    assert after_connect["connections"] == 3 and after_connect["rejected_connections"] == 1
+    assert tabs[0].close_code == 1000  # replaced by the third tab
+    assert tabs[1].close_code == tabs[2].close_code == 1001  # idle
+    assert other.close_code is None and '{"type": "ping"}' in other.sent
+    assert stats["connections"] == 1
+    assert stats["evictions"] == {"slow": 0, "idle": 2, "user_limit": 1}
+
+
+def test_make_broker_picks_backend_from_url():
+    assert isinstance(make_broker(""), InProcessBroker)
+    broker = make_broker("postgresql+psycopg2://user:pw@db:5432/app", "ws")
+    assert type(broker).__name__ == "PostgresBroker"
+    assert broker.dsn == "postgresql://user:pw@db:5432/app"
+    assert broker.channel == "ws"
+
+
+def test_postgres_broker_fans_out_payloads_over_the_notify_limit(monkeypatch):
+    asyncpg = pytest.importorskip("asyncpg")
+    server = FakePostgres()
+    monkeypatch.setattr(asyncpg, "connect", server.connect)
+
+    async def scenario():
+        worker_a = ConnectionManager(PostgresBroker("postgresql://db/app", "ws"))
+        worker_b = ConnectionManager(PostgresBroker("postgresql://db/app", "ws"))
+        await worker_a.start()
+        await worker_b.start()
+        on_a, on_b = FakeWebSocket(), FakeWebSocket()
+        await worker_a.connect(on_a, "1")
+        await worker_b.connect(on_b, "1")
+
+        await worker_a.send_personal_message("small", 1)
+        await worker_a.send_personal_message("é" * 3000 + "x" * 20000, 1)
+        await asyncio.sleep(0.01)  # let the handlers and writers run
+
+        await worker_a.stop()
+        await worker_b.stop()
+        return on_a, on_b
+
+    on_a, on_b = asyncio.run(scenario())
+    large = "é" * 3000 + "x" * 20000
+    assert on_a.sent == ["small", large]
+    assert on_b.sent == ["small", large]
+    # One notification for the small message, several for the large one
+    assert len(server.notifications) > 2
+    assert server.listeners == []
+
+
+def test_postgres_broker_drops_incomplete_messages_beyond_the_limit(monkeypatch):
+    monkeypatch.setattr(broker_module, "POSTGRES_MAX_PARTIAL", 2)
+    broker = PostgresBroker("postgresql://db/app", "ws")
+    first = broker_module.postgres_notifications("a" * 20000)
+    for message_id in range(3):
+        broker._reassemble(f"c:{message_id}:0:2:x")
+    assert list(broker._partial) == ["1", "2"]
+    # A malformed notification is ignored, not raised into asyncpg
+    broker._handler = lambda payload: None
+    broker._notified(None, 0, "ws", "c:broken")
+    assert [broker._reassemble(notification) for notification in first][-1] == "a" * 20000
+
+
+def test_redis_broker_round_trip(monkeypatch):
+    redis_asyncio = pytest.importorskip("redis.asyncio")
+
+    class FakePubSub:
+        def __init__(self, queue):
+            self.queue = queue
+
+        async def subscribe(self, channel):
+            pass
+
+        async def get_message(self, timeout=None):
+            return await self.queue.get()
+
+        async def aclose(self):
+            pass
+
+    class FakeRedis:
+        def __init__(self):
+            self.queues = []
+
+        def pubsub(self, ignore_subscribe_messages=False):
+            queue = asyncio.Queue()
+            self.queues.append(queue)
+            return FakePubSub(queue)
+
+        async def publish(self, channel, payload):
+            for queue in self.queues:
+                queue.put_nowait({"data": payload.encode()})
+
+        async def aclose(self):
+            pass
+
+    client = FakeRedis()
+    monkeypatch.setattr(redis_asyncio, "from_url", lambda url: client)
+
+    async def scenario():
+        worker_a = ConnectionManager(make_broker("redis://cache:6379/0", "ws"))
+        worker_b = ConnectionManager(make_broker("redis://cache:6379/0", "ws"))
+        await worker_a.start()
+        await worker_b.start()
+        on_b = FakeWebSocket()
+        await worker_b.connect(on_b, "1")
+        await worker_a.send_redirect("1", "/analysis")
+        await asyncio.sleep(0.01)  # let the listeners and writers run
+        await worker_a.stop()
+        await worker_b.stop()
+        return on_b
+
+    on_b = asyncio.run(scenario())
+    assert on_b.sent == [json.dumps({"type": "redirect", "redirect_to": "/analysis"})]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PydanticType codec against the previous json + per-item
+model_validate implementation on a large transaction history.
+
+Usage: python bench_pydantic_type.py [transactions] [repeats]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+# The models import the database module, which needs a URL
+os.environ.setdefault("DB_URL", "sqlite:////tmp/bench_pydantic_type.db")
+
+from app.models.user_financials_model import PydanticType
+from app.pydanticModels.financials import TransactionPoint
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+def legacy_dumps(value):
+    result = [item.model_dump(mode="json") for item in value]
+    return json.dumps(result, cls=DateTimeEncoder)
+
+
+def legacy_loads(value):
+    return [TransactionPoint.model_validate(item) for item in json.loads(value)]
+
+
+def make_history(count):
+    start = datetime(2023, 1, 1)
+    return [
+        TransactionPoint(
+            timestamp=start + timedelta(hours=i),
+            amount=100.0 + i % 5000,
+            narration=f"UPI/P2M/{i:08d}/MERCHANT {i % 97}",
+            category=("GROCERIES", "RENT", "EMI", "SALARY", "TRAVEL")[i % 5],
+            balance=250000.0 - i,
+            type="DEBIT" if i % 7 else "CREDIT",
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(repeats, fn, *args):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    history = make_history(count)
+    validated = PydanticType(TransactionPoint, as_list=True)
+    encoded = validated.process_bind_param(history, None)
+
+    # Both codecs must read each other's output
+    assert legacy_loads(encoded) == history
+    assert validated.process_result_value(legacy_dumps(history), None) == history
+
+    rows = [
+        ("encode", "legacy json.dumps", best_of(repeats, legacy_dumps, history)),
+        ("encode", "PydanticType", best_of(repeats, validated.process_bind_param, history, None)),
+        ("decode", "legacy model_validate loop", best_of(repeats, legacy_loads, encoded)),
+        ("decode", "PydanticType", best_of(repeats, validated.process_result_value, encoded, None)),
+    ]
+
+    print(f"{count} transactions, {len(encoded) / 1e6:.1f} MB encoded, best of {repeats}")
+    baseline = {}
+    for operation, name, seconds in rows:
+        baseline.setdefault(operation, seconds)
+        speedup = baseline[operation] / seconds
+        print(f"{operation:7} {name:28} {seconds * 1000:9.1f} ms  {speedup:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
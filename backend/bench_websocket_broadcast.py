@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebSocket broadcast latency with many connections, comparing the
+per-connection send queues of ConnectionManager against the previous
+one-socket-at-a-time loop. A few clients are slow (each send takes
+`slow_delay` seconds), as a stalled mobile connection would be.
+
+Usage: python bench_websocket_broadcast.py [connections] [slow_clients] [slow_delay] [messages]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+# The services package imports the database module, which needs a URL
+os.environ.setdefault("DB_URL", "sqlite:////tmp/bench_websocket_broadcast.db")
+
+from app.services.broker import InProcessBroker
+from app.services.websocket_manager import ConnectionManager
+
+
+class BenchWebSocket:
+    """Records when each message arrives; a send yields like a socket write."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = {}
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(self.delay)
+        self.received[message] = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_sockets(connections, slow_clients, slow_delay):
+    return [
+        BenchWebSocket(slow_delay if i < slow_clients else 0.0)
+        for i in range(connections)
+    ]
+
+
+async def legacy_broadcast(sockets, message):
+    for socket in sockets:
+        await socket.send_text(message)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, sockets, sent_at, returned_after, slow_clients):
+    latencies = [
+        socket.received[message] - sent_at[message]
+        for socket in sockets[slow_clients:]
+        for message in sent_at
+        if message in socket.received
+    ]
+    expected = len(sent_at) * (len(sockets) - slow_clients)
+    print(f"{name}")
+    print(f"  broadcast() returned in   {returned_after * 1000:9.2f} ms (mean)")
+    print(f"  delivered to fast clients {len(latencies)}/{expected}")
+    print(f"  latency p50               {percentile(latencies, 0.50) * 1000:9.2f} ms")
+    print(f"  latency p99               {percentile(latencies, 0.99) * 1000:9.2f} ms")
+    print(f"  latency max               {max(latencies) * 1000:9.2f} ms")
+
+
+async def run_legacy(connections, slow_clients, slow_delay, messages):
+    sockets = make_sockets(connections, slow_clients, slow_delay)
+    # Slow clients first: the worst case for a sequential loop
+    sent_at, elapsed = {}, 0.0
+    for i in range(messages):
+        message = f"message {i}"
+        sent_at[message] = time.perf_counter()
+        await legacy_broadcast(sockets, message)
+        elapsed += time.perf_counter() - sent_at[message]
+    report("sequential send_text loop (previous)", sockets, sent_at, elapsed / messages, slow_clients)
+
+
+async def run_queued(connections, slow_clients, slow_delay, messages):
+    sockets = make_sockets(connections, slow_clients, slow_delay)
+    manager = ConnectionManager(InProcessBroker(), slow_consumer_policy="drop")
+    for i, socket in enumerate(sockets):
+        await manager.connect(socket, str(i))
+
+    sent_at, elapsed = {}, 0.0
+    for i in range(messages):
+        message = f"message {i}"
+        sent_at[message] = time.perf_counter()
+        await manager.broadcast(message)
+        elapsed += time.perf_counter() - sent_at[message]
+
+    # Wait for the fast clients to drain their queues
+    fast = sockets[slow_clients:]
+    while any(len(socket.received) < messages for socket in fast):
+        await asyncio.sleep(0.001)
+    report("per-connection send queues", sockets, sent_at, elapsed / messages, slow_clients)
+
+    for connections_by_socket in list(manager.active_connections.values()):
+        for writer in list(connections_by_socket.values()):
+            writer.close()
+    await manager.stop()
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    slow_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    slow_delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    messages = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+
+    print(
+        f"{connections} connections, {slow_clients} slow clients "
+        f"({slow_delay * 1000:.0f} ms per send), {messages} broadcasts\n"
+    )
+    asyncio.run(run_legacy(connections, slow_clients, slow_delay, messages))
+    asyncio.run(run_queued(connections, slow_clients, slow_delay, messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 load_dotenv()
 
 DB_URL = os.getenv("DB_URL")
 
+# Async drivers used for the sync drivers configured in DB_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(hide_password=False)
+
+
+ASYNC_DB_URL = os.getenv("ASYNC_DB_URL") or to_async_url(DB_URL)
+
 # Create engine with connection pooling
 engine = create_engine(
     DB_URL,
@@ -19,4 +37,19 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API handlers and the agents, so requests wait on
+# the database rather than on threadpool slots
+async_engine = create_async_engine(
+    ASYNC_DB_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_timeout=30,
+    pool_recycle=1800,
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
@@ -1,7 +1,8 @@
 from typing import Annotated, Any, Optional
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import AsyncSessionLocal, SessionLocal
 # from livekit.api import LiveKitAPI
 from typing import AsyncGenerator
 from contextlib import contextmanager
@@ -15,4 +16,11 @@ def get_db():
     finally:
         db.close()
         
-db_dependency = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+db_dependency = Annotated[Session, Depends(get_db)]
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
\ No newline at end of file
@@ -1,10 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import users_router
+from app.routes import users_router, transactions_router, ingestion_router
 from app.agents.router import router as agent_router
-from database import engine
+from app.services.http_cache import EXPOSED_HEADERS
+from app.services.user_context import user_context_cache
+from app.services.websocket_manager import manager
+from database import engine, async_engine
 from dotenv import load_dotenv
+import gc
 import os
 
 # Create tables
@@ -36,12 +40,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=EXPOSED_HEADERS,
 )
 
 app.include_router(users_router, prefix="/api/v1/users", tags=["users"])
+app.include_router(transactions_router, prefix="/api/v1/users", tags=["transactions"])
+app.include_router(ingestion_router, prefix="/api/v1/ingestion", tags=["ingestion"])
 app.include_router(agent_router, prefix="/api/v1/agent", tags=["agent"])
 
 
+@app.on_event("startup")
+async def freeze_startup_objects():
+    # Move the modules, models and caches built at import time out of the
+    # collector's reach, so collections triggered by request allocations
+    # (e.g. decoding long financial histories) only scan what is new
+    gc.freeze()
+
+
+@app.on_event("startup")
+async def start_websocket_broker():
+    # Subscribe this worker to WebSocket messages published by any worker
+    await manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_websocket_broker():
+    await manager.stop()
+
+
+@app.on_event("startup")
+async def start_user_context_invalidations():
+    # Drop cached user contexts when another worker invalidates them
+    await user_context_cache.start()
+
+
+@app.on_event("shutdown")
+async def stop_user_context_invalidations():
+    await user_context_cache.stop()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # Close pooled async connections so their driver threads exit cleanly
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to FinBuddy"} 
\ No newline at end of file
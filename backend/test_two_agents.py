@@ -3,7 +3,7 @@ Test script for the two-agent financial advisory system
 """
 import asyncio
 from app.agents.graph import stream_chat
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -38,21 +38,20 @@ async def test_two_agents():
         conversation_history.append(HumanMessage(content=user_message))
         
         # Stream response from agents
-        for chunk in stream_chat(conversation_history, config, user_id=user_id):
-            if "conversation_agent" in chunk:
-                agent_response = chunk["conversation_agent"]["messages"][-1].content
+        async for event in stream_chat(conversation_history, config, user_id=user_id):
+            if event["type"] == "message" and event["agent"] == "conversation":
+                agent_response = event["content"]
                 logger.info(f"🤖 FinBuddy (Agent1): {agent_response}")
-                conversation_history.append(chunk["conversation_agent"]["messages"][-1])
-                
-                # Check if we're in confirming_analysis phase
-                if "current_phase" in chunk["conversation_agent"]:
-                    phase = chunk["conversation_agent"].get("current_phase", "")
-                    logger.info(f"📍 Current phase: {phase}")
+                conversation_history.append(AIMessage(content=agent_response))
                     
-            elif "analysis_agent" in chunk:
-                analysis_response = chunk["analysis_agent"]["messages"][-1].content
+            elif event["type"] == "message" and event["agent"] == "analysis":
+                analysis_response = event["content"]
                 logger.info(f"📊 Analysis (Agent2): {analysis_response[:200]}...")  # First 200 chars
-                conversation_history.append(chunk["analysis_agent"]["messages"][-1])
+                conversation_history.append(AIMessage(content=analysis_response))
+
+            elif event["type"] == "done":
+                # Check if we're in confirming_analysis phase
+                logger.info(f"📍 Current phase: {event['current_phase']}")
         
         # Small delay between messages
         await asyncio.sleep(1)
@@ -5,6 +5,20 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '.
 import { User, CreditCard, Wallet, TrendingUp, AlertCircle, FileText, Banknote, LineChart } from 'lucide-react';
 import { API_URL } from '../config';
 
+// Lists are paged: follow X-Next-Cursor until the last page
+const fetchAllPages = async (url) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const pageUrl = cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url;
+    const response = await fetch(pageUrl);
+    if (!response.ok) throw new Error('Failed to fetch financial analyses');
+    items.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return items;
+};
+
 const BankStatementsModal = ({ isOpen, onClose, scrollTarget }) => {
   const [userData, setUserData] = useState(null);
   const [financialAnalyses, setFinancialAnalyses] = useState([]);
@@ -68,9 +82,7 @@ const BankStatementsModal = ({ isOpen, onClose, scrollTarget }) => {
       const userData = await userResponse.json();
       
       // Fetch financial analyses
-      const analysesResponse = await fetch(`${API_URL}/users/1/financial-analyses`);
-      if (!analysesResponse.ok) throw new Error('Failed to fetch financial analyses');
-      const analysesData = await analysesResponse.json();
+      const analysesData = await fetchAllPages(`${API_URL}/users/1/financial-analyses`);
       
       setUserData(userData);
       setFinancialAnalyses(analysesData);
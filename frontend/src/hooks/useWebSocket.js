@@ -1,12 +1,17 @@
-import { useEffect, useRef, useCallback } from 'react';
+import { createContext, useContext, useEffect, useRef, useCallback, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { API_URL } from '../config';
 
+// The app's single WebSocket, shared with pages that chat over it
+export const WebSocketContext = createContext(null);
+export const useSharedWebSocket = () => useContext(WebSocketContext);
+
 const useWebSocket = (userId) => {
   const ws = useRef(null);
   const navigate = useNavigate();
   const reconnectTimeout = useRef(null);
   const isConnecting = useRef(false);
+  const listeners = useRef(new Set());
 
   const connect = useCallback(() => {
     if (!userId || isConnecting.current) return;
@@ -39,12 +44,21 @@ const useWebSocket = (userId) => {
       try {
         const data = JSON.parse(event.data);
         
+        // Answer server heartbeats so the connection is not evicted as idle
+        if (data.type === 'ping') {
+          ws.current.send(JSON.stringify({ type: 'pong' }));
+          return;
+        }
+
         // Handle redirect messages
         if (data.type === 'redirect' && data.redirect_to) {
           console.log('🔄 Redirect signal received:', data.redirect_to);
           navigate(data.redirect_to);
         }
-        // Silently handle connection confirmations and heartbeats
+
+        // Chat frames (tagged with a session_id) go to the pages listening
+        listeners.current.forEach((listener) => listener(data));
+        // Silently handle connection confirmations
       } catch (error) {
         // Non-JSON message, ignore
       }
@@ -86,14 +100,22 @@ const useWebSocket = (userId) => {
     };
   }, [userId]); // Only depend on userId, not connect function
 
-  // Return send function if needed
+  // Send a frame; returns false when the socket is not open
   const sendMessage = useCallback((message) => {
     if (ws.current && ws.current.readyState === WebSocket.OPEN) {
       ws.current.send(JSON.stringify(message));
+      return true;
     }
+    return false;
+  }, []);
+
+  // Register a handler for every JSON frame; returns the unsubscribe function
+  const subscribe = useCallback((listener) => {
+    listeners.current.add(listener);
+    return () => listeners.current.delete(listener);
   }, []);
 
-  return { sendMessage };
+  return useMemo(() => ({ sendMessage, subscribe }), [sendMessage, subscribe]);
 };
 
 export default useWebSocket; 
\ No newline at end of file
@@ -12,6 +12,7 @@ import { AudioLines, Send, Mic, MicOff, Phone, PhoneOff } from 'lucide-react';
 import VoiceAssistant from '../components/VoiceAssistant';
 import MicController from '../components/MicController';
 import { API_URL, LIVEKIT_URL } from '../config';
+import { useSharedWebSocket } from '../hooks/useWebSocket';
 
 const HelloPage = ({ userId }) => {
   const navigate = useNavigate();
@@ -23,6 +24,8 @@ const HelloPage = ({ userId }) => {
   const [roomName, setRoomName] = useState('');
   const [isMicMuted, setIsMicMuted] = useState(false);
   const messagesEndRef = useRef(null);
+  const socket = useSharedWebSocket();
+  const sessionId = String(userId);
 
   // Auto-scroll to bottom when new messages arrive
   const scrollToBottom = () => {
@@ -33,6 +36,35 @@ const HelloPage = ({ userId }) => {
     scrollToBottom();
   }, [messages]);
 
+  // Chat events, from WebSocket frames or the SSE fallback alike
+  const applyChatEvent = (data) => {
+    if (data.type === 'token' || data.type === 'message') {
+      setMessages((prev) => {
+        const last = prev[prev.length - 1];
+        const sameReply = last && last.sender === 'assistant' && last.agent === data.agent;
+        // Tokens carry only the new text; a message event has the final text
+        // of the reply (possibly extended, e.g. by the confirmation question)
+        const growing = sameReply && (data.type === 'message' || last.streaming);
+        const text = data.type === 'token' ? (growing ? last.text : '') + data.delta : data.content;
+        const reply = { sender: 'assistant', agent: data.agent, text, timestamp: new Date(), streaming: data.type === 'token' };
+        return growing ? [...prev.slice(0, -1), reply] : [...prev, reply];
+      });
+    } else if (data.type === 'error') {
+      setMessages((prev) => [...prev, { sender: 'assistant', text: "Sorry, something went wrong. " + data.error, timestamp: new Date() }]);
+      setIsLoading(false);
+    } else if (data.type === 'done') {
+      setIsLoading(false);
+    }
+  };
+
+  // Replies to this page's session arrive as frames on the shared WebSocket
+  useEffect(() => {
+    if (!socket) return undefined;
+    return socket.subscribe((data) => {
+      if (data.session_id === sessionId) applyChatEvent(data);
+    });
+  }, [socket, sessionId]);
+
   const handleSend = async () => {
     if (!input.trim() || isLoading) return;
     
@@ -48,13 +80,19 @@ const HelloPage = ({ userId }) => {
     // Don't create assistant message placeholder immediately
     // It will be created when we start receiving the response
 
+    // Chat over the open WebSocket; the reply streams back as frames
+    if (socket && socket.sendMessage({ type: 'chat', session_id: sessionId, message: currentInput })) {
+      return;
+    }
+
+    // Not connected: one SSE request for this turn
     try {
       const response = await fetch(`${API_URL}/agent/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           message: currentInput,
-          session_id: String(userId), // Convert to string for session_id
+          session_id: sessionId,
           user_id: 1 // Use consistent user_id: 1
         }),
       });
@@ -62,7 +100,6 @@ const HelloPage = ({ userId }) => {
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = '';
-      let assistantMessageCreated = false;
 
       while (true) {
         const { value, done } = await reader.read();
@@ -76,24 +113,7 @@ const HelloPage = ({ userId }) => {
         for (const part of parts) {
           if (part.startsWith('data: ')) {
             try {
-              const data = JSON.parse(part.substring(6));
-              
-              // Handle regular message
-              if (data.content) {
-                if (!assistantMessageCreated) {
-                  // Create assistant message on first content received
-                  const assistantMessage = { sender: 'assistant', text: data.content, timestamp: new Date() };
-                  setMessages((prev) => [...prev, assistantMessage]);
-                  assistantMessageCreated = true;
-                } else {
-                  // Update existing assistant message
-                  setMessages((prev) => {
-                    const newMessages = [...prev];
-                    newMessages[newMessages.length - 1].text = data.content;
-                    return newMessages;
-                  });
-                }
-              }
+              applyChatEvent(JSON.parse(part.substring(6)));
             } catch (e) {
               console.error('Error parsing JSON:', part);
             }
@@ -104,22 +124,7 @@ const HelloPage = ({ userId }) => {
       // Process any remaining buffer
       if (buffer.trim() && buffer.startsWith('data: ')) {
         try {
-          const data = JSON.parse(buffer.substring(6));
-          
-          // Handle regular message
-          if (data.content) {
-            if (!assistantMessageCreated) {
-              // Create assistant message if none was created yet
-              const assistantMessage = { sender: 'assistant', text: data.content, timestamp: new Date() };
-              setMessages((prev) => [...prev, assistantMessage]);
-            } else {
-              setMessages((prev) => {
-                const newMessages = [...prev];
-                newMessages[newMessages.length - 1].text = data.content;
-                return newMessages;
-              });
-            }
-          }
+          applyChatEvent(JSON.parse(buffer.substring(6)));
         } catch (e) {
           console.error('Error parsing final buffer:', buffer);
         }